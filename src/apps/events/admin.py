@@ -1,6 +1,10 @@
 from django.contrib import admin
 
-from .models import Event, EventRegistration
+from .models import Event, EventRegistration, EventWaitlistEntry, EmailOutbox, EventNotification, EventChange
 
 admin.site.register(Event)
 admin.site.register(EventRegistration)
+admin.site.register(EventWaitlistEntry)
+admin.site.register(EmailOutbox)
+admin.site.register(EventNotification)
+admin.site.register(EventChange)
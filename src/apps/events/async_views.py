@@ -0,0 +1,181 @@
+"""
+Async versions of the hot endpoints, for serving under ASGI.
+
+DRF views are synchronous, so these are plain Django async views that reuse
+the DRF serializers, filters, paginator and authentication, as well as the
+fieldset (`fields`/`omit`) handling and archived event lookup of
+EventViewSet. Reads go through the async ORM (`aget()`, `async for`).
+Registration runs its transaction in a worker thread via sync_to_async,
+because Django does not support transactions from async code.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from core.renderers import ORJSONRenderer
+from apps.users.authentication import ClaimsJWTAuthentication
+from . import partitions, seats, shards
+from .models import Event
+from .views import FIELDSET_PARAMS, EventFilter, EventViewSet, only_serialized_columns
+from .pagination import EventCursorPagination
+from .cache import get_cache, get_if_none_match, is_cacheable, list_cache_key, detail_cache_key
+from .serializers import (
+    EventSerializer,
+    EventRegistrationSerializer,
+    EventRegistrationRequestSerializer,
+    EventWaitlistEntrySerializer,
+)
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+async def cached_render(request, response_key, build_data):
+    """Async counterpart of cache.cached_response(); `build_data` returns (data, status)."""
+    key, etag, version = response_key
+    headers = {"ETag": etag}
+    if_none_match = get_if_none_match(request)
+    if etag in if_none_match:
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    data = await cache.aget(key)
+    if data is None:
+        data, status_code = await build_data()
+        if status_code != status.HTTP_200_OK:
+            return render(data, status_code)
+        if not is_cacheable(version):
+            return render(data)
+        await cache.aset(key, data)
+    if "*" in if_none_match:
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return render(data, headers=headers)
+
+
+@require_GET
+async def event_list(request):
+    request = Request(request)
+    paginator = EventCursorPagination()
+    params = [
+        *EventFilter.base_filters, paginator.cursor_query_param, paginator.page_size_query_param, *FIELDSET_PARAMS
+    ]
+    response_key = await sync_to_async(list_cache_key)(request, params)
+
+    async def build_data():
+        try:
+            # Raises ValidationError for unknown `fields`/`omit` names.
+            serializer = EventSerializer(context={"request": request})
+        except ValidationError as e:
+            return e.detail, e.status_code
+        queryset = only_serialized_columns(EventViewSet.queryset, serializer)
+        filterset = EventFilter(data=request.query_params, queryset=queryset)
+        if not filterset.is_valid():
+            return filterset.errors, status.HTTP_400_BAD_REQUEST
+        # Searching may build the in-memory index, which queries the database.
+        queryset = await sync_to_async(lambda: filterset.qs)()
+        try:
+            page = await paginator.apaginate_queryset(queryset, request)
+        except NotFound as e:
+            return {"detail": e.detail}, e.status_code
+        data = EventSerializer(page, many=True, context={"request": request}).data
+        return paginator.get_paginated_response(data).data, status.HTTP_200_OK
+
+    return await cached_render(request, response_key, build_data)
+
+
+@require_GET
+async def event_detail(request, pk):
+    request = Request(request)
+    response_key = await sync_to_async(detail_cache_key)(request, pk, FIELDSET_PARAMS)
+
+    async def build_data():
+        try:
+            # Raises ValidationError for unknown `fields`/`omit` names.
+            serializer = EventSerializer(context={"request": request})
+        except ValidationError as e:
+            return e.detail, e.status_code
+        queryset = only_serialized_columns(EventViewSet.queryset, serializer)
+        try:
+            event = await queryset.aget(pk=pk)
+        except Event.DoesNotExist:
+            # Events of archived months, like EventViewSet.get_archived_object().
+            event = await sync_to_async(partitions.get_archived_event)(pk)
+            if event is None:
+                return {"detail": "No Event matches the given query."}, status.HTTP_404_NOT_FOUND
+        return EventSerializer(event, context={"request": request}).data, status.HTTP_200_OK
+
+    return await cached_render(request, response_key, build_data)
+
+
+@csrf_exempt
+@require_POST
+async def event_registration(request, pk):
+    try:
+        user_auth = await sync_to_async(ClaimsJWTAuthentication().authenticate)(Request(request))
+    except (AuthenticationFailed, InvalidToken) as e:
+        return render({"detail": e.detail}, e.status_code)
+    if user_auth is None:
+        return render(
+            {"detail": "Authentication credentials were not provided."},
+            status.HTTP_401_UNAUTHORIZED
+        )
+    user = user_auth[0]
+
+    try:
+        event = await Event.objects.only("id", "title", "date", "location").aget(pk=pk)
+    except Event.DoesNotExist:
+        return render({"detail": "No Event matches the given query."}, status.HTTP_404_NOT_FOUND)
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return render({"detail": "JSON parse error."}, status.HTTP_400_BAD_REQUEST)
+    request_serializer = EventRegistrationRequestSerializer(data=data)
+    if not request_serializer.is_valid():
+        return render(request_serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        registration = await sync_to_async(seats.register)(user=user, event=event)
+    except IntegrityError:
+        return render(
+            {"error": "You are already registered for this event."},
+            status.HTTP_400_BAD_REQUEST
+        )
+    except seats.EventFull:
+        if not request_serializer.validated_data["waitlist"]:
+            return render({"error": "This event is full."}, status.HTTP_409_CONFLICT)
+        return await join_waitlist(user, event)
+
+    return render(EventRegistrationSerializer(registration).data, status.HTTP_201_CREATED)
+
+
+async def join_waitlist(user, event):
+    if await sync_to_async(shards.is_registered)(user, event):
+        return render(
+            {"error": "You are already registered for this event."},
+            status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        entry = await sync_to_async(seats.join_waitlist)(user=user, event=event)
+    except IntegrityError:
+        return render(
+            {"error": "You are already on the waitlist for this event."},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    data = await sync_to_async(lambda: EventWaitlistEntrySerializer(entry).data)()
+    return render(data, status.HTTP_202_ACCEPTED)
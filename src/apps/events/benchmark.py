@@ -0,0 +1,221 @@
+"""
+In-process API benchmark used by the benchmark_api command.
+
+The dataset is generated from a seeded random.Random, so the same seed and
+sizes always produce the same rows, and every scenario issues the same
+requests in the same order. Results are plain dicts ready for JSON, to be
+compared between commits.
+"""
+import math
+import time
+import random
+import subprocess
+from datetime import datetime, timedelta, timezone as dt_timezone
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.hashers import make_password
+
+from apps.users.models import CustomUser
+from . import geo, shards
+from .models import Event, EventRegistration
+from .day_buckets import day_of, rebuild_days
+
+BENCHMARK_PASSWORD = "benchmark-password"
+BENCHMARK_EMAIL_DOMAIN = "benchmark.invalid"
+BASE_DATE = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+LOCATIONS = ["Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Warsaw", "Berlin", "Remote"]
+TOPICS = [
+    "python", "django", "postgres", "kubernetes", "frontend", "security",
+    "testing", "design", "data", "cloud", "mobile", "startup",
+]
+KINDS = ["conference", "meetup", "workshop", "hackathon", "webinar", "summit"]
+CITY_COORDINATES = {
+    "Kyiv": (50.4501, 30.5234),
+    "Lviv": (49.8397, 24.0297),
+    "Odesa": (46.4825, 30.7233),
+    "Kharkiv": (49.9935, 36.2304),
+    "Dnipro": (48.4647, 35.0462),
+    "Warsaw": (52.2297, 21.0122),
+    "Berlin": (52.5200, 13.4050),
+}
+# Events are scattered up to this far from their city centre.
+CITY_RADIUS_KM = 25
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def random_point(rng, latitude, longitude, radius_km):
+    """A point at most `radius_km` from (latitude, longitude), on a flat approximation."""
+    distance = radius_km * rng.random() ** 0.5
+    bearing = rng.uniform(0, 2 * math.pi)
+    delta_lat = math.degrees(distance * math.cos(bearing) / geo.EARTH_RADIUS_KM)
+    delta_lon = math.degrees(
+        distance * math.sin(bearing) / geo.EARTH_RADIUS_KM / math.cos(math.radians(latitude))
+    )
+    return latitude + delta_lat, longitude + delta_lon
+
+
+def set_coordinates(rng, event):
+    if event.location in CITY_COORDINATES:
+        event.latitude, event.longitude = random_point(rng, *CITY_COORDINATES[event.location], CITY_RADIUS_KM)
+        event.update_geohash()
+
+
+def seed_dataset(seed, users, events, registrations):
+    """
+    Create `users` users, `events` events and `registrations` distinct
+    registrations. Returns (users, events) as lists of saved instances.
+    """
+    rng = random.Random(seed)
+    # Hashing once keeps seeding fast; every user gets the same password.
+    password = make_password(BENCHMARK_PASSWORD)
+    user_objects = CustomUser.objects.bulk_create([
+        CustomUser(
+            email=f"user{i}@{BENCHMARK_EMAIL_DOMAIN}",
+            full_name=f"Benchmark user {i}",
+            password=password,
+        )
+        for i in range(users)
+    ])
+
+    event_objects = []
+    for i in range(events):
+        topic, kind = rng.choice(TOPICS), rng.choice(KINDS)
+        event_objects.append(Event(
+            title=f"{topic.capitalize()} {kind} {i}",
+            description=f"A {kind} about {topic} and {rng.choice(TOPICS)}.",
+            date=BASE_DATE + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            location=rng.choice(LOCATIONS),
+            organizer=user_objects[rng.randrange(users)],
+        ))
+
+    # A separate generator keeps the other columns the same as without coordinates.
+    geo_rng = random.Random(f"{seed}:geo")
+    for event in event_objects:
+        set_coordinates(geo_rng, event)
+
+    registrations = min(registrations, users * events)
+    pairs = [divmod(n, events) for n in rng.sample(range(users * events), registrations)]
+    for _, event_index in pairs:
+        event_objects[event_index].registrations_count += 1
+    event_objects = Event.objects.bulk_create(event_objects)
+    rebuild_days(day_of(event.date) for event in event_objects)
+
+    shards.bulk_create(
+        [
+            EventRegistration(user=user_objects[user_index], event=event_objects[event_index])
+            for user_index, event_index in pairs
+        ],
+        batch_size=1000,
+    )
+    return user_objects, event_objects
+
+
+def build_events(seed, count, organizers=100):
+    """
+    Unsaved events (with organizers) shaped like the seeded ones, for
+    benchmarks that do not need the database.
+    """
+    rng = random.Random(seed)
+    geo_rng = random.Random(f"{seed}:geo")
+    organizer_objects = [
+        CustomUser(pk=i + 1, email=f"user{i}@{BENCHMARK_EMAIL_DOMAIN}", full_name=f"Benchmark user {i}")
+        for i in range(organizers)
+    ]
+    events = []
+    for i in range(count):
+        topic, kind = rng.choice(TOPICS), rng.choice(KINDS)
+        events.append(Event(
+            pk=i + 1,
+            title=f"{topic.capitalize()} {kind} {i}",
+            description=" ".join(
+                f"A {kind} about {topic} and {rng.choice(TOPICS)}." for _ in range(rng.randrange(1, 20))
+            ),
+            date=BASE_DATE + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            location=rng.choice(LOCATIONS),
+            capacity=rng.choice([None, 20, 50, 100, 500]),
+            registrations_count=rng.randrange(20),
+            organizer=rng.choice(organizer_objects),
+        ))
+        set_coordinates(geo_rng, events[-1])
+    return events
+
+
+def best_time(func, repeat):
+    """Fastest of `repeat` calls of `func()`, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_scenario(make_request, iterations, before_request=None):
+    """
+    Call `make_request(i)` for i in range(iterations) and summarise the
+    latencies, database queries and response statuses.
+    """
+    latencies = []
+    queries = []
+    statuses = Counter()
+    for i in range(iterations):
+        if before_request is not None:
+            before_request()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = make_request(i)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(context.captured_queries))
+        statuses[str(response.status_code)] += 1
+    return summarize(latencies, queries, statuses)
+
+
+def summarize(latencies, queries, statuses):
+    total = sum(latencies)
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "req_per_s": round(len(latencies) / total, 1) if total else 0.0,
+        "mean_ms": round(total / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "queries": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else 0.0,
+            "max": max(queries, default=0),
+        },
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def compare(baseline, current):
+    """Yield (endpoint, metric, before, after, change) for the endpoints in both results."""
+    for name, result in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        for metric in ("req_per_s", "p50_ms", "p99_ms"):
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            yield name, metric, before[metric], result[metric], change
+        yield (
+            name, "queries", before["queries"]["mean"], result["queries"]["mean"],
+            result["queries"]["mean"] - before["queries"]["mean"],
+        )
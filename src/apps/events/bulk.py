@@ -0,0 +1,125 @@
+"""
+Batch registration and event import used by the bulk endpoints and the
+`import_events` management command.
+"""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+
+from . import change_log, notifications, shards
+from .cache import invalidate_event, invalidate_events, touch_organizer
+from .day_buckets import day_of, schedule_rebuild
+from .search import search_index
+from .serializers import EventSerializer
+from .utils import build_email_after_event_registration, load_recipient
+from .models import Event, EventChange, EventRegistration, EmailOutbox
+
+BULK_BATCH_SIZE = 500
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bulk_register(user, event_ids):
+    """
+    Register `user` for every event in `event_ids` with a fixed number of
+    queries per chunk. Returns one {"event", "status"} result per distinct id,
+    in input order; status is one of "registered", "already_registered",
+    "full" or "not_found".
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    events = {}
+    registered = set()
+
+    with transaction.atomic():
+        # Lock the events in primary key order so that concurrent bulk
+        # registrations cannot deadlock, and so seat counts cannot change
+        # between the capacity check and the counter update below.
+        for chunk in chunked(sorted(event_ids), BULK_BATCH_SIZE):
+            events.update(
+                (event.pk, event)
+                for event in Event.objects.select_for_update()
+                .only("id", "title", "date", "location", "capacity", "registrations_count")
+                .filter(pk__in=chunk)
+                .order_by("pk")
+            )
+            registered.update(shards.registered_event_ids(user, chunk))
+
+        results = []
+        to_register = []
+        for pk in event_ids:
+            event = events.get(pk)
+            if event is None:
+                result = "not_found"
+            elif pk in registered:
+                result = "already_registered"
+            elif event.capacity is not None and event.registrations_count >= event.capacity:
+                result = "full"
+            else:
+                result = "registered"
+                to_register.append(event)
+            results.append({"event": pk, "status": result})
+
+        recipient = load_recipient(user) if to_register else None
+        with shards.atomic(*(event.pk for event in to_register)):
+            for chunk in chunked(to_register, BULK_BATCH_SIZE):
+                Event.objects.filter(pk__in=[event.pk for event in chunk]).update(
+                    registrations_count=F("registrations_count") + 1
+                )
+                shards.bulk_create(
+                    [EventRegistration(user=user, event=event) for event in chunk],
+                    ignore_conflicts=True,
+                )
+                EmailOutbox.objects.bulk_create(
+                    [build_email_after_event_registration(recipient, event) for event in chunk]
+                )
+
+        if to_register:
+            transaction.on_commit(lambda: invalidate_events([event.pk for event in to_register]))
+
+    return results
+
+
+def import_events(organizer, rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Validate `rows` (an iterable of dicts) with EventSerializer and insert
+    the valid ones in batches of `batch_size`.
+
+    Yields {"index", "id"} for created events and {"index", "errors"} for
+    invalid rows. Only one batch is held in memory at a time, so `rows` can be
+    a stream of any length. Results of invalid rows are yielded immediately,
+    created ones when their batch is flushed.
+    """
+    batch = []
+    for index, row in enumerate(rows):
+        serializer = EventSerializer(data=row)
+        if not serializer.is_valid():
+            yield {"index": index, "errors": serializer.errors}
+            continue
+        batch.append((index, Event(organizer=organizer, **serializer.validated_data)))
+        if len(batch) >= batch_size:
+            yield from _create_events(batch)
+            batch = []
+    if batch:
+        yield from _create_events(batch)
+
+
+def _create_events(batch):
+    for _, event in batch:
+        event.update_geohash()
+    with transaction.atomic():
+        events = Event.objects.bulk_create([event for _, event in batch])
+        notifications.schedule_reminders(events)
+        change_log.record([event.pk for event in events], EventChange.Action.CREATED)
+    # bulk_create() sends no post_save signals.
+    for event in events:
+        search_index.update(event)
+    schedule_rebuild(day_of(event.date) for event in events)
+    touch_organizer(events[0].organizer_id)
+    invalidate_event()
+    for index, event in batch:
+        yield {"index": index, "id": event.pk}
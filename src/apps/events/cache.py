@@ -0,0 +1,161 @@
+import time
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.db.replicas import reading_from_replicas
+
+COLLECTION_VERSION_KEY = "events:version:collection"
+EVENT_VERSION_KEY = "events:version:event:{pk}"
+# A timestamp (ns) of the last change to an organizer's events, used as the
+# Last-Modified time of their ICS feed.
+ORGANIZER_VERSION_KEY = "events:version:organizer:{pk}"
+
+ResponseKey = namedtuple("ResponseKey", ["key", "etag", "version"])
+
+
+def get_cache():
+    return caches[settings.EVENTS_CACHE_ALIAS]
+
+
+def get_versions(*keys):
+    """
+    Return the current version for each key, initialising missing ones.
+
+    Fresh versions start from the current time rather than 1 so that a key
+    which was evicted never comes back with a version that old responses were
+    cached under.
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    """
+    Advance the version of `key` to the current time, so that a version also
+    tells when it last changed. incr() keeps concurrent bumps from being lost.
+    """
+    cache = get_cache()
+    version = cache.get(key)
+    if version is not None:
+        try:
+            cache.incr(key, max(time.time_ns() - version, 1))
+            return
+        except ValueError:
+            pass
+    cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_event(pk=None):
+    """Invalidate the cached list pages and, if given, the event's detail response."""
+    invalidate_events([] if pk is None else [pk])
+
+
+def invalidate_events(pks):
+    """Invalidate the cached list pages and the detail responses of the events in `pks`."""
+    bump_version(COLLECTION_VERSION_KEY)
+    for pk in pks:
+        bump_version(EVENT_VERSION_KEY.format(pk=pk))
+
+
+def touch_organizer(pk):
+    get_cache().set(ORGANIZER_VERSION_KEY.format(pk=pk), time.time_ns(), timeout=None)
+
+
+def get_organizer_version(pk):
+    (version,) = get_versions(ORGANIZER_VERSION_KEY.format(pk=pk))
+    return version
+
+
+def normalize_query_params(request, params):
+    """Keep only the parameters that affect the response, in a canonical form."""
+    normalized = []
+    for name in sorted(params):
+        value = request.query_params.get(name, "").strip()
+        if not value:
+            continue
+        if name in ("location", "location__iexact", "search"):
+            value = " ".join(value.lower().split())
+        elif name in ("fields", "omit"):
+            value = ",".join(sorted({part.strip() for part in value.split(",")} - {""}))
+        normalized.append(f"{name}={value}")
+    return "&".join(normalized)
+
+
+def make_key(kind, version, request, *parts):
+    # Pagination links are absolute URLs of the view that built them, so the
+    # scheme, host and path are part of the key.
+    digest = hashlib.sha1(
+        "|".join([request.scheme, request.get_host(), request.path, *parts]).encode()
+    ).hexdigest()
+    return ResponseKey(f"events:{kind}:{version}:{digest}", f'"{version}-{digest[:16]}"', version)
+
+
+def list_cache_key(request, params):
+    (version,) = get_versions(COLLECTION_VERSION_KEY)
+    return make_key("list", version, request, normalize_query_params(request, params))
+
+
+def detail_cache_key(request, pk, params=()):
+    (version,) = get_versions(EVENT_VERSION_KEY.format(pk=pk))
+    return make_key("detail", version, request, str(pk), normalize_query_params(request, params))
+
+
+def calendar_cache_key(request, params):
+    (version,) = get_versions(COLLECTION_VERSION_KEY)
+    return make_key("calendar", version, request, normalize_query_params(request, params))
+
+
+def is_cacheable(version):
+    """
+    Whether a body built by the current request may be cached under `version`.
+
+    A replica may not have replayed the change behind a version yet, so a
+    body read from one is only cached once the version is older than
+    DB_REPLICA_MAX_LAG. Otherwise it would be served, stale, to every client
+    until the next change, including the writer pinned to the primary.
+    """
+    return not reading_from_replicas() or time.time_ns() - version > settings.DB_REPLICA_MAX_LAG * 1e9
+
+
+def get_if_none_match(request):
+    """The entity tags listed in the If-None-Match header (weakly compared, so without W/), or {"*"}."""
+    return {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+
+
+def cached_response(request, response_key, build_response):
+    """
+    Serve `build_response()` through the cache under `response_key`.
+
+    An `If-None-Match` header listing the ETag is answered with 304 from the
+    version numbers alone, without reading the cached body or touching the
+    database. `*` matches any existing response, so it needs the body.
+    """
+    key, etag, version = response_key
+    headers = {"ETag": etag}
+    if_none_match = get_if_none_match(request)
+    if etag in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        response = build_response()
+        # Uncached responses go without an ETag: it would vouch for the body under `version`.
+        if response.status_code != status.HTTP_200_OK or not is_cacheable(version):
+            return response
+        data = response.data
+        cache.set(key, data)
+    if "*" in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
@@ -0,0 +1,93 @@
+"""
+The events change log behind the change feed (`GET /api/events/changes/`).
+
+Creating, updating or deleting an event appends an EventChange row in the
+same transaction; its position in the log is the token clients sync from.
+The changes since a token are an index range scan, so a client that is up to date costs a single index probe and one that is behind
+costs what it missed, never the whole events table. Deleted events stay in
+the log as tombstones, and so do the events of the months archived by
+apps.events.partitions, which leave the events table.
+
+Ids are taken when a row is inserted, not when its transaction commits, so
+a lower id can become visible after a higher one was already served. On
+PostgreSQL every entry also records the id of the transaction writing it
+(pg_current_xact_id), and the feed is ordered by (txid, id) and cut before
+the oldest transaction still in flight, read from the snapshot of the very
+query returning the entries. Whatever commits later sorts after the cut, so
+it is served on the next sync instead of behind a token. A token is
+"<txid>:<id>"; bare ids, such as 0, are tokens from before any transaction.
+Other databases serialize writers, so txid stays 0 and id order is commit
+order.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import EventChange
+
+CHANGE_FEED_PAGE_SIZE = 100
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+
+# The oldest transaction the query's snapshot sees in flight. xip leaves the
+# query's own transaction out, but xmax (the lowest id not known to have
+# ended) can be its own; the cut then moves past it, as its own changes are
+# visible to it.
+IN_FLIGHT_CUT_SQL = (
+    "COALESCE((SELECT min(xip::text::bigint) FROM pg_snapshot_xip(pg_current_snapshot()) AS xip), "
+    "pg_snapshot_xmax(pg_current_snapshot())::text::bigint + "
+    "(pg_current_xact_id_if_assigned() IS NOT DISTINCT FROM pg_snapshot_xmax(pg_current_snapshot()))::int)"
+)
+
+
+def parse_token(token):
+    """(txid, id) of a token, raising ValueError for a malformed one."""
+    txid, _, pk = token.rpartition(":")
+    txid, pk = int(txid or 0), int(pk)
+    if txid < 0 or pk < 0:
+        raise ValueError(token)
+    return txid, pk
+
+
+def format_token(txid, pk):
+    return f"{txid}:{pk}"
+
+
+def record(event_ids, action, batch_size=None):
+    EventChange.objects.bulk_create(
+        [EventChange(event_id=event_id, action=action) for event_id in event_ids], batch_size=batch_size
+    )
+
+
+def get_changes(since, limit, events):
+    """
+    The changes after the (txid, id) token `since`, `limit` log entries at most, with
+    only the latest per event. `events` is the queryset to load the changed
+    events from; changes of events missing from it become tombstones.
+
+    Returns (changes, token, has_more), where changes are (seq, action,
+    event_id, event or None) and `token` is the one to continue from.
+    """
+    txid, pk = since
+    entries = EventChange.objects.filter(Q(txid__gt=txid) | Q(txid=txid, pk__gt=pk))
+    if connections[entries.db].vendor == "postgresql":
+        entries = entries.filter(txid__lt=RawSQL(IN_FLIGHT_CUT_SQL, []))
+    entries = list(entries.order_by("txid", "pk")[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry in entries:
+        # Re-inserted so the event is listed at its latest change.
+        latest.pop(entry.event_id, None)
+        latest[entry.event_id] = entry
+    loaded = events.in_bulk([
+        event_id for event_id, entry in latest.items() if entry.action != EventChange.Action.DELETED
+    ])
+
+    changes = []
+    for event_id, entry in latest.items():
+        event = loaded.get(event_id)
+        action = entry.action if event is not None else EventChange.Action.DELETED
+        changes.append((entry.pk, action, event_id, event))
+    token = format_token(entries[-1].txid, entries[-1].pk) if entries else format_token(txid, pk)
+    return changes, token, has_more
@@ -0,0 +1,71 @@
+"""
+Precomputed per-day buckets served by the calendar endpoint.
+
+Every EventDayBucket row holds the number of events on one day (in
+settings.TIME_ZONE) and up to MAX_STUBS_PER_DAY lightweight stubs of them,
+so a month view is a primary key range scan over ~31 small rows instead of
+reading every event with its description.
+
+Buckets are kept in sync incrementally: saving or deleting an event
+(through the signals in apps.events.signals) or importing events in bulk
+rebuilds only the days that were touched, once the transaction commits.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, EventDayBucket
+
+MAX_STUBS_PER_DAY = 20
+# Changing other fields (description, capacity, ...) leaves the stubs as they are.
+STUB_FIELDS = {"title", "date", "location", "deleted_at"}
+
+
+def day_of(value):
+    return timezone.localtime(value).date() if value is not None else None
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def make_stub(event_id, title, date, location):
+    return {
+        "id": event_id,
+        "title": title,
+        "time": timezone.localtime(date).time().isoformat(),
+        "location": location,
+    }
+
+
+def rebuild_days(days):
+    """Recompute the buckets of `days` from the events table."""
+    for day in sorted({day for day in days if day is not None}):
+        with transaction.atomic():
+            # The row lock makes concurrent rebuilds of one day run one after
+            # the other, each reading the events committed before it.
+            bucket, _ = EventDayBucket.objects.select_for_update().get_or_create(day=day)
+            start, end = day_bounds(day)
+            events = Event.objects.filter(date__gte=start, date__lt=end)
+            stubs = [
+                make_stub(*row)
+                for row in events.order_by("date", "id").values_list(
+                    "id", "title", "date", "location"
+                )[:MAX_STUBS_PER_DAY + 1]
+            ]
+            count = events.count() if len(stubs) > MAX_STUBS_PER_DAY else len(stubs)
+            if count:
+                bucket.count = count
+                bucket.events = stubs[:MAX_STUBS_PER_DAY]
+                bucket.save()
+            else:
+                bucket.delete()
+
+
+def schedule_rebuild(days):
+    """Rebuild the buckets of `days` when the current transaction commits."""
+    days = {day for day in days if day is not None}
+    if days:
+        transaction.on_commit(lambda: rebuild_days(days))
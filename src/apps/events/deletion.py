@@ -0,0 +1,55 @@
+"""
+Soft deletion of events.
+
+Deleting an event with the ORM cascades over all its registrations in one
+transaction, which holds row locks on the registration table for as long
+as the delete takes. Instead, `soft_delete_event()` only marks the event,
+which hides it from `Event.objects`, and `purge_deleted_events()` (run by
+the purge_deleted_events command) removes the registrations, waitlist
+entries and finally the event row in short transactions of bounded size.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import shards
+from .models import Event, EventWaitlistEntry
+
+PURGE_BATCH_SIZE = 1000
+
+
+def soft_delete_event(event):
+    event.deleted_at = timezone.now()
+    event.save(update_fields=["deleted_at"])
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete the rows of `queryset` `batch_size` at a time, one transaction each. Returns the count."""
+    deleted = 0
+    while True:
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            queryset.model.objects.using(queryset.db).filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+def purge_deleted_events(batch_size=PURGE_BATCH_SIZE, deleted_before=None):
+    """
+    Remove soft-deleted events (deleted before `deleted_before`, if given)
+    with their registrations and waitlist entries.
+
+    Yields (event_id, registrations_deleted) for each purged event.
+    """
+    events = Event.all_objects.filter(deleted_at__isnull=False)
+    if deleted_before is not None:
+        events = events.filter(deleted_at__lt=deleted_before)
+
+    for pk in list(events.order_by("pk").values_list("pk", flat=True)):
+        registrations = sum(
+            delete_in_batches(queryset, batch_size) for queryset in shards.event_registrations(pk)
+        )
+        delete_in_batches(EventWaitlistEntry.objects.filter(event_id=pk), batch_size)
+        # Nothing is left to cascade over, so this is a single-row delete.
+        Event.all_objects.filter(pk=pk).delete()
+        yield pk, registrations
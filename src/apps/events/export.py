@@ -0,0 +1,54 @@
+"""
+Streaming CSV / NDJSON export.
+
+Rows are read with a server-side cursor (`QuerySet.iterator()`) and encoded
+a chunk at a time, so memory use stays bounded however many rows are
+exported, and the first bytes are sent as soon as the first chunk is read.
+"""
+import csv
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.db.models import QuerySet
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def encode_ndjson(header, rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield "".join(encoder.encode(dict(zip(header, row))) + "\n" for row in chunk)
+
+
+def export_response(queryset, header, output, filename):
+    """
+    Stream `queryset` (a values_list() queryset whose columns match `header`,
+    or an iterator of such rows) as a `output` ("csv" or "ndjson") file
+    attachment.
+    """
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE) if isinstance(queryset, QuerySet) else queryset
+    encode = encode_csv if output == "csv" else encode_ndjson
+    return StreamingHttpResponse(
+        encode(header, rows),
+        content_type=EXPORT_FORMATS[output],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{output}"'},
+    )
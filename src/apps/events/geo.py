@@ -0,0 +1,145 @@
+"""
+Geohash-based spatial lookups, without PostGIS.
+
+Every event with coordinates stores the geohash of its position. A geohash
+is a string in which every extra character narrows the cell the point lies
+in, so all points inside a cell share the cell's geohash as a prefix. A
+bounding box is covered by at most MAX_CELLS cells and the events in them
+are found with prefix (`LIKE 'u8c%'`) range scans of the geohash index;
+exact coordinates then discard the points outside the box or radius.
+"""
+import math
+
+from django.db.models import F, IntegerField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_LENGTH = 12
+EARTH_RADIUS_KM = 6371.0088
+# Upper bound on the prefix ranges scanned for one bounding box.
+MAX_CELLS = 16
+
+
+def spread_bits(value):
+    """Insert a zero bit above each of the low 32 bits of `value`."""
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    return (value | value << 1) & 0x5555555555555555
+
+
+def quantize(coordinate, low, span, bits):
+    return min(int((coordinate - low) / span * (1 << bits)), (1 << bits) - 1)
+
+
+def encode(latitude, longitude, length=GEOHASH_LENGTH):
+    # The bits of the cell indexes are interleaved, starting with longitude.
+    bits = 5 * length
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon = spread_bits(quantize(longitude, -180.0, 360.0, lon_bits))
+    lat = spread_bits(quantize(latitude, -90.0, 180.0, lat_bits))
+    value = lon << 1 | lat if lon_bits == lat_bits else lon | lat << 1
+    return "".join(BASE32[value >> shift & 31] for shift in range(bits - 5, -1, -5))
+
+
+def cell_size(length):
+    """(height, width) in degrees of the cells of geohashes of `length` characters."""
+    lon_bits = (5 * length + 1) // 2
+    lat_bits = 5 * length // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def grid_indexes(low, high, origin, size):
+    """Indexes of the grid cells of `size` degrees, counted from `origin`, overlapping [low, high]."""
+    last_cell = round(-2 * origin / size) - 1
+    return range(max(0, int((low - origin) // size)), min(last_cell, int((high - origin) // size)) + 1)
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_CELLS):
+    """
+    The geohashes of the cells covering the box, using the longest geohashes
+    for which at most `max_cells` cells are needed.
+    """
+    cells = [""]
+    for length in range(1, GEOHASH_LENGTH + 1):
+        height, width = cell_size(length)
+        rows = grid_indexes(min_lat, max_lat, -90.0, height)
+        columns = grid_indexes(min_lon, max_lon, -180.0, width)
+        if len(rows) * len(columns) > max_cells:
+            break
+        # Encoding the centre of every grid cell gives that cell's geohash.
+        cells = [
+            encode(-90.0 + (row + 0.5) * height, -180.0 + (column + 0.5) * width, length)
+            for row in rows
+            for column in columns
+        ]
+    return cells
+
+
+def radius_boxes(latitude, longitude, radius_km):
+    """
+    Bounding boxes (min_lat, min_lon, max_lat, max_lon) around a circle; two
+    when the circle crosses the antimeridian.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        # The circle contains a pole, so it spans every longitude.
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+    delta_lon = math.degrees(radius_km / EARTH_RADIUS_KM / math.cos(math.radians(latitude)))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if max_lon - min_lon >= 360.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def box_condition(boxes):
+    """Q matching the events inside any of `boxes`, led by geohash prefix lookups."""
+    condition = Q()
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        cells = Q()
+        for cell in covering_cells(min_lat, min_lon, max_lat, max_lon):
+            cells |= Q(geohash__startswith=cell)
+        condition |= cells & Q(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        )
+    return condition
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in whole metres from the point to the event's coordinates."""
+    half_dlat = (Radians(F("latitude")) - Value(math.radians(latitude))) / 2
+    half_dlon = (Radians(F("longitude")) - Value(math.radians(longitude))) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(math.radians(latitude))) * Cos(
+        Radians(F("latitude"))
+    ) * Power(Sin(half_dlon), 2)
+    metres = Value(2 * EARTH_RADIUS_KM * 1000) * ASin(Least(Sqrt(a), Value(1.0)))
+    # Whole metres compare exactly when the paginator resumes from a cursor.
+    return Cast(metres, IntegerField())
+
+
+def filter_near(queryset, latitude, longitude, radius_km):
+    """Events within `radius_km` of the point, annotated with their `distance` in metres."""
+    return queryset.filter(box_condition(radius_boxes(latitude, longitude, radius_km))).annotate(
+        distance=distance_expression(latitude, longitude)
+    ).filter(distance__lte=radius_km * 1000)
+
+
+def filter_box(queryset, min_lat, min_lon, max_lat, max_lon):
+    if min_lon > max_lon:
+        # The box crosses the antimeridian.
+        return queryset.filter(box_condition([
+            (min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)
+        ]))
+    return queryset.filter(box_condition([(min_lat, min_lon, max_lat, max_lon)]))
@@ -0,0 +1,59 @@
+"""
+iCalendar (RFC 5545) feed of an organizer's events.
+"""
+from datetime import timezone as dt_timezone
+
+# Fields that appear in the feed; saving only other fields leaves it unchanged.
+FEED_FIELDS = {"title", "description", "date", "location", "deleted_at"}
+# Lines longer than this many octets are folded (RFC 5545, section 3.1).
+MAX_LINE_OCTETS = 75
+
+
+def escape(text):
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def fold(line):
+    """Split `line` into CRLF-terminated lines of at most MAX_LINE_OCTETS octets."""
+    parts = []
+    current, size = "", 0
+    for char in line:
+        # Continuation lines start with a space, which counts towards their length.
+        char_size = len(char.encode())
+        if size + char_size > MAX_LINE_OCTETS:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def render_calendar(name, events, host, stamp):
+    """
+    Yield the feed line by line. `events` yields (id, title, description,
+    date, location) tuples; `stamp` is the DTSTAMP of every event.
+    """
+    yield fold("BEGIN:VCALENDAR")
+    yield fold("VERSION:2.0")
+    yield fold("PRODID:-//Event Management API//EN")
+    yield fold("CALSCALE:GREGORIAN")
+    yield fold(f"X-WR-CALNAME:{escape(name)}")
+    stamp = format_datetime(stamp)
+    for event_id, title, description, date, location in events:
+        yield fold("BEGIN:VEVENT")
+        yield fold(f"UID:event-{event_id}@{host}")
+        yield fold(f"DTSTAMP:{stamp}")
+        yield fold(f"DTSTART:{format_datetime(date)}")
+        yield fold(f"SUMMARY:{escape(title)}")
+        yield fold(f"DESCRIPTION:{escape(description)}")
+        yield fold(f"LOCATION:{escape(location)}")
+        yield fold("END:VEVENT")
+    yield fold("END:VCALENDAR")
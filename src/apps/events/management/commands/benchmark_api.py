@@ -0,0 +1,167 @@
+import json
+import random
+
+from django.db import connection, transaction
+from django.urls import reverse
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from apps.users.tokens import UserClaimsRefreshToken
+from apps.events import benchmark
+from apps.events.cache import get_cache, invalidate_event
+from apps.events.search import search_index
+
+CITIES = sorted(benchmark.CITY_COORDINATES)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a deterministic dataset, drive the main API endpoints in-process through the "
+        "DRF test client and report req/s, latency percentiles and query counts per endpoint "
+        "as JSON. All generated rows are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--events", type=int, default=5000)
+        parser.add_argument("--registrations", type=int, default=20000)
+        parser.add_argument("--iterations", type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument(
+            "--cold-cache",
+            action="store_true",
+            help="Clear the events response cache before every request.",
+        )
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+        parser.add_argument("--compare", help="A previous JSON result to print the changes against.")
+
+    def handle(self, *args, **options):
+        # The test environment allows the test client's host and keeps emails in memory.
+        try:
+            setup_test_environment()
+            teardown = True
+        except RuntimeError:
+            # Already set up, e.g. when run from a test.
+            teardown = False
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            if teardown:
+                teardown_test_environment()
+            # Forget responses and index entries of the rolled back rows.
+            invalidate_event()
+            search_index.clear()
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+            self.stderr.write(f"Compared with {baseline.get('commit') or options['compare']}:")
+            for name, metric, before, after, change in benchmark.compare(baseline, results):
+                change = f"{change:+.2f}" if metric == "queries" else f"{change:+.1%}"
+                self.stderr.write(f"  {name:<24} {metric:<10} {before:>10} -> {after:<10} {change}")
+
+    def run(self, options):
+        users, events = benchmark.seed_dataset(
+            options["seed"], options["users"], options["events"], options["registrations"]
+        )
+        rng = random.Random(options["seed"])
+        client = APIClient()
+        tokens = {}
+
+        def auth(user):
+            if user.pk not in tokens:
+                tokens[user.pk] = f"Bearer {UserClaimsRefreshToken.for_user(user).access_token}"
+            return {"HTTP_AUTHORIZATION": tokens[user.pk]}
+
+        def month_window(i):
+            month = rng.randrange(1, 12)
+            return {"date_from": f"2030-{month:02d}-01", "date_to": f"2030-{month + 1:02d}-01"}
+
+        def params(i):
+            location = rng.choice(benchmark.LOCATIONS)
+            return {"location": location, **month_window(i)}
+
+        created = []
+
+        def create(i):
+            response = client.post(
+                reverse("events-list"),
+                {
+                    "title": f"Benchmark event {i}",
+                    "description": "Created by benchmark_api",
+                    "date": "2030-06-01T10:00:00Z",
+                    "location": rng.choice(benchmark.LOCATIONS),
+                },
+                format="json",
+                **auth(users[i % len(users)]),
+            )
+            created.append(response.data["id"])
+            return response
+
+        def register(i):
+            # Every iteration is a distinct (user, new event) pair.
+            user = users[i % len(users)]
+            event_id = created[i // len(users) % len(created)]
+            return client.post(reverse("registration", args=[event_id]), **auth(user))
+
+        scenarios = {
+            "event list": lambda i: client.get(reverse("events-list")),
+            "event list compact": lambda i: client.get(
+                reverse("events-list"), {"fields": "id,title,date"}
+            ),
+            "event list filtered": lambda i: client.get(reverse("events-list"), params(i)),
+            "event list search": lambda i: client.get(
+                reverse("events-list"), {"search": rng.choice(benchmark.TOPICS)}
+            ),
+            "event calendar": lambda i: client.get(reverse("events-calendar"), month_window(i)),
+            "event list near": lambda i: client.get(
+                reverse("events-list"),
+                {"near": "{},{}".format(*benchmark.CITY_COORDINATES[rng.choice(CITIES)]), "radius": 10},
+            ),
+            "event retrieve": lambda i: client.get(
+                reverse("events-detail", args=[rng.choice(events).pk])
+            ),
+            "event create": create,
+            "event register": register,
+            "my registrations": lambda i: client.get(
+                reverse("registrations-me"), **auth(users[i % len(users)])
+            ),
+            # Spread over client IPs so that the login rate limits are not hit.
+            "login": lambda i: client.post(
+                reverse("auth-login"),
+                {"email": users[i % len(users)].email, "password": benchmark.BENCHMARK_PASSWORD},
+                format="json",
+                REMOTE_ADDR=f"10.0.{i // 256 % 256}.{i % 256}",
+            ),
+        }
+
+        cache = get_cache()
+        before_request = cache.clear if options["cold_cache"] else None
+        endpoints = {}
+        for name, make_request in scenarios.items():
+            self.stderr.write(f"Running {name}...")
+            endpoints[name] = benchmark.run_scenario(make_request, options["iterations"], before_request)
+
+        return {
+            "commit": benchmark.get_commit(),
+            "database": connection.vendor,
+            "seed": options["seed"],
+            "dataset": {
+                "users": options["users"],
+                "events": options["events"],
+                "registrations": options["registrations"],
+            },
+            "iterations": options["iterations"],
+            "cold_cache": options["cold_cache"],
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,156 @@
+import json
+import time
+import bisect
+import random
+
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from apps.users.models import CustomUser
+from apps.events import benchmark, geo
+from apps.events.models import Event
+
+# Share of the synthetic events placed around the benchmark cities; the
+# others are spread over the whole globe.
+CITY_SHARE = 0.8
+INSERT_BATCH_SIZE = 5000
+PAGE_SIZE = 20
+
+
+def make_points(seed, count):
+    rng = random.Random(seed)
+    cities = list(benchmark.CITY_COORDINATES.values())
+    points = []
+    for _ in range(count):
+        if rng.random() < CITY_SHARE:
+            points.append(benchmark.random_point(rng, *rng.choice(cities), benchmark.CITY_RADIUS_KM))
+        else:
+            points.append((rng.uniform(-85, 85), rng.uniform(-180, 180)))
+    return points
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark radius queries over synthetic events: geohash prefix lookups on a sorted "
+        "index against a full scan, and with --database the `near` filter through the ORM "
+        "on inserted events (rolled back at the end)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--events", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--scan-queries", type=int, default=3, help="Queries run as a full scan.")
+        parser.add_argument("--radius", type=float, default=10.0, help="Radius in km.")
+        parser.add_argument("--database", action="store_true", help="Also query inserted events.")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        self.stderr.write(f"Generating {options['events']} events...")
+        points = make_points(options["seed"], options["events"])
+        rng = random.Random(options["seed"] + 1)
+        centres = [
+            benchmark.random_point(rng, *rng.choice(list(benchmark.CITY_COORDINATES.values())), 30)
+            for _ in range(options["queries"])
+        ]
+        radius = options["radius"]
+
+        started = time.perf_counter()
+        index = sorted((geo.encode(*point), i) for i, point in enumerate(points))
+        hashes = [geohash for geohash, _ in index]
+        results = {
+            "commit": benchmark.get_commit(),
+            "events": len(points),
+            "queries": len(centres),
+            "radius_km": radius,
+            "index_build_s": round(time.perf_counter() - started, 2),
+        }
+
+        def indexed(latitude, longitude):
+            candidates = 0
+            found = set()
+            for box in geo.radius_boxes(latitude, longitude, radius):
+                for cell in geo.covering_cells(*box):
+                    # All geohashes starting with `cell` sort between these bounds.
+                    start, end = bisect.bisect_left(hashes, cell), bisect.bisect_left(hashes, cell + "~")
+                    candidates += end - start
+                    found.update(
+                        i for _, i in index[start:end]
+                        if geo.haversine_km(latitude, longitude, *points[i]) <= radius
+                    )
+            return found, candidates
+
+        def scan(latitude, longitude):
+            return {
+                i for i, point in enumerate(points)
+                if geo.haversine_km(latitude, longitude, *point) <= radius
+            }
+
+        self.stderr.write("Running geohash index queries...")
+        timings, candidates, matches = [], [], []
+        for centre in centres:
+            started = time.perf_counter()
+            found, examined = indexed(*centre)
+            timings.append(time.perf_counter() - started)
+            candidates.append(examined)
+            matches.append(len(found))
+        results["geohash_index"] = self.summary(timings)
+        results["geohash_index"]["mean_candidates"] = round(sum(candidates) / len(candidates), 1)
+        results["geohash_index"]["mean_matches"] = round(sum(matches) / len(matches), 1)
+
+        self.stderr.write("Running full scans...")
+        timings, mismatches = [], 0
+        for centre in centres[:options["scan_queries"]]:
+            started = time.perf_counter()
+            expected = scan(*centre)
+            timings.append(time.perf_counter() - started)
+            mismatches += expected != indexed(*centre)[0]
+        results["full_scan"] = self.summary(timings)
+        results["full_scan"]["mismatches"] = mismatches
+
+        if options["database"]:
+            with transaction.atomic():
+                results["database"] = self.run_database(points, centres, radius)
+                transaction.set_rollback(True)
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def run_database(self, points, centres, radius):
+        self.stderr.write(f"Inserting {len(points)} events...")
+        organizer = CustomUser.objects.create(
+            email=f"geo@{benchmark.BENCHMARK_EMAIL_DOMAIN}", full_name="Benchmark organizer"
+        )
+        for start in range(0, len(points), INSERT_BATCH_SIZE):
+            events = []
+            for i, (latitude, longitude) in enumerate(points[start:start + INSERT_BATCH_SIZE], start):
+                event = Event(
+                    title=f"Event {i}", description="", date=benchmark.BASE_DATE, location="",
+                    latitude=latitude, longitude=longitude, organizer=organizer,
+                )
+                event.update_geohash()
+                events.append(event)
+            Event.objects.bulk_create(events)
+
+        self.stderr.write("Running ORM queries...")
+        timings = []
+        for latitude, longitude in centres:
+            started = time.perf_counter()
+            # The first page of the list endpoint: nearest first.
+            list(geo.filter_near(Event.objects.all(), latitude, longitude, radius).order_by(
+                "distance", "id"
+            ).values_list("id", "distance")[:PAGE_SIZE])
+            timings.append(time.perf_counter() - started)
+        return self.summary(timings)
+
+    def summary(self, timings):
+        timings = sorted(timings)
+        return {
+            "mean_ms": round(sum(timings) / len(timings) * 1000, 3) if timings else 0.0,
+            "p50_ms": round(benchmark.percentile(timings, 0.50) * 1000, 3),
+            "p99_ms": round(benchmark.percentile(timings, 0.99) * 1000, 3),
+        }
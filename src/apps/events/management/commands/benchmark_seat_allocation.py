@@ -0,0 +1,82 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import IntegrityError, OperationalError, connection
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events import seats
+from apps.events.models import Event, EmailOutbox
+from apps.users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Register many users for one capacity-limited event from concurrent threads "
+        "and check that the event is never overbooked. Runs against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--capacity", type=int, default=100)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--keep", action="store_true", help="Do not delete the generated rows.")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        domain = f"bench-{run_id}.invalid"
+
+        organizer = CustomUser.objects.create(email=f"organizer@{domain}", full_name="Benchmark organizer")
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f"user{i}@{domain}", full_name=f"Benchmark user {i}")
+            for i in range(options["users"])
+        ])
+        event = Event.objects.create(
+            title=f"Seat allocation benchmark {run_id}",
+            description="Generated by benchmark_seat_allocation",
+            date=timezone.now(),
+            location="Benchmark",
+            capacity=options["capacity"],
+            organizer=organizer,
+        )
+
+        def register(user):
+            try:
+                seats.register(user=user, event=event)
+                return "registered"
+            except seats.EventFull:
+                return "full"
+            except IntegrityError:
+                return "duplicate"
+            except OperationalError:
+                # e.g. "database is locked" on SQLite
+                return "error"
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                outcomes = list(executor.map(register, users))
+            elapsed = time.perf_counter() - started
+
+            event.refresh_from_db()
+            registrations = event.registrations.count()
+            self.stdout.write(
+                f"{len(users)} attempts on {options['threads']} threads in {elapsed:.2f}s "
+                f"({len(users) / elapsed:.0f} attempts/s)\n"
+                f"registered={outcomes.count('registered')} full={outcomes.count('full')} "
+                f"errors={outcomes.count('error')}\n"
+                f"capacity={event.capacity} registrations_count={event.registrations_count} "
+                f"registrations={registrations}"
+            )
+
+            if registrations > event.capacity or registrations != event.registrations_count:
+                raise CommandError("Event was overbooked or its seat counter drifted.")
+            self.stdout.write(self.style.SUCCESS("No overbooking."))
+        finally:
+            if not options["keep"]:
+                event.delete()
+                CustomUser.objects.filter(email__endswith=f"@{domain}").delete()
+                EmailOutbox.objects.filter(recipient__endswith=f"@{domain}").delete()
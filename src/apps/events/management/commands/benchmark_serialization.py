@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core import renderers
+from apps.events import benchmark
+from apps.events.serializers import EventSerializer
+
+PER_EVENTS = 10000
+FIELDSETS = {
+    "full": {},
+    "compact": {"fields": "id,title,date"},
+    "without description": {"omit": "description"},
+}
+RENDERERS = {"json": JSONRenderer, "orjson": renderers.ORJSONRenderer}
+
+
+class Command(BaseCommand):
+    help = (
+        f"Measure EventSerializer and JSON rendering cost per {PER_EVENTS} events for the "
+        "full, compact (`?fields=id,title,date`) and no-description fieldsets, with DRF's "
+        "JSONRenderer and the orjson renderer. Runs in memory; the database is not used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--events", type=int, default=PER_EVENTS)
+        parser.add_argument("--repeat", type=int, default=5, help="Best of this many runs is reported.")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        events = benchmark.build_events(options["seed"], options["events"])
+        scale = PER_EVENTS / len(events) * 1000
+        factory = APIRequestFactory()
+        fieldsets = {}
+        for name, params in FIELDSETS.items():
+            self.stderr.write(f"Running {name}...")
+            context = {"request": Request(factory.get("/", params))}
+            serializer_time = benchmark.best_time(
+                lambda: EventSerializer(events, many=True, context=context).data, options["repeat"]
+            )
+            data = EventSerializer(events, many=True, context=context).data
+            fieldsets[name] = {
+                "serializer_ms": round(serializer_time * scale, 1),
+                "render_ms": {
+                    renderer_name: round(
+                        benchmark.best_time(lambda: renderer_class().render(data), options["repeat"]) * scale,
+                        1,
+                    )
+                    for renderer_name, renderer_class in RENDERERS.items()
+                },
+                "bytes": len(JSONRenderer().render(data)) * PER_EVENTS // len(events),
+            }
+
+        output = json.dumps({
+            "commit": benchmark.get_commit(),
+            "orjson": renderers.orjson is not None,
+            "events": len(events),
+            "per_events": PER_EVENTS,
+            "repeat": options["repeat"],
+            "fieldsets": fieldsets,
+        }, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
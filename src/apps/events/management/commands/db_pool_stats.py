@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.db.pool import check_pools, get_pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the database connection pool configuration and statistics as JSON. "
+        "Pools are per process: use GET /api/db/pool-stats/ for the numbers of a running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Open the pools and health-check their idle connections first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            for alias in check_pools():
+                self.stdout.write(self.style.SUCCESS(f"Checked pool {alias}"))
+        self.stdout.write(json.dumps(get_pool_stats(), indent=2))
@@ -0,0 +1,99 @@
+import re
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events import shards
+from apps.events.models import Event, EventRegistration
+from apps.events.pagination import EventCursorPagination
+from apps.events.views import EventFilter, EventViewSet
+
+# Plan nodes that read a whole table instead of going through an index.
+SEQUENTIAL_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)$", re.MULTILINE),
+}
+
+
+def build_list_queryset(params):
+    """The queryset EventViewSet.list runs for `params`: filtered, ordered and sliced to one page."""
+    queryset = EventFilter(data=params, queryset=EventViewSet.queryset).qs
+    paginator = EventCursorPagination()
+    paginator.key, paginator.descending = paginator.get_key(queryset)
+    return queryset.order_by(*paginator.get_ordering(reverse=False))[:paginator.page_size + 1]
+
+
+def get_canonical_queries():
+    event = Event.objects.only("id", "organizer_id").first()
+    event_id = event.pk if event else 1
+    user_id = event.organizer_id if event else 1
+
+    queries = {
+        "event list": build_list_queryset({}),
+        "event list by date range": build_list_queryset({"date_from": "2030-01-01", "date_to": "2030-02-01"}),
+        "event list by location": build_list_queryset({"location": "Kyiv"}),
+        "event list by location and date range": build_list_queryset(
+            {"location": "Kyiv", "date_from": "2030-01-01", "date_to": "2030-02-01"}
+        ),
+        "event retrieve": EventViewSet.queryset.filter(pk=event_id),
+        "organizer events export": Event.objects.filter(organizer_id=user_id).order_by("date", "id"),
+        "event registrations export": shards.event_registrations(event_id)[0].order_by("id"),
+        # The query run on every shard.
+        "user registrations": EventRegistration.objects.using(shards.all_shards()[0]).filter(user_id=user_id)
+        .order_by("-registered_at", "-id").values_list("id", "event_id", "registered_at")[:21],
+    }
+    if connection.vendor == "postgresql":
+        # Other databases search with the in-memory index.
+        queries["event list search"] = build_list_queryset({"search": "conference"})
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the canonical queries built from EventViewSet/EventFilter and flag "
+        "plans that fall back to a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-planner-settings",
+            action="store_true",
+            help=(
+                "PostgreSQL only: do not disable sequential scans while planning. By default they "
+                "are disabled so that a small development table still shows whether an index "
+                "can serve the query."
+            ),
+        )
+        parser.add_argument("--analyze", action="store_true", help="PostgreSQL only: EXPLAIN ANALYZE.")
+        parser.add_argument("--strict", action="store_true", help="Exit with an error if any plan is flagged.")
+
+    def handle(self, *args, **options):
+        pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Unsupported database backend: {connection.vendor}")
+
+        flagged = []
+        with transaction.atomic():
+            explain_options = {}
+            if connection.vendor == "postgresql":
+                if not options["keep_planner_settings"]:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                if options["analyze"]:
+                    explain_options["analyze"] = True
+
+            for name, queryset in get_canonical_queries().items():
+                plan = queryset.explain(**explain_options)
+                tables = sorted(set(pattern.findall(plan)))
+                if tables:
+                    flagged.append(name)
+                    self.stdout.write(self.style.WARNING(f"SEQUENTIAL SCAN {name} ({', '.join(tables)})"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK {name}"))
+                if options["verbosity"] > 1 or tables:
+                    self.stdout.write(plan + "\n")
+
+            transaction.set_rollback(True)
+
+        if flagged and options["strict"]:
+            raise CommandError(f"{len(flagged)} query plan(s) use a sequential scan.")
@@ -0,0 +1,65 @@
+import csv
+import sys
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.bulk import BULK_BATCH_SIZE, import_events
+from apps.users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Import events from a CSV or JSON Lines file (use '-' for stdin). The input is "
+        "streamed and inserted in batches, so memory use does not grow with the file size. "
+        "Columns/keys: title, description, date, location and optionally capacity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--organizer", required=True, help="Email of the organizer of the imported events.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            organizer = CustomUser.objects.get(email=options["organizer"])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['organizer']} does not exist.")
+
+        path = options["path"]
+        input_format = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        if path == "-":
+            return self.run(sys.stdin, input_format, organizer, options)
+        with open(path, newline="", encoding="utf-8") as file:
+            return self.run(file, input_format, organizer, options)
+
+    def run(self, file, input_format, organizer, options):
+        rows = read_csv(file) if input_format == "csv" else read_jsonl(file)
+        created = failed = 0
+
+        for result in import_events(organizer, rows, batch_size=options["batch_size"]):
+            if "id" in result:
+                created += 1
+                continue
+            failed += 1
+            # Report the 1-based record number, which for CSV excludes the header.
+            self.stderr.write(f"Record {result['index'] + 1}: {result['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} event(s), {failed} failed."))
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield {key: value for key, value in row.items() if value != ""}
+
+
+def read_jsonl(file):
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # Passed through as a string so the serializer reports it as invalid.
+            yield line
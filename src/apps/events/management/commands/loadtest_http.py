@@ -0,0 +1,93 @@
+import time
+import asyncio
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.benchmark import percentile
+
+
+async def fetch(host, port, raw_request, timeout):
+    """Send one HTTP/1.1 request on a new connection and return the status code."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(raw_request)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        # "Connection: close" lets the body be read to EOF without parsing headers.
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running server with many concurrent clients and report throughput "
+        "and latency percentiles. Compare e.g. `runserver` (WSGI) with "
+        "`uvicorn core.asgi:application` against /api/events/ and /api/async/events/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://127.0.0.1:8001/api/async/events/")
+        parser.add_argument("--concurrency", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=10000, help="Total number of requests.")
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--token", help="JWT access token sent as a Bearer token.")
+        parser.add_argument("--data", default="", help="Request body, sent as JSON.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only http:// URLs are supported.")
+
+        headers = [
+            f"{options['method'].upper()} {url.path or '/'}{'?' + url.query if url.query else ''} HTTP/1.1",
+            f"Host: {url.netloc}",
+            "Connection: close",
+        ]
+        body = options["data"].encode()
+        if options["token"]:
+            headers.append(f"Authorization: Bearer {options['token']}")
+        if body:
+            headers += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        raw_request = ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+        latencies, statuses, elapsed = asyncio.run(self.run(
+            url.hostname, url.port or 80, raw_request,
+            options["concurrency"], options["requests"], options["timeout"],
+        ))
+
+        latencies.sort()
+        completed = len(latencies)
+        self.stdout.write(
+            f"{completed} requests, concurrency {options['concurrency']}, {elapsed:.2f}s "
+            f"({completed / elapsed:.0f} req/s)\n"
+            f"p50={percentile(latencies, 0.50) * 1000:.1f}ms "
+            f"p95={percentile(latencies, 0.95) * 1000:.1f}ms "
+            f"p99={percentile(latencies, 0.99) * 1000:.1f}ms\n"
+            f"statuses: {', '.join(f'{code}={count}' for code, count in sorted(statuses.items(), key=str))}"
+        )
+
+    async def run(self, host, port, raw_request, concurrency, total, timeout):
+        latencies = []
+        statuses = Counter()
+        remaining = iter(range(total))
+
+        async def client():
+            # Each client takes the next request number until all have been sent.
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    status = await fetch(host, port, raw_request, timeout)
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError) as e:
+                    statuses[type(e).__name__] += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, statuses, time.perf_counter() - started
@@ -0,0 +1,54 @@
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.partitions import (
+    ARCHIVE_BATCH_SIZE, ARCHIVE_SCHEMA, MONTHS_AHEAD, NotPartitioned, add_months, archive_partitions,
+    ensure_partitions, month_of,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly partitions of the events table for the coming --months-ahead months and, "
+        f"with --archive-after, move the partitions of older months to the {ARCHIVE_SCHEMA} schema "
+        "together with the registrations of their events. Run it daily; PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+        parser.add_argument(
+            "--archive-after",
+            type=int,
+            help="Archive the months that ended at least this many months ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help="Events whose registrations are archived per transaction.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be done.")
+
+    def handle(self, *args, **options):
+        try:
+            created = ensure_partitions(options["months_ahead"], dry_run=options["dry_run"])
+            verb = "Missing" if options["dry_run"] else "Created"
+            for month in created:
+                self.stdout.write(f"{verb} partition {month:%Y-%m}")
+
+            archived = 0
+            if options["archive_after"] is not None:
+                before = add_months(month_of(timezone.now()), -options["archive_after"])
+                verb = "To archive" if options["dry_run"] else "Archived"
+                for month, events, registrations in archive_partitions(
+                    before, options["batch_size"], options["dry_run"]
+                ):
+                    archived += 1
+                    self.stdout.write(f"{verb} {month:%Y-%m}: {events} event(s), {registrations} registration(s)")
+        except NotPartitioned:
+            raise CommandError("The events table is not partitioned; this command requires PostgreSQL.")
+
+        if not options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Created {len(created)} partition(s), archived {archived} month(s)."
+            ))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from apps.events.deletion import PURGE_BATCH_SIZE, purge_deleted_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove soft-deleted events together with their registrations and waitlist entries, "
+        "in short transactions of --batch-size rows so that writers are never blocked for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=0,
+            help="Only purge events deleted at least this many minutes ago.",
+        )
+
+    def handle(self, *args, **options):
+        deleted_before = None
+        if options["older_than"]:
+            deleted_before = timezone.now() - timedelta(minutes=options["older_than"])
+
+        purged = 0
+        for pk, registrations in purge_deleted_events(options["batch_size"], deleted_before):
+            purged += 1
+            self.stdout.write(f"Purged event {pk} and {registrations} registration(s)")
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} event(s)."))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.seats import RECONCILE_BATCH_SIZE, reconcile_registrations_count
+
+
+class Command(BaseCommand):
+    help = "Repair events whose registrations_count does not match their registrations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only report drifted events.")
+
+    def handle(self, *args, **options):
+        if settings.REGISTRATION_SHARDS_PREVIOUS and not options["dry_run"]:
+            raise CommandError("A reshard is in progress; run reshard_registrations first.")
+        drifted = 0
+        for pk, stored, actual in reconcile_registrations_count(
+            batch_size=options["batch_size"], dry_run=options["dry_run"]
+        ):
+            drifted += 1
+            self.stdout.write(f"Event {pk}: registrations_count={stored}, registrations={actual}")
+
+        if options["dry_run"]:
+            self.stdout.write(f"{drifted} event(s) drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {drifted} event(s)."))
@@ -0,0 +1,35 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.shards import RESHARD_BATCH_SIZE, reshard
+
+
+class Command(BaseCommand):
+    help = (
+        "Move event registrations from the shards of REGISTRATION_SHARDS_PREVIOUS to their "
+        "shard in the current layout, in transactions of --batch-size rows, while the API "
+        "keeps serving. Unset REGISTRATION_SHARDS_PREVIOUS once it is done."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RESHARD_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be moved.")
+
+    def handle(self, *args, **options):
+        if not settings.REGISTRATION_SHARDS_PREVIOUS:
+            raise CommandError("REGISTRATION_SHARDS_PREVIOUS is not set; there is no reshard in progress.")
+
+        moved = Counter()
+        for event_id, source, target, registrations in reshard(options["batch_size"], options["dry_run"]):
+            moved[source, target] += registrations
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Event {event_id}: {registrations} registration(s) {source} -> {target}")
+
+        for (source, target), registrations in sorted(moved.items()):
+            self.stdout.write(f"{source} -> {target}: {registrations} registration(s)")
+        if options["dry_run"]:
+            self.stdout.write(f"{sum(moved.values())} registration(s) to move.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Moved {sum(moved.values())} registration(s)."))
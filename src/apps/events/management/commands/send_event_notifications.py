@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.events.notifications import NOTIFICATION_CHUNK_SIZE, send_due_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Email the due event reminders and change notices to every attendee over a single SMTP "
+        "connection, loading --chunk-size attendees at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=NOTIFICATION_CHUNK_SIZE)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep checking for due notifications instead of exiting once none is left.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="Seconds to sleep between checks when nothing is due (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        total_notifications = total_sent = 0
+
+        while True:
+            for notification, sent in send_due_notifications(options["chunk_size"]):
+                total_notifications += 1
+                total_sent += sent
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{notification}: {sent} email(s)")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {total_notifications} notification(s), sent {total_sent} email(s)."
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:31
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}description, '')), 'B')"
+)
+
+
+def create_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION events_event_search_vector_update() RETURNS trigger AS $$ "
+        "BEGIN NEW.search_vector := " + SEARCH_VECTOR_SQL.format(row="NEW.") + "; RETURN NEW; END "
+        "$$ LANGUAGE plpgsql"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER events_event_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE OF title, description ON events_event "
+        "FOR EACH ROW EXECUTE FUNCTION events_event_search_vector_update()"
+    )
+    schema_editor.execute("UPDATE events_event SET search_vector = " + SEARCH_VECTOR_SQL.format(row=""))
+    schema_editor.execute(
+        "CREATE INDEX event_search_vector_idx ON events_event USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX event_title_trgm_idx ON events_event USING gin (title gin_trgm_ops)"
+    )
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS event_title_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS event_search_vector_idx")
+    schema_editor.execute("DROP TRIGGER IF EXISTS events_event_search_vector_trigger ON events_event")
+    schema_editor.execute("DROP FUNCTION IF EXISTS events_event_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_registrations_count(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    EventRegistration = apps.get_model("events", "EventRegistration")
+    db_alias = schema_editor.connection.alias
+    counts = EventRegistration.objects.using(db_alias).filter(event=OuterRef("pk")).order_by().values("event").annotate(
+        count=Count("id")
+    ).values("count")
+    Event.objects.using(db_alias).update(registrations_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of registrations; empty means unlimited.', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='registrations_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_registrations_count, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='EventWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='events.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Event waitlist entry',
+                'verbose_name_plural': 'Event waitlist entries',
+                'ordering': ('id',),
+                'unique_together': {('user', 'event')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:39
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_capacity_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Lower('location'), models.F('date'), models.F('id'), name='event_location_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'date', 'id'], name='event_organizer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['user', 'registered_at', 'id'], include=('event',), name='registration_user_covering_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:00
+
+from django.db import migrations, models
+from django.utils import timezone
+
+MAX_STUBS_PER_DAY = 20
+
+
+def backfill_day_buckets(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    EventDayBucket = apps.get_model("events", "EventDayBucket")
+    db_alias = schema_editor.connection.alias
+    buckets = {}
+    events = Event.objects.using(db_alias).filter(deleted_at__isnull=True).order_by("date", "id").values_list(
+        "id", "title", "date", "location"
+    )
+    for event_id, title, date, location in events.iterator():
+        date = timezone.localtime(date)
+        bucket = buckets.setdefault(date.date(), EventDayBucket(day=date.date(), count=0, events=[]))
+        bucket.count += 1
+        if len(bucket.events) < MAX_STUBS_PER_DAY:
+            bucket.events.append({
+                "id": event_id, "title": title, "time": date.time().isoformat(), "location": location,
+            })
+    EventDayBucket.objects.using(db_alias).bulk_create(buckets.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDayBucket',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('events', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Event day bucket',
+                'verbose_name_plural': 'Event day buckets',
+                'ordering': ('day',),
+            },
+        ),
+        migrations.RunPython(backfill_day_buckets, migrations.RunPython.noop),
+    ]
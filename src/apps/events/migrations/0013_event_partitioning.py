@@ -0,0 +1,113 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = "events_event"
+
+
+def get_table_objects(cursor):
+    """The index, foreign key and trigger definitions of the events table, to replay on its replacement."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+        [TABLE, f"{TABLE}_pkey"],
+    )
+    # Indexes of a partitioned table are defined ON ONLY the parent.
+    statements = [indexdef.replace(" ON ONLY ", " ON ") for (indexdef,) in cursor.fetchall()]
+    cursor.execute(
+        "SELECT format('ALTER TABLE %%I ADD CONSTRAINT %%I %%s', %s::text, conname, pg_get_constraintdef(oid)) "
+        "FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE, TABLE],
+    )
+    statements += [statement for (statement,) in cursor.fetchall()]
+    cursor.execute(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+        [TABLE],
+    )
+    statements += [statement for (statement,) in cursor.fetchall()]
+    return statements
+
+
+def next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def partition_events(apps, schema_editor):
+    """
+    Rebuild the events table as a table partitioned by range of `date`, with
+    a partition per month that has events and a default partition.
+
+    A unique index on a partitioned table must contain the partition key, so
+    the primary key becomes (id, date), and ids come from a sequence because
+    partitioned tables cannot have identity columns.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        statements = get_table_objects(cursor)
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM {TABLE} ORDER BY 1"
+        )
+        months = [month for (month,) in cursor.fetchall()]
+
+    schema_editor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned")
+    schema_editor.execute(
+        f"CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (date)"
+    )
+    for month in months:
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{next_month(month):%Y-%m-%d} 00:00:00+00')"
+        )
+    schema_editor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+    schema_editor.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned")
+    schema_editor.execute(f"DROP TABLE {TABLE}_unpartitioned")
+
+    schema_editor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date)")
+    schema_editor.execute(f"CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    schema_editor.execute(f"SELECT setval('{TABLE}_id_seq', coalesce(max(id), 0) + 1, false) FROM {TABLE}")
+    schema_editor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def unpartition_events(apps, schema_editor):
+    """Rebuild the events table as a plain table. Archived partitions are left in their schema."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        statements = get_table_objects(cursor)
+
+    schema_editor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned")
+    schema_editor.execute(f"CREATE TABLE {TABLE} (LIKE {TABLE}_partitioned INCLUDING CONSTRAINTS)")
+    schema_editor.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned")
+    # Drops the partitions and the id sequence along with it.
+    schema_editor.execute(f"DROP TABLE {TABLE}_partitioned")
+
+    schema_editor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)")
+    schema_editor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), coalesce(max(id), 0) + 1, false) FROM {TABLE}"
+    )
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_registration_sharding'),
+    ]
+
+    operations = [
+        # The waitlist loses its foreign key constraint first: a foreign key
+        # cannot reference the partitioned table's (id, date) primary key.
+        migrations.AlterField(
+            model_name='eventwaitlistentry',
+            name='event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='events.event'),
+        ),
+        migrations.RunPython(partition_events, unpartition_events),
+    ]
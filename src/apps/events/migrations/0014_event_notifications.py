@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_event_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reminder', 'Reminder'), ('change', 'Change')], max_length=16)),
+                ('changes', models.TextField(blank=True)),
+                ('bucket', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('cancelled', 'Cancelled'), ('dead', 'Dead')], default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Event notification',
+                'verbose_name_plural': 'Event notifications',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['event', 'user'], name='registration_event_user_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventnotification',
+            name='event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='events.event'),
+        ),
+        migrations.AddIndex(
+            model_name='eventnotification',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['bucket', 'id'], name='notification_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventnotification',
+            index=models.Index(fields=['event', 'kind'], name='notification_event_kind_idx'),
+        ),
+    ]
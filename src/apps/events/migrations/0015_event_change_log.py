@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_created_changes(apps, schema_editor):
+    # A client syncing from the start gets every existing event.
+    Event = apps.get_model("events", "Event")
+    EventChange = apps.get_model("events", "EventChange")
+    db_alias = schema_editor.connection.alias
+    event_ids = Event.objects.using(db_alias).filter(deleted_at__isnull=True).order_by("id").values_list(
+        "id", flat=True
+    )
+    EventChange.objects.using(db_alias).bulk_create(
+        (EventChange(event_id=event_id, action="created") for event_id in event_ids.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=16)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+            ],
+            options={
+                'verbose_name': 'Event change',
+                'verbose_name_plural': 'Event changes',
+            },
+        ),
+        migrations.RunPython(backfill_created_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+def default_to_transaction_id(apps, schema_editor):
+    # Existing entries keep 0 and sort before every new one, in id order.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE events_eventchange ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint"
+    )
+
+
+def default_to_zero(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("ALTER TABLE events_eventchange ALTER COLUMN txid SET DEFAULT 0")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_event_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventchange',
+            name='txid',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='eventchange',
+            index=models.Index(fields=['txid', 'id'], name='event_change_txid_id_idx'),
+        ),
+        migrations.RunPython(default_to_transaction_id, default_to_zero),
+    ]
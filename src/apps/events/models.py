@@ -1,46 +1,292 @@
 from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models import F
+from django.utils import timezone
+from django.db.models.functions import Lower
+from django.contrib.postgres.search import SearchVectorField
 
 from apps.users.models import CustomUser
+from . import geo
+
+
+class EventManager(models.Manager):
+    """Hides soft-deleted events; `Event.all_objects` includes them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 # Create your models here.
+# On PostgreSQL the table is partitioned by month of `date`, see apps.events.partitions.
 class Event(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateTimeField()
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Geohash of (latitude, longitude), empty without coordinates, see apps.events.geo.
+    geohash = models.CharField(max_length=geo.GEOHASH_LENGTH, blank=True, default="", editable=False)
     organizer = models.ForeignKey(
         verbose_name="Event organizer",
         to=CustomUser,
         on_delete=models.CASCADE,
         related_name="events"
     )
+    capacity = models.PositiveIntegerField(
+        blank=True, null=True, help_text="Maximum number of registrations; empty means unlimited."
+    )
+    # Number of confirmed registrations, changed only by apps.events.seats.
+    registrations_count = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by a database trigger on PostgreSQL, see migration 0006.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set when the event is deleted; its registrations and the row itself are
+    # removed later in batches by the purge_deleted_events command.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = EventManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "Event"
         verbose_name_plural = "Events"
+        # Related object access (registration.event) still sees deleted events.
+        base_manager_name = "all_objects"
+        indexes = [
+            # Keyset pagination and date range filters.
+            models.Index(fields=["date", "id"], name="event_date_id_idx"),
+            # Location filter (matched case-insensitively through Lower()),
+            # ordered so a location + date range is one index range scan.
+            models.Index(Lower("location"), F("date"), F("id"), name="event_location_date_idx"),
+            models.Index(fields=["organizer", "date", "id"], name="event_organizer_date_idx"),
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="event_deleted_idx",
+            ),
+            # Prefix (LIKE 'abc%') scans by geohash cell.
+            models.Index(fields=["geohash"], opclasses=["varchar_pattern_ops"], name="event_geohash_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def update_geohash(self):
+        """Set `geohash` from the coordinates; bulk_create() does not call save()."""
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ""
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"latitude", "longitude"}.intersection(update_fields):
+            self.update_geohash()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
 
 class EventRegistration(models.Model):
+    # Registrations can live in another database than their user and event
+    # (see apps.events.shards), so the foreign keys are not enforced by the
+    # database; deletions still cascade through the ORM.
     user = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
-        related_name="event_registrations"
+        related_name="event_registrations",
+        db_constraint=False,
     )
     event = models.ForeignKey(
         Event,
         on_delete=models.CASCADE,
-        related_name="registrations"
+        related_name="registrations",
+        db_constraint=False,
     )
-    registered_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so that resharding keeps it when copying a registration.
+    registered_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         verbose_name = "Event registration"
         verbose_name_plural = "Event registrations"
         unique_together = ("user", "event")
+        indexes = [
+            # A user's registrations newest first, answered from the index alone.
+            models.Index(
+                fields=["user", "registered_at", "id"],
+                include=["event"],
+                name="registration_user_covering_idx",
+            ),
+            # An event's attendees by user, walked in chunks by apps.events.notifications.
+            models.Index(fields=["event", "user"], name="registration_event_user_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} --> {self.event.title}"
+
+
+class EventWaitlistEntry(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="event_waitlist_entries"
+    )
+    # No database constraint: a foreign key cannot reference the partitioned
+    # events table, whose primary key is (id, date).
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+        db_constraint=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Event waitlist entry"
+        verbose_name_plural = "Event waitlist entries"
+        unique_together = ("user", "event")
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"{self.user.full_name} ... {self.event.title}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued in the same transaction as the change that caused it
+    and delivered later by the `send_outbox_emails` management command.
+    """
+    MAX_ATTEMPTS = 5
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        DEAD = "dead", "Dead"
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    recipient = models.EmailField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Email outbox message"
+        verbose_name_plural = "Email outbox"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject} ({self.status})"
+
+
+class EventNotification(models.Model):
+    """
+    An email to every attendee of an event: a reminder before it starts or a
+    notice that it changed. Sent by apps.events.notifications once its
+    `bucket` is due.
+    """
+    MAX_ATTEMPTS = 5
+
+    class Kind(models.TextChoices):
+        REMINDER = "reminder", "Reminder"
+        CHANGE = "change", "Change"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        CANCELLED = "cancelled", "Cancelled"
+        DEAD = "dead", "Dead"
+
+    # Not enforced by the database, which cannot reference the partitioned events table.
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        db_constraint=False,
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    # What changed, one "Field: old -> new" line each, for change notifications.
+    changes = models.TextField(blank=True)
+    # The start of the time bucket the notification is due in; retries and
+    # the lease of the worker sending it move it to a later bucket.
+    bucket = models.DateTimeField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Attendees are notified in order of user id; the last one notified.
+    last_user_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Event notification"
+        verbose_name_plural = "Event notifications"
+        indexes = [
+            models.Index(
+                fields=["bucket", "id"],
+                condition=models.Q(status="pending"),
+                name="notification_pending_idx",
+            ),
+            models.Index(fields=["event", "kind"], name="notification_event_kind_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for event {self.event_id} ({self.status})"
+
+
+class EventChange(models.Model):
+    """
+    An entry of the events change log, see apps.events.change_log. The feed
+    is ordered by (txid, id), the id of the writing transaction and of the
+    entry.
+    """
+
+    class Action(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+
+    # Not a foreign key: tombstones outlive the rows of deleted events.
+    event_id = models.BigIntegerField()
+    action = models.CharField(max_length=16, choices=Action.choices)
+    changed_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set by the database on PostgreSQL (pg_current_xact_id), 0 elsewhere.
+    txid = models.BigIntegerField(db_default=0, editable=False)
+
+    class Meta:
+        verbose_name = "Event change"
+        verbose_name_plural = "Event changes"
+        indexes = [
+            models.Index(fields=["txid", "id"], name="event_change_txid_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk}: event {self.event_id} {self.action}"
+
+
+class EventDayBucket(models.Model):
+    """
+    Number of events on a day and stubs (id, title, time, location) of the
+    first of them, maintained by apps.events.day_buckets.
+    """
+    day = models.DateField(primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    events = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Event day bucket"
+        verbose_name_plural = "Event day buckets"
+        ordering = ("day",)
+
+    def __str__(self):
+        return f"{self.day}: {self.count}"
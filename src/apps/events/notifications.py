@@ -0,0 +1,253 @@
+"""
+Reminders and change notices emailed to every attendee of an event.
+
+Both are EventNotification rows queued next to the change that causes them:
+a reminder when an event is created or moved, due
+settings.EVENT_REMINDER_LEAD_HOURS before it starts, and a change notice
+when its title, date or location is updated. Every row is due at the start
+of the NOTIFICATION_BUCKET wide time bucket of its due time, and only
+pending rows are indexed by bucket, so finding the due notifications reads
+the due buckets alone, never the events table or the notifications already
+sent.
+
+`send_due_notifications()` (the send_event_notifications command) claims a
+due notification with SKIP LOCKED, leasing it by moving it
+NOTIFICATION_LEASE ahead, and walks the registrations of its event by user
+id, NOTIFICATION_CHUNK_SIZE at a time on every shard, so memory is bounded
+by the chunk whatever the size of the event. Each attendee gets a message of
+their own over the SMTP connection of the whole run, opened before the first
+one is sent, and the last user id notified is saved after every message: a
+notification that failed, or whose worker died, is resumed right after the
+last attendee reached once its lease runs out; only a message in flight
+when it stopped can be sent twice.
+
+A message the server refuses (an unknown address, a full mailbox, ...) is
+handed to the email outbox, which retries it on its own, so one bad address
+does not hold back the attendees after it. When the connection cannot be
+opened or breaks, the notification is retried with backoff like the outbox,
+and the next one opens a new connection.
+"""
+import smtplib
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from apps.users.models import CustomUser
+from . import shards
+from .models import EmailOutbox, Event, EventNotification
+from .utils import get_outbox_retry_delay
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BUCKET = timedelta(minutes=1)
+NOTIFICATION_LEASE = timedelta(minutes=10)
+NOTIFICATION_CHUNK_SIZE = 500
+# Changes to these fields are announced to the attendees.
+NOTIFIED_FIELDS = ("title", "date", "location")
+# The server answered, refusing this message: the connection is still usable.
+RECIPIENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)
+
+
+def bucket_of(value):
+    """The start of the bucket `value` falls in."""
+    width = NOTIFICATION_BUCKET.total_seconds()
+    return datetime.fromtimestamp(value.timestamp() // width * width, tz=dt_timezone.utc)
+
+
+def bucket_after(value):
+    """The first bucket starting after `value`, for retries and leases that must not be due sooner."""
+    return bucket_of(value) + NOTIFICATION_BUCKET
+
+
+def format_date(value):
+    return timezone.localtime(value).strftime("%B %d, %Y %H:%M")
+
+
+def build_reminder(event, now):
+    if event.date <= now:
+        return None
+    due = event.date - timedelta(hours=settings.EVENT_REMINDER_LEAD_HOURS)
+    return EventNotification(event=event, kind=EventNotification.Kind.REMINDER, bucket=bucket_of(max(due, now)))
+
+
+def schedule_reminders(events):
+    """Queue the reminders of the new `events`."""
+    now = timezone.now()
+    EventNotification.objects.bulk_create(
+        reminder for reminder in (build_reminder(event, now) for event in events) if reminder is not None
+    )
+
+
+def reschedule_reminder(event):
+    EventNotification.objects.filter(
+        event=event, kind=EventNotification.Kind.REMINDER, status=EventNotification.Status.PENDING
+    ).update(status=EventNotification.Status.CANCELLED)
+    schedule_reminders([event])
+
+
+def notify_change(event, old_values):
+    """
+    Queue a change notice for `event` given the values of its NOTIFIED_FIELDS
+    before the update, if any of them changed.
+    """
+    changes = []
+    for field in NOTIFIED_FIELDS:
+        old, new = old_values[field], getattr(event, field)
+        if old != new:
+            if field == "date":
+                old, new = format_date(old), format_date(new)
+            changes.append(f"{Event._meta.get_field(field).verbose_name.capitalize()}: {old} -> {new}")
+    if not changes:
+        return None
+    if old_values["date"] != event.date:
+        reschedule_reminder(event)
+    return EventNotification.objects.create(
+        event=event,
+        kind=EventNotification.Kind.CHANGE,
+        changes="\n".join(changes),
+        bucket=bucket_of(timezone.now()),
+    )
+
+
+def build_message(notification, event, email, full_name):
+    if notification.kind == EventNotification.Kind.REMINDER:
+        subject = f"Reminder: {event.title} starts on {format_date(event.date)}"
+        body = (
+            f"Hello, {full_name}!\n\n"
+            f"This is a reminder that the event \"{event.title}\" starts on {format_date(event.date)}.\n"
+            f"Location: {event.location}\n\n"
+            "We look forward to seeing you there.\n\n"
+        )
+    else:
+        subject = f"Event Updated: {event.title}"
+        body = (
+            f"Hello, {full_name}!\n\n"
+            f"The event \"{event.title}\" you registered for has changed:\n\n"
+            f"{notification.changes}\n\n"
+            f"It now takes place on {format_date(event.date)} at {event.location}.\n\n"
+        )
+    body += "Best regards,\nThe Event Management Team"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email])
+
+
+def get_attendees(event_id, after_user_id, chunk_size):
+    """
+    The ids of the next `chunk_size` users registered for `event_id` after
+    `after_user_id`, and their (id, email, full_name).
+    """
+    user_ids = sorted({
+        user_id
+        for queryset in shards.event_registrations(event_id)
+        for user_id in queryset.filter(user_id__gt=after_user_id)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)[:chunk_size]
+    })[:chunk_size]
+    users = CustomUser.objects.filter(pk__in=user_ids).order_by("pk").values_list("pk", "email", "full_name")
+    return user_ids, list(users)
+
+
+def claim_due_notification(now):
+    with transaction.atomic():
+        notification = (
+            EventNotification.objects.select_for_update(skip_locked=True)
+            .filter(status=EventNotification.Status.PENDING, bucket__lte=now)
+            .order_by("bucket", "id")
+            .first()
+        )
+        if notification is None:
+            return None
+        notification.attempts += 1
+        notification.bucket = bucket_after(now + NOTIFICATION_LEASE)
+        notification.save(update_fields=["attempts", "bucket"])
+    return notification
+
+
+def queue_refused_message(message, error):
+    """Hand a message the server refused to the outbox, as its first failed attempt."""
+    EmailOutbox.objects.create(
+        subject=message.subject,
+        message=message.body,
+        recipient=message.to[0],
+        attempts=1,
+        last_error=str(error),
+        next_attempt_at=timezone.now() + get_outbox_retry_delay(1),
+    )
+
+
+def send_notification(notification, connection, chunk_size):
+    """Email `notification` to the attendees not notified yet. Returns the number of emails sent."""
+    event = Event.objects.filter(pk=notification.event_id).first()
+    if event is None or (notification.kind == EventNotification.Kind.REMINDER and event.date <= timezone.now()):
+        # Deleted, archived or already started.
+        notification.status = EventNotification.Status.CANCELLED
+        notification.save(update_fields=["status"])
+        return 0
+
+    sent = 0
+    while True:
+        user_ids, users = get_attendees(event.pk, notification.last_user_id, chunk_size)
+        if not user_ids:
+            break
+        if users:
+            # send_messages() closes a connection it opened itself after each call.
+            connection.open()
+        for user_id, email, full_name in users:
+            message = build_message(notification, event, email, full_name)
+            try:
+                connection.send_messages([message])
+            except RECIPIENT_ERRORS as e:
+                logger.warning("Notification %s was refused for %s: %s", notification.pk, email, e)
+                queue_refused_message(message, e)
+            else:
+                sent += 1
+                notification.sent_count += 1
+            notification.last_user_id = user_id
+            notification.save(update_fields=["last_user_id", "sent_count"])
+        # Past the registrations of users that no longer exist, too.
+        notification.last_user_id = user_ids[-1]
+        notification.bucket = bucket_after(timezone.now() + NOTIFICATION_LEASE)
+        notification.save(update_fields=["last_user_id", "bucket"])
+
+    notification.status = EventNotification.Status.SENT
+    notification.sent_at = timezone.now()
+    notification.last_error = ""
+    notification.save(update_fields=["status", "sent_at", "last_error"])
+    return sent
+
+
+def send_due_notifications(chunk_size=NOTIFICATION_CHUNK_SIZE):
+    """
+    Send every due notification over one SMTP connection. Failed
+    notifications are retried with backoff from the chunk they failed in.
+
+    Yields (notification, sent) for each notification processed.
+    """
+    connection = get_connection(fail_silently=False)
+    try:
+        while True:
+            notification = claim_due_notification(timezone.now())
+            if notification is None:
+                return
+            try:
+                sent = send_notification(notification, connection, chunk_size)
+            except Exception as e:
+                logger.warning("Could not send notification %s: %s", notification.pk, e)
+                sent = 0
+                notification.last_error = str(e)
+                if notification.attempts >= EventNotification.MAX_ATTEMPTS:
+                    notification.status = EventNotification.Status.DEAD
+                else:
+                    notification.bucket = bucket_after(timezone.now() + get_outbox_retry_delay(notification.attempts))
+                notification.save(update_fields=["status", "bucket", "last_error"])
+                # The next notification reconnects rather than reusing a broken connection.
+                with suppress(Exception):
+                    connection.close()
+            yield notification, sent
+    finally:
+        with suppress(Exception):
+            connection.close()
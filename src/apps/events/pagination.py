@@ -0,0 +1,190 @@
+import json
+import base64
+import binascii
+from itertools import chain
+from operator import attrgetter
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset pagination over the (date, id) pair.
+
+    Every page is fetched with a `WHERE (date, id) > (last_date, last_id)`
+    style predicate, so the cost of a page does not depend on how deep the
+    client is in the list. Cursors are opaque base64 tokens.
+
+    Search results are annotated with `search_rank` and are paged by
+    (search_rank DESC, id) instead, so they keep their relevance order.
+    Results near a point are paged by (distance, id).
+    """
+
+    cursor_query_param = "cursor"
+    # Whether ties on the key are ordered by descending id.
+    descending_id = False
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    # Keys holding integers; the others are datetimes.
+    integer_keys = ("search_rank", "distance")
+
+    def get_key(self, queryset):
+        """Return the leading ordering field and whether it is descending; `id` breaks ties."""
+        if "distance" in queryset.query.annotations:
+            return "distance", False
+        if "search_rank" in queryset.query.annotations:
+            return "search_rank", True
+        return "date", False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """Return the queryset of one page plus one extra row, without evaluating it."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.key, self.descending = self.get_key(queryset)
+        self.cursor = self.decode_cursor(request)
+
+        self.reverse = False
+        if self.cursor is not None:
+            value, pk, self.reverse = self.cursor
+            # Walking backwards flips the comparison direction of both keys.
+            after = "lt" if self.descending != self.reverse else "gt"
+            id_after = "lt" if self.descending_id != self.reverse else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.key}__{after}": value})
+                | Q(**{self.key: value, f"id__{id_after}": pk})
+            )
+        queryset = queryset.order_by(*self.get_ordering(self.reverse))
+
+        # Fetch one extra row to find out whether there is a following page.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_ordering(self, reverse):
+        descending = self.descending != reverse
+        return (
+            f"-{self.key}" if descending else self.key,
+            "-id" if self.descending_id != reverse else "id",
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if payload["k"] != self.key:
+                raise ValueError("cursor belongs to a different ordering")
+            if self.key in self.integer_keys:
+                value = int(payload["v"])
+            else:
+                value = parse_datetime(payload["v"])
+                if value is None:
+                    raise ValueError("invalid date")
+            pk = int(payload["i"])
+            reverse = bool(payload.get("r", False))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        return value, pk, reverse
+
+    def encode_cursor(self, event, reverse):
+        value = getattr(event, self.key)
+        if self.key not in self.integer_keys:
+            value = value.isoformat()
+        payload = {"k": self.key, "v": value, "i": event.pk}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_schema_fields(self, view):
+        return []
+
+
+class RegistrationCursorPagination(EventCursorPagination):
+    """Keyset pagination over (registered_at DESC, id DESC), newest registrations first."""
+
+    descending_id = True
+
+    def get_key(self, queryset):
+        return "registered_at", True
+
+    def paginate_querysets(self, querysets, request):
+        """Paginate the union of `querysets`, one per shard, by merging their pages."""
+        results = list(chain.from_iterable(self.get_page_queryset(queryset, request) for queryset in querysets))
+        # Newest first, or oldest first when walking backwards.
+        results.sort(key=attrgetter("registered_at", "pk"), reverse=not self.reverse)
+        return self.set_page(results[:self.page_size + 1])
@@ -0,0 +1,247 @@
+"""
+Monthly partitions of the events table and archival of past months
+(PostgreSQL only).
+
+Migration 0013 turns events_event into a table partitioned by range of
+`date`: a partition per calendar month (in UTC) named events_event_pYYYY_MM,
+plus events_event_default for dates without one. Date filters, like the
+upcoming events list, only scan the partitions they match. A unique index
+on a partitioned table must contain the partition key, so its primary key
+is (id, date) and no foreign key can point to it.
+
+`ensure_partitions()` (the partition_events command) creates the partitions
+of the coming months ahead of time, moving rows out of the default partition
+when it already holds some of them. `archive_partitions()` detaches the
+partitions of past months and attaches them to a copy of the table in the
+ARCHIVE_SCHEMA schema, after moving the registrations of their events to an
+archive table in each registration database. Archived events no longer show
+up in lists, filters or the calendar, and leave a tombstone in the change
+feed (apps.events.change_log), but are still retrieved by id through
+`get_archived_event()`.
+"""
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils import timezone
+
+from . import change_log, day_buckets, shards
+from .cache import invalidate_event, touch_organizer
+from .models import Event, EventChange, EventRegistration
+
+ARCHIVE_SCHEMA = "events_archive"
+MONTHS_AHEAD = 12
+ARCHIVE_BATCH_SIZE = 1000
+
+TABLE = Event._meta.db_table
+REGISTRATION_TABLE = EventRegistration._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+class NotPartitioned(Exception):
+    pass
+
+
+def month_of(value):
+    """The first day of the (UTC) month of the datetime `value`."""
+    return value.astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def add_months(month, months):
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def bound(month):
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def partition_bounds(month):
+    return f"FROM ({bound(month)}) TO ({bound(add_months(month, 1))})"
+
+
+def is_partitioned(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def get_partitions(cursor, parent=TABLE):
+    """The months that have a partition of `parent`, in order."""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s)",
+        [parent],
+    )
+    prefix = f"{TABLE}_p"
+    months = []
+    for (name,) in cursor.fetchall():
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split("_")
+            months.append(date(int(year), int(month), 1))
+    return sorted(months)
+
+
+def create_partition(cursor, month):
+    """
+    Create the partition of `month`. Its rows are moved out of the default
+    partition before it is attached, since Postgres refuses to attach a
+    partition whose rows are still in the default one.
+    """
+    name = partition_name(month)
+    cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE date >= {bound(month)} AND date < {bound(add_months(month, 1))} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {partition_bounds(month)}")
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD, now=None, dry_run=False):
+    """
+    Create the missing partitions from the current month to `months_ahead`
+    months ahead. Returns the months created (or, with `dry_run`, missing).
+    """
+    if not is_partitioned():
+        raise NotPartitioned
+    current = month_of(now or timezone.now())
+    with transaction.atomic(), connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        existing = set(get_partitions(cursor))
+        missing = [
+            month for month in (add_months(current, offset) for offset in range(months_ahead + 1))
+            if month not in existing
+        ]
+        if not dry_run:
+            for month in missing:
+                create_partition(cursor, month)
+    return missing
+
+
+def create_archive_tables():
+    """Create the archive schema with a copy of the events table and one of the registrations table per shard."""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        cursor.execute("SELECT to_regclass(%s)", [f"{ARCHIVE_SCHEMA}.{TABLE}"])
+        if cursor.fetchone()[0] is None:
+            cursor.execute(
+                f"CREATE TABLE {ARCHIVE_SCHEMA}.{TABLE} (LIKE {TABLE} INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)"
+            )
+            cursor.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{TABLE} ADD PRIMARY KEY (id, date)")
+    for alias in registration_databases():
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{REGISTRATION_TABLE} "
+                f"(LIKE {REGISTRATION_TABLE} INCLUDING INDEXES)"
+            )
+
+
+def registration_databases():
+    return [alias or DEFAULT_DB_ALIAS for alias in shards.all_shards()]
+
+
+def archive_registrations(event_ids, batch_size):
+    """
+    Move the registrations of `event_ids` to the archive table of their
+    database, `batch_size` events per transaction. Returns the number moved.
+    """
+    moved = 0
+    for alias in registration_databases():
+        for start in range(0, len(event_ids), batch_size):
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {REGISTRATION_TABLE} WHERE event_id = ANY(%s) RETURNING *) "
+                    f"INSERT INTO {ARCHIVE_SCHEMA}.{REGISTRATION_TABLE} SELECT * FROM moved",
+                    [event_ids[start:start + batch_size]],
+                )
+                moved += cursor.rowcount
+    return moved
+
+
+def archive_partitions(before, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Archive the partitions of the months before the month of the date `before`.
+
+    Yields (month, events, registrations) for each month archived (or, with
+    `dry_run`, to archive). The registrations are moved first, so an
+    interrupted run is completed by running it again.
+    """
+    if not is_partitioned():
+        raise NotPartitioned
+    cutoff = before.replace(day=1)
+    connection = connections[DEFAULT_DB_ALIAS]
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Past months without a partition of their own have their rows in the default one.
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION} "
+            f"WHERE date < {bound(cutoff)}"
+        )
+        stray_months = [month for (month,) in cursor.fetchall()]
+        if not dry_run:
+            for month in stray_months:
+                create_partition(cursor, month)
+        months = sorted({*stray_months, *(month for month in get_partitions(cursor) if month < cutoff)})
+    if months and not dry_run:
+        create_archive_tables()
+
+    for month in months:
+        name = partition_name(month)
+        with connection.cursor() as cursor:
+            table = DEFAULT_PARTITION if dry_run and month in stray_months else name
+            cursor.execute(
+                f"SELECT id, organizer_id, deleted_at IS NULL FROM {table} "
+                f"WHERE date >= {bound(month)} AND date < {bound(add_months(month, 1))}"
+            )
+            events = cursor.fetchall()
+        event_ids = [event_id for event_id, _, _ in events]
+        if dry_run:
+            yield month, len(events), sum(
+                EventRegistration.objects.using(alias).filter(event_id__in=event_ids).count()
+                for alias in registration_databases()
+            )
+            continue
+
+        registrations = archive_registrations(event_ids, batch_size)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            # Archived rows take no new ids from the events table's sequence.
+            cursor.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{name} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(
+                f"ALTER TABLE {ARCHIVE_SCHEMA}.{TABLE} ATTACH PARTITION {ARCHIVE_SCHEMA}.{name} "
+                f"FOR VALUES {partition_bounds(month)}"
+            )
+            # Deleted events already have their tombstone.
+            change_log.record(
+                [event_id for event_id, _, live in events if live], EventChange.Action.DELETED, batch_size
+            )
+        # The local days of the month, which may start or end in the next or previous UTC day.
+        first_day = month - timedelta(days=1)
+        day_buckets.rebuild_days(
+            first_day + timedelta(days=offset) for offset in range((add_months(month, 1) - first_day).days + 1)
+        )
+        for organizer_id in {organizer_id for _, organizer_id, _ in events}:
+            touch_organizer(organizer_id)
+        invalidate_event()
+        yield month, len(events), registrations
+
+
+def get_archived_event(pk):
+    """The archived event `pk`, unless it was deleted, or None."""
+    using = router.db_for_read(Event)
+    if connections[using].vendor != "postgresql":
+        return None
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [f"{ARCHIVE_SCHEMA}.{TABLE}"])
+        if cursor.fetchone()[0] is None:
+            return None
+    return next(iter(Event.all_objects.using(using).raw(
+        f"SELECT * FROM {ARCHIVE_SCHEMA}.{TABLE} WHERE id = %s AND deleted_at IS NULL", [pk]
+    )), None)
@@ -0,0 +1,169 @@
+import re
+import bisect
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Q, F, Case, When, Value, IntegerField
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+from .models import Event
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Ranks are scaled to integers so that the cursor paginator can compare them
+# exactly when resuming from a cursor.
+RANK_SCALE = 1_000_000
+TRIGRAM_THRESHOLD = 0.3
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(first, second):
+    first, second = trigrams(first), trigrams(second)
+    return len(first & second) / len(first | second)
+
+
+class InMemorySearchIndex:
+    """
+    Inverted index over event titles and descriptions used when the database
+    is not PostgreSQL (e.g. SQLite test runs). It is built lazily from the
+    database on first use and kept up to date by model signals.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.built = False
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.vocabulary = []
+
+    def build(self):
+        with self.lock:
+            self.clear()
+            for pk, title, description in Event.objects.values_list("id", "title", "description").iterator():
+                self._add(pk, title, description)
+            self.vocabulary = sorted(self.postings)
+            self.built = True
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def _add(self, pk, title, description):
+        weights = defaultdict(int)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            self.postings[token][pk] = weight
+        self.documents[pk] = set(weights)
+
+    def _remove(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+
+    def update(self, event):
+        if not self.built:
+            return
+        with self.lock:
+            self._remove(event.pk)
+            self._add(event.pk, event.title, event.description)
+            self.vocabulary = sorted(self.postings)
+
+    def remove(self, pk):
+        if not self.built:
+            return
+        with self.lock:
+            self._remove(pk)
+            self.vocabulary = sorted(self.postings)
+
+    def _expand(self, term):
+        """Vocabulary words matching `term` as a prefix, or by trigram similarity as a fallback."""
+        start = bisect.bisect_left(self.vocabulary, term)
+        matches = []
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            matches.append((word, 1.0))
+        if matches:
+            return matches
+        return [
+            (word, similarity)
+            for word in self.vocabulary
+            if (similarity := trigram_similarity(term, word)) >= TRIGRAM_THRESHOLD
+        ]
+
+    def search(self, text):
+        """Return {event_id: integer rank}; every query term must match."""
+        self.ensure_built()
+        scores = None
+        with self.lock:
+            for term in tokenize(text):
+                term_scores = defaultdict(float)
+                for word, similarity in self._expand(term):
+                    for pk, weight in self.postings[word].items():
+                        term_scores[pk] = max(term_scores[pk], weight * similarity)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+                if not scores:
+                    return {}
+        return {pk: int(score * RANK_SCALE) for pk, score in (scores or {}).items()}
+
+
+search_index = InMemorySearchIndex()
+
+
+def build_prefix_query(text):
+    terms = tokenize(text)
+    return SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config="english")
+
+
+def search_events(queryset, text):
+    """
+    Restrict `queryset` to events matching `text` and annotate `search_rank`.
+
+    On PostgreSQL this is a single query: prefix full-text matches on the
+    GIN-indexed `search_vector` column, OR'ed with trigram similarity on the
+    title to catch typos. Other backends use the in-memory index.
+    """
+    if not tokenize(text):
+        return queryset
+
+    if connection.vendor == "postgresql":
+        query = build_prefix_query(text)
+        rank = SearchRank(F("search_vector"), query) + TrigramSimilarity("title", text)
+        return queryset.filter(
+            Q(search_vector=query) | Q(title__trigram_similar=text)
+        ).annotate(
+            search_rank=Cast(rank * RANK_SCALE, IntegerField())
+        ).order_by("-search_rank", "id")
+
+    ranks = search_index.search(text)
+    if not ranks:
+        return queryset.none()
+    return queryset.filter(id__in=ranks).annotate(
+        search_rank=Case(
+            *[When(id=pk, then=Value(rank)) for pk, rank in ranks.items()],
+            output_field=IntegerField(),
+        )
+    ).order_by("-search_rank", "id")
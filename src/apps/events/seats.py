@@ -0,0 +1,160 @@
+"""
+Seat allocation for capacity-limited events.
+
+A seat is taken with a single conditional UPDATE that increments
+`Event.registrations_count` only while it is below `Event.capacity`. The
+database evaluates the condition and the increment under the row lock, so
+concurrent registrations can never push the count past the capacity, and no
+transaction holds the lock for longer than the registration insert.
+
+The counter is also what clients see as the number of attendees. Every
+change to it invalidates the event's cached responses once the transaction
+commits, and `reconcile_registrations_count()` repairs any drift from the
+actual registration rows.
+
+Registrations may live in a shard of their own (apps.events.shards); their
+writes share a transaction with the seat counter on every shard involved.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+
+from . import shards
+from .cache import invalidate_event, invalidate_events
+from .models import Event, EventWaitlistEntry
+from .utils import load_recipient, queue_email_after_event_registration
+
+RECONCILE_BATCH_SIZE = 1000
+
+
+class EventFull(Exception):
+    pass
+
+
+def take_seat(event_id):
+    """Atomically reserve a seat; returns False when the event is full."""
+    taken = bool(
+        Event.objects.filter(pk=event_id)
+        .filter(Q(capacity__isnull=True) | Q(registrations_count__lt=F("capacity")))
+        .update(registrations_count=F("registrations_count") + 1)
+    )
+    if taken:
+        transaction.on_commit(lambda: invalidate_event(event_id))
+    return taken
+
+
+def release_seat(event_id):
+    if Event.objects.filter(pk=event_id, registrations_count__gt=0).update(
+        registrations_count=F("registrations_count") - 1
+    ):
+        transaction.on_commit(lambda: invalidate_event(event_id))
+
+
+def register(user, event):
+    """
+    Register `user` for `event`, raising EventFull if no seat is left.
+
+    Raises IntegrityError if the user is already registered; the seat taken
+    for them is given back by the rollback.
+    """
+    with transaction.atomic(), shards.atomic(event.pk):
+        if not take_seat(event.pk):
+            raise EventFull
+        registration = shards.create_registration(user=user, event=event)
+        queue_email_after_event_registration(user=load_recipient(user), event=event)
+    return registration
+
+
+def join_waitlist(user, event):
+    """Raises IntegrityError if the user is already on the waitlist."""
+    return EventWaitlistEntry.objects.create(user=user, event=event)
+
+
+def get_waitlist_position(entry):
+    return EventWaitlistEntry.objects.filter(event_id=entry.event_id, id__lte=entry.id).count()
+
+
+def cancel_registration(user, event):
+    """
+    Cancel `user`'s registration for `event`, free its seat and hand it to
+    the waitlist, if any. Returns False if the user was not registered.
+
+    Every statement is a lookup on a unique index or the primary key, so the
+    cost does not grow with the number of registrations.
+    """
+    with transaction.atomic(), shards.atomic(event.pk):
+        if not shards.delete_registration(user=user, event=event):
+            return False
+        release_seat(event.pk)
+    promote_waitlist(event)
+    return True
+
+
+def leave_waitlist(user, event):
+    """Returns False if the user was not on the waitlist."""
+    deleted, _ = EventWaitlistEntry.objects.filter(user=user, event=event).delete()
+    return bool(deleted)
+
+
+def promote_waitlist(event):
+    """Move waitlisted users into free seats in first-come order. Returns the number promoted."""
+    promoted = 0
+    while True:
+        with transaction.atomic(), shards.atomic(event.pk):
+            entry = (
+                EventWaitlistEntry.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("user")
+                .filter(event=event)
+                .order_by("id")
+                .first()
+            )
+            if entry is None or not take_seat(event.pk):
+                return promoted
+            entry.delete()
+            _, created = shards.get_or_create_registration(user=entry.user, event=event)
+            if not created:
+                # The user registered directly while waiting; give the seat back.
+                release_seat(event.pk)
+                continue
+            queue_email_after_event_registration(user=entry.user, event=event)
+        promoted += 1
+
+
+def reconcile_registrations_count(batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Compare `registrations_count` with the registration rows of every event,
+    a batch of events at a time, and repair the drifted ones unless `dry_run`.
+
+    Yields (event_id, stored, actual) for each drifted event. The batch is
+    locked while it is checked, so seats taken concurrently are not lost.
+    Registrations are counted per shard, so the count is only exact while no
+    reshard is in progress.
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                Event.objects.select_for_update()
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                return
+            last_pk = pks[-1]
+
+            counts = shards.count_registrations(pks)
+            drifted = [
+                (pk, stored, counts.get(pk, 0))
+                for pk, stored in Event.objects.filter(pk__in=pks).order_by("pk").values_list(
+                    "pk", "registrations_count"
+                )
+                if stored != counts.get(pk, 0)
+            ]
+            if drifted and not dry_run:
+                drifted_pks = [pk for pk, _, _ in drifted]
+                Event.objects.filter(pk__in=drifted_pks).update(registrations_count=Case(
+                    *(When(pk=pk, then=Value(actual)) for pk, _, actual in drifted)
+                ))
+                transaction.on_commit(lambda: invalidate_events(drifted_pks))
+
+        yield from drifted
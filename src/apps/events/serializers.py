@@ -1,10 +1,58 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
-from .models import Event, EventRegistration
+from core.profiling import TimedSerializerMixin
 
+from .seats import get_waitlist_position
+from .change_log import CHANGE_FEED_MAX_PAGE_SIZE, CHANGE_FEED_PAGE_SIZE, parse_token
+from .models import Event, EventChange, EventRegistration, EventWaitlistEntry
 
-class EventSerializer(serializers.ModelSerializer):
+MAX_BULK_ITEMS = 1000
+MAX_CALENDAR_DAYS = 62
+
+
+def parse_field_list(value):
+    return [name for name in (part.strip() for part in value.split(",")) if name]
+
+
+class SparseFieldsetMixin:
+    """
+    Lets GET requests choose the output fields: `?fields=id,title` keeps only
+    the named fields, `?omit=description` drops the named ones. Unknown names
+    are a validation error.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        selected = request.query_params.get("fields")
+        omitted = request.query_params.get("omit")
+        if selected is None and omitted is None:
+            return
+
+        errors = {}
+        keep = set(self.fields)
+        if selected is not None:
+            keep = set(parse_field_list(selected))
+            if unknown := keep - set(self.fields):
+                errors["fields"] = f"Unknown fields: {', '.join(sorted(unknown))}."
+        if omitted is not None:
+            omit = set(parse_field_list(omitted))
+            if unknown := omit - set(self.fields):
+                errors["omit"] = f"Unknown fields: {', '.join(sorted(unknown))}."
+            keep -= omit
+        if errors:
+            raise serializers.ValidationError(errors)
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+class EventSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     organizer = serializers.CharField(source="organizer.full_name", read_only=True)
+    # Metres from the `near` point; only present when filtering by `near`.
+    distance = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Event
@@ -14,14 +62,138 @@ class EventSerializer(serializers.ModelSerializer):
             "description",
             "date",
             "location",
+            "latitude",
+            "longitude",
+            "distance",
+            "capacity",
+            "registrations_count",
             "organizer",
         ]
 
+    def validate(self, attrs):
+        coordinates = [
+            attrs.get(name, getattr(self.instance, name, None)) for name in ("latitude", "longitude")
+        ]
+        if coordinates.count(None) == 1:
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return attrs
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Save only the changed fields, so that registrations_count, which
+        # registrations change concurrently, is never written back stale.
+        instance.save(update_fields=list(validated_data))
+        return instance
 
-class EventRegistrationSerializer(serializers.ModelSerializer):
+
+class RegisteredEventSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Event
+        fields = ["id", "title", "date", "location", "registrations_count"]
+
+
+class UserEventRegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    event = RegisteredEventSerializer(read_only=True)
+
+    class Meta:
+        model = EventRegistration
+        fields = ["id", "event", "registered_at"]
+
+
+class EventRegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.CharField(source="user.full_name", read_only=True)
     event = serializers.CharField(source="event.title", read_only=True)
 
     class Meta:
         model = EventRegistration
         fields = ["id", "event", "user"]
+
+
+class EventRegistrationRequestSerializer(serializers.Serializer):
+    waitlist = serializers.BooleanField(default=False)
+
+
+class EventWaitlistEntrySerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.full_name", read_only=True)
+    event = serializers.CharField(source="event.title", read_only=True)
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EventWaitlistEntry
+        fields = ["id", "event", "user", "position"]
+
+    def get_position(self, obj):
+        return get_waitlist_position(obj)
+
+
+class BulkEventRegistrationSerializer(serializers.Serializer):
+    events = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_ITEMS,
+    )
+
+
+class BulkEventRegistrationResultSerializer(serializers.Serializer):
+    event = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=["registered", "already_registered", "full", "not_found"])
+
+
+class BulkEventImportResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    id = serializers.IntegerField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class CalendarQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+
+    def validate(self, attrs):
+        days = (attrs["date_to"] - attrs["date_from"]).days + 1
+        if days < 1:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        if days > MAX_CALENDAR_DAYS:
+            raise serializers.ValidationError(f"The window must not be longer than {MAX_CALENDAR_DAYS} days.")
+        return attrs
+
+
+class CalendarEventStubSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    time = serializers.TimeField()
+    location = serializers.CharField()
+
+
+class CalendarDaySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    count = serializers.IntegerField()
+    events = CalendarEventStubSerializer(many=True)
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(default="0")
+    page_size = serializers.IntegerField(
+        min_value=1, max_value=CHANGE_FEED_MAX_PAGE_SIZE, default=CHANGE_FEED_PAGE_SIZE
+    )
+
+    def validate_since(self, value):
+        try:
+            return parse_token(value)
+        except ValueError:
+            raise serializers.ValidationError("Not a change feed token.")
+
+
+class EventChangeSerializer(serializers.Serializer):
+    seq = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=EventChange.Action.choices)
+    id = serializers.IntegerField()
+    event = EventSerializer(allow_null=True)
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    since = serializers.CharField()
+    has_more = serializers.BooleanField()
+    results = EventChangeSerializer(many=True)
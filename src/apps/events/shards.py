@@ -0,0 +1,300 @@
+"""
+Hash sharding of event registrations (settings.REGISTRATION_SHARDS, see
+DB_SHARD_HOSTS).
+
+Registrations are the one table that grows with every user and every
+event, so it can be spread over several databases. All registrations of an
+event live in the same shard, picked by jump consistent hashing of the
+event id: going from N to N + 1 shards moves only about 1/(N + 1) of the
+events. Every shard is migrated with the full schema, but only its
+registration table is used; users and events stay in the default database.
+
+Lookups by event go to one shard. Queries need an event to find theirs:
+the router routes saved instances and `event.registrations`, everything
+else picks its shard with the helpers below, and a user's registrations
+are read from every shard (`user_registrations()`).
+
+Resharding: with the old layout in REGISTRATION_SHARDS_PREVIOUS, new
+registrations go to the current shard of their event, lookups that miss
+it look in the previous one, and `reshard()` (the reshard_registrations
+command) moves the remaining rows over in short transactions. Moved rows
+get new ids in their new shard.
+
+Without shards every helper uses the database the routers pick, as if
+this module did not exist.
+"""
+from contextlib import ExitStack, contextmanager
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count
+
+from apps.users.models import CustomUser
+from .models import Event, EventRegistration
+
+RESHARD_BATCH_SIZE = 1000
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping & Veach, 2014) of the integer `key` into `buckets`."""
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def is_sharded():
+    return bool(settings.REGISTRATION_SHARDS or settings.REGISTRATION_SHARDS_PREVIOUS)
+
+
+def pick(layout, event_id):
+    return layout[jump_hash(event_id, len(layout))]
+
+
+def shard_for(event_id):
+    """The alias holding the registrations of `event_id`, or None without sharding."""
+    if not is_sharded():
+        return None
+    return pick(settings.REGISTRATION_SHARDS or [DEFAULT_DB_ALIAS], event_id)
+
+
+def shards_for(event_id):
+    """The aliases to look for the registrations of `event_id` in, its current shard first."""
+    current = shard_for(event_id)
+    if not settings.REGISTRATION_SHARDS_PREVIOUS:
+        return [current]
+    previous = pick(settings.REGISTRATION_SHARDS_PREVIOUS, event_id)
+    return [current] if previous == current else [current, previous]
+
+
+def all_shards():
+    if not is_sharded():
+        return [None]
+    return list(dict.fromkeys([
+        *(settings.REGISTRATION_SHARDS or [DEFAULT_DB_ALIAS]), *settings.REGISTRATION_SHARDS_PREVIOUS
+    ]))
+
+
+@contextmanager
+def atomic(*event_ids):
+    """
+    A transaction on the shards of `event_ids`, nested in one on the default
+    database. The shards commit first: should the default database then
+    fail to commit, registrations exist without their seats, which
+    reconcile_registrations_count repairs.
+    """
+    with ExitStack() as stack:
+        for alias in sorted({shard_for(event_id) for event_id in event_ids} - {None}):
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def group_by_shard(event_ids):
+    """{alias: event ids} of every shard to look for the registrations of `event_ids` in."""
+    groups = defaultdict(list)
+    for event_id in event_ids:
+        for alias in shards_for(event_id):
+            groups[alias].append(event_id)
+    return groups
+
+
+def is_registered(user, event):
+    return any(
+        EventRegistration.objects.using(alias).filter(user_id=user.pk, event_id=event.pk).exists()
+        for alias in shards_for(event.pk)
+    )
+
+
+def registered_event_ids(user, event_ids):
+    """The ids among `event_ids` of the events `user` is registered for."""
+    registered = set()
+    for alias, ids in group_by_shard(event_ids).items():
+        registered.update(
+            EventRegistration.objects.using(alias).filter(user_id=user.pk, event_id__in=ids)
+            .values_list("event_id", flat=True)
+        )
+    return registered
+
+
+def create_registration(user, event):
+    """Raises IntegrityError if `user` is already registered for `event`."""
+    current, *previous = shards_for(event.pk)
+    if previous and EventRegistration.objects.using(previous[0]).filter(
+        user_id=user.pk, event_id=event.pk
+    ).exists():
+        raise IntegrityError("The user is already registered for this event.")
+    return EventRegistration.objects.using(current).create(user=user, event=event)
+
+
+def get_or_create_registration(user, event):
+    current, *previous = shards_for(event.pk)
+    if previous:
+        registration = EventRegistration.objects.using(previous[0]).filter(
+            user_id=user.pk, event_id=event.pk
+        ).first()
+        if registration is not None:
+            return registration, False
+    return EventRegistration.objects.using(current).get_or_create(user=user, event=event)
+
+
+def delete_registration(user, event):
+    """Returns the number of registrations deleted."""
+    return sum(
+        EventRegistration.objects.using(alias).filter(user_id=user.pk, event_id=event.pk).delete()[0]
+        for alias in shards_for(event.pk)
+    )
+
+
+def bulk_create(registrations, **kwargs):
+    by_alias = defaultdict(list)
+    for registration in registrations:
+        by_alias[shard_for(registration.event_id)].append(registration)
+    for alias, rows in by_alias.items():
+        EventRegistration.objects.using(alias).bulk_create(rows, **kwargs)
+
+
+def event_registrations(event_id):
+    """A queryset of the registrations of `event_id` per shard."""
+    return [EventRegistration.objects.using(alias).filter(event_id=event_id) for alias in shards_for(event_id)]
+
+
+def user_registrations(user):
+    """A queryset of `user`'s registrations per shard."""
+    return [EventRegistration.objects.using(alias).filter(user_id=user.pk) for alias in all_shards()]
+
+
+def count_registrations(event_ids):
+    """{event_id: number of registrations} for the events of `event_ids` that have any."""
+    counts = defaultdict(int)
+    for alias, ids in group_by_shard(event_ids).items():
+        for event_id, count in (
+            EventRegistration.objects.using(alias).filter(event_id__in=ids)
+            .order_by()
+            .values("event_id")
+            .annotate(count=Count("id"))
+            .values_list("event_id", "count")
+        ):
+            counts[event_id] += count
+    return counts
+
+
+def export_rows(event_id, chunk_size):
+    """
+    (id, email, full_name, registered_at) of every registration of
+    `event_id`, by id within each shard. Users are looked up in the default
+    database a chunk at a time.
+    """
+    for queryset in event_registrations(event_id):
+        rows = queryset.order_by("id").values_list("id", "user_id", "registered_at").iterator(
+            chunk_size=chunk_size
+        )
+        while chunk := list(islice(rows, chunk_size)):
+            users = CustomUser.objects.only("email", "full_name").in_bulk(
+                {user_id for _, user_id, _ in chunk}
+            )
+            for pk, user_id, registered_at in chunk:
+                if user_id in users:
+                    yield pk, users[user_id].email, users[user_id].full_name, registered_at
+
+
+def delete_user_registrations(user_id):
+    """Delete a deleted user's registrations, which the ORM cascade only finds in the default database."""
+    for alias in all_shards():
+        EventRegistration.objects.using(alias).filter(user_id=user_id).delete()
+
+
+def delete_event_registrations(event_id):
+    for queryset in event_registrations(event_id):
+        queryset.delete()
+
+
+def move_registrations(event_id, source, target, batch_size=RESHARD_BATCH_SIZE):
+    """Move the registrations of `event_id` from `source` to `target`. Returns the number moved."""
+    moved = 0
+    while True:
+        # The target commits first, so a registration is never missing from
+        # both shards; in between, lookups find it in the target.
+        with transaction.atomic(using=source), transaction.atomic(using=target):
+            batch = list(
+                EventRegistration.objects.using(source).select_for_update()
+                .filter(event_id=event_id)
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                return moved
+            EventRegistration.objects.using(target).bulk_create(
+                [
+                    EventRegistration(
+                        user_id=registration.user_id,
+                        event_id=registration.event_id,
+                        registered_at=registration.registered_at,
+                    )
+                    for registration in batch
+                ],
+                ignore_conflicts=True,
+            )
+            EventRegistration.objects.using(source).filter(
+                pk__in=[registration.pk for registration in batch]
+            ).delete()
+        moved += len(batch)
+
+
+def reshard(batch_size=RESHARD_BATCH_SIZE, dry_run=False):
+    """
+    Move the registrations left in the shards of REGISTRATION_SHARDS_PREVIOUS
+    to the current shard of their event, `batch_size` rows per transaction.
+
+    Yields (event_id, source, target, registrations) for each event whose
+    registrations are (or, with `dry_run`, would be) moved.
+    """
+    for source in settings.REGISTRATION_SHARDS_PREVIOUS:
+        registrations = EventRegistration.objects.using(source)
+        last_event_id = 0
+        while True:
+            event_ids = list(
+                registrations.filter(event_id__gt=last_event_id)
+                .order_by("event_id")
+                .values_list("event_id", flat=True)
+                .distinct()[:batch_size]
+            )
+            if not event_ids:
+                break
+            last_event_id = event_ids[-1]
+            for event_id in event_ids:
+                target = shard_for(event_id)
+                if target == source:
+                    continue
+                if dry_run:
+                    moved = registrations.filter(event_id=event_id).count()
+                else:
+                    moved = move_registrations(event_id, source, target, batch_size)
+                yield event_id, source, target, moved
+
+
+class RegistrationShardRouter:
+    """
+    Routes registrations by their event when Django passes one as a hint;
+    other models and queries without a hint are left to the next router.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model is not EventRegistration:
+            return None
+        instance = hints.get("instance")
+        if isinstance(instance, EventRegistration) and instance.event_id is not None:
+            return shard_for(instance.event_id)
+        if isinstance(instance, Event):
+            return shard_for(instance.pk)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Registrations point to users and events in the default database.
+        if isinstance(obj1, EventRegistration) or isinstance(obj2, EventRegistration):
+            return True
+        return None
@@ -0,0 +1,60 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_init, post_save, post_delete
+
+from apps.users.models import CustomUser
+from . import shards
+from .models import Event
+from .search import search_index
+from .ics import FEED_FIELDS
+from .cache import touch_organizer
+from .day_buckets import STUB_FIELDS, day_of, schedule_rebuild
+
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, **kwargs):
+    # Instances loaded without deleted_at come from Event.objects, so they are not deleted.
+    if "deleted_at" in instance.get_deferred_fields() or instance.deleted_at is None:
+        search_index.update(instance)
+    else:
+        search_index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_search_index(sender, instance, **kwargs):
+    search_index.remove(instance.pk)
+
+
+@receiver(post_init, sender=Event)
+def remember_day(sender, instance, **kwargs):
+    # The day the instance was loaded with, so that moving an event to
+    # another day also rebuilds the bucket it left.
+    instance._loaded_day = day_of(instance.__dict__.get("date"))
+
+
+@receiver(post_save, sender=Event)
+def update_calendars(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or STUB_FIELDS.intersection(update_fields):
+        day = day_of(instance.__dict__.get("date"))
+        schedule_rebuild([instance._loaded_day, day])
+        instance._loaded_day = day
+    if update_fields is None or FEED_FIELDS.intersection(update_fields):
+        touch_organizer(instance.organizer_id)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_calendars(sender, instance, **kwargs):
+    schedule_rebuild([instance._loaded_day])
+    touch_organizer(instance.organizer_id)
+
+
+# The ORM cascade only deletes registrations in the default database.
+@receiver(post_delete, sender=Event)
+def delete_sharded_event_registrations(sender, instance, **kwargs):
+    if shards.is_sharded():
+        shards.delete_event_registrations(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def delete_sharded_user_registrations(sender, instance, **kwargs):
+    if shards.is_sharded():
+        shards.delete_user_registrations(instance.pk)
@@ -1,3 +1,2017 @@
-from django.test import TestCase
+import os
+import csv
+import json
+import smtplib
+import tempfile
+import warnings
+from io import StringIO
+from datetime import date, timedelta
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.urls import reverse
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.utils import load_backend
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+
+from core import profiling
+from core.renderers import ORJSONRenderer
+from core.metrics import Histogram
+from core.db.pool import get_pool_stats
+from core.db.replicas import replica_health
+from apps.users.models import CustomUser
+from apps.users.tokens import UserClaimsRefreshToken
+from . import benchmark, geo, notifications, partitions, seats, shards
+from .cache import get_cache
+from .search import search_index
+from .day_buckets import MAX_STUBS_PER_DAY
+from .management.commands.explain_queries import get_canonical_queries
+from .models import Event, EventChange, EventRegistration, EmailOutbox, EventDayBucket, EventNotification
+
+
+class EventAPITestCase(APITestCase):
+    """Resets process-wide state that would otherwise leak between test cases."""
+
+    def setUp(self):
+        get_cache().clear()
+        search_index.clear()
+
+
+class EventQueryCountTests(EventAPITestCase):
+    """
+    Query-count regression tests. The seeded dataset is large enough that an
+    N+1 in any serializer shows up as a failing assertNumQueries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizers = [
+            CustomUser.objects.create_user(
+                email=f"organizer{i}@example.com", password="password", full_name=f"Organizer {i}"
+            )
+            for i in range(3)
+        ]
+        cls.attendee = CustomUser.objects.create_user(
+            email="attendee@example.com", password="password", full_name="Attendee"
+        )
+        start = timezone.now() + timedelta(days=1)
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}",
+                description=f"Description of event {i}",
+                date=start + timedelta(hours=i),
+                location="Kyiv" if i % 2 else "Lviv",
+                organizer=cls.organizers[i % 3],
+            )
+            for i in range(30)
+        ])
+        EventRegistration.objects.bulk_create([
+            EventRegistration(user=cls.attendee, event=event) for event in cls.events[:10]
+        ])
+
+    def authenticate(self, user):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("events-list"), {"page_size": 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 30)
+
+    def test_list_next_page(self):
+        response = self.client.get(reverse("events-list"), {"page_size": 10})
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_list_with_filters_and_search(self):
+        params = {"location__iexact": "kyiv", "search": "event", "page_size": 30}
+        # Build the in-memory search index used on non-PostgreSQL databases.
+        search_index.build()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("events-list"), params)
+        self.assertEqual(len(response.data["results"]), 15)
+
+    def test_list_by_location_is_case_insensitive(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("events-list"), {"location": "KYIV", "page_size": 30})
+        self.assertEqual(len(response.data["results"]), 15)
+
+    def test_retrieve(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("events-detail", args=[self.events[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["organizer"], "Organizer 0")
+
+    def test_create(self):
+        self.authenticate(self.organizers[0])
+        data = {
+            "title": "New event",
+            "description": "New description",
+            "date": (timezone.now() + timedelta(days=5)).isoformat(),
+            "location": "Odesa",
+        }
+        # request.user comes from the token claims, so only the event, its reminder and its change are inserted
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse("events-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_partial_update(self):
+        self.authenticate(self.organizers[0])
+        # event lookup, update, change notice, change log
+        with self.assertNumQueries(4):
+            response = self.client.patch(
+                reverse("events-detail", args=[self.events[0].pk]), {"title": "Renamed"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_destroy(self):
+        self.authenticate(self.organizers[0])
+        # event lookup, soft delete, change log
+        with self.assertNumQueries(3):
+            response = self.client.delete(reverse("events-detail", args=[self.events[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_register(self):
+        self.authenticate(self.attendee)
+        # event lookup, savepoint, seat counter update, registration insert,
+        # recipient lookup, outbox insert, savepoint release
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse("registration", args=[self.events[20].pk]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["event"], "Event 20")
+        self.assertEqual(response.data["user"], "Attendee")
+
+
+class ExplainQueriesTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        Event.objects.create(
+            title="Conference", description="Description", date=timezone.now() + timedelta(days=1),
+            location="Kyiv", organizer=organizer,
+        )
+
+    def test_every_canonical_query_uses_an_index(self):
+        stdout = StringIO()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            # Sequential scans are disabled while planning on PostgreSQL.
+            call_command("explain_queries", "--strict", stdout=stdout)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines, [f"OK {name}" for name in get_canonical_queries()])
+
+
+class EventSearchTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        start = timezone.now() + timedelta(days=1)
+        rows = [
+            ("Python conference", "Talks about Django and asyncio", "Kyiv"),
+            ("Django workshop", "Hands-on Python session", "Lviv"),
+            ("Jazz concert", "An evening of live music", "Kyiv"),
+            ("Photography walk", "Explore the old town with a camera", "Kyiv"),
+        ]
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=title, description=description, location=location,
+                date=start + timedelta(days=i), organizer=organizer,
+            )
+            for i, (title, description, location) in enumerate(rows)
+        ])
+
+    def search(self, **params):
+        response = self.client.get(reverse("events-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event["title"] for event in response.data["results"]]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search(search="django"), ["Django workshop", "Python conference"])
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search(search="photo"), ["Photography walk"])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search(search="python session"), ["Django workshop"])
+
+    def test_typo_falls_back_to_trigram_match(self):
+        self.assertEqual(self.search(search="concret"), ["Jazz concert"])
+
+    def test_search_composes_with_filters(self):
+        self.assertEqual(self.search(search="python", location__iexact="kyiv"), ["Python conference"])
+
+    def test_index_follows_writes(self):
+        self.search(search="django")
+        event = self.events[2]
+        event.title = "Django meetup"
+        event.save()
+        self.events[0].delete()
+        # Direct model writes bypass the view-level response cache invalidation.
+        get_cache().clear()
+        self.assertEqual(self.search(search="django"), ["Django workshop", "Django meetup"])
+
+    def test_search_results_paginate_in_rank_order(self):
+        first = self.client.get(reverse("events-list"), {"search": "python django", "page_size": 1})
+        second = self.client.get(first.data["next"])
+        self.assertEqual(
+            [first.data["results"][0]["title"], second.data["results"][0]["title"]],
+            self.search(search="python django"),
+        )
+        self.assertIsNone(second.data["next"])
+        previous = self.client.get(second.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+
+
+class EventCapacityTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.users = [
+            CustomUser.objects.create_user(
+                email=f"user{i}@example.com", password="password", full_name=f"User {i}"
+            )
+            for i in range(4)
+        ]
+        cls.event = Event.objects.create(
+            title="Workshop",
+            description="Description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            capacity=2,
+            organizer=cls.organizer,
+        )
+
+    def register(self, user, **data):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.client.post(reverse("registration", args=[self.event.pk]), data, format="json")
+
+    def test_registration_is_rejected_when_full(self):
+        self.assertEqual(self.register(self.users[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(self.users[1]).status_code, status.HTTP_201_CREATED)
+
+        response = self.register(self.users[2])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registrations_count, 2)
+        self.assertEqual(self.event.registrations.count(), 2)
+
+    def test_duplicate_registration_gives_seat_back(self):
+        self.register(self.users[0])
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registrations_count, 1)
+
+    def test_waitlist_is_promoted_on_cancellation(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+
+        response = self.register(self.users[2], waitlist=True)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["position"], 1)
+        self.assertEqual(self.register(self.users[3], waitlist=True).data["position"], 2)
+        self.assertEqual(
+            self.register(self.users[0], waitlist=True).status_code, status.HTTP_400_BAD_REQUEST
+        )
+
+        self.assertTrue(seats.cancel_registration(self.users[0], self.event))
+
+        self.assertQuerySetEqual(
+            self.event.registrations.order_by("user_id").values_list("user__email", flat=True),
+            ["user1@example.com", "user2@example.com"],
+        )
+        self.assertEqual(
+            list(self.event.waitlist_entries.values_list("user__email", flat=True)),
+            ["user3@example.com"],
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registrations_count, 2)
+
+    def test_raising_capacity_promotes_waitlist(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        self.register(self.users[2], waitlist=True)
+        self.register(self.users[3], waitlist=True)
+
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.patch(reverse("events-detail", args=[self.event.pk]), {"capacity": 3})
+
+        self.assertEqual(self.event.registrations.count(), 3)
+        self.assertEqual(self.event.waitlist_entries.get().user, self.users[3])
+
+
+class BulkEndpointTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="partner@example.com", password="password", full_name="Partner"
+        )
+        start = timezone.now() + timedelta(days=1)
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}", description="Description", location="Kyiv",
+                date=start + timedelta(hours=i), capacity=1 if i == 0 else None, organizer=cls.user,
+            )
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_bulk_registration_reports_per_item_status(self):
+        full_event, registered_event, *others = self.events
+        other_user = CustomUser.objects.create_user(email="other@example.com", password="password")
+        seats.register(other_user, full_event)
+        seats.register(self.user, registered_event)
+
+        ids = [full_event.pk, registered_event.pk, *[event.pk for event in others], 999999]
+        # savepoint, lock events, existing registrations, recipient, seat
+        # counters, registrations insert, outbox insert, savepoint release
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse("registration-bulk"), {"events": ids}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data],
+            ["full", "already_registered", "registered", "registered", "registered", "not_found"],
+        )
+        self.assertEqual(self.user.event_registrations.count(), 4)
+        for event in others:
+            event.refresh_from_db()
+            self.assertEqual(event.registrations_count, 1)
+        self.assertEqual(EmailOutbox.objects.filter(recipient=self.user.email).count(), 4)
+
+    def test_bulk_event_import(self):
+        date = (timezone.now() + timedelta(days=2)).isoformat()
+        data = [
+            {"title": "Imported 1", "description": "D", "date": date, "location": "Lviv"},
+            {"title": "Imported 2", "description": "D", "location": "Lviv"},
+            {"title": "Imported 3", "description": "D", "date": date, "location": "Lviv", "capacity": 10},
+        ]
+        response = self.client.post(reverse("events-bulk"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result["index"] for result in response.data], [0, 1, 2])
+        self.assertIn("date", response.data[1]["errors"])
+        created = Event.objects.get(pk=response.data[2]["id"])
+        self.assertEqual((created.title, created.capacity, created.organizer), ("Imported 3", 10, self.user))
+
+    def test_import_events_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write("title,description,date,location,capacity\n")
+            for i in range(7):
+                file.write(f"CSV {i},Description,2030-01-0{i + 1}T10:00:00Z,Kyiv,\n")
+            file.write("Broken,Description,not-a-date,Kyiv,\n")
+        self.addCleanup(os.remove, file.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_events", file.name, organizer=self.user.email, batch_size=3,
+            stdout=stdout, stderr=stderr,
+        )
+
+        self.assertIn("Imported 7 event(s), 1 failed.", stdout.getvalue())
+        self.assertIn("Record 8", stderr.getvalue())
+        self.assertEqual(Event.objects.filter(title__startswith="CSV").count(), 7)
+
+
+class ExportTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.other = CustomUser.objects.create_user(
+            email="other@example.com", password="password", full_name="Other"
+        )
+        start = timezone.now() + timedelta(days=1)
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}", description="Line one\nline two, with comma", location="Kyiv",
+                date=start + timedelta(hours=i), organizer=cls.organizer if i < 3 else cls.other,
+            )
+            for i in range(4)
+        ])
+        EventRegistration.objects.bulk_create([
+            EventRegistration(user=user, event=cls.events[0]) for user in (cls.organizer, cls.other)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_events_csv(self):
+        content = self.read(self.client.get(reverse("events-export")))
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0][:3], ["id", "title", "description"])
+        self.assertEqual([row[1] for row in rows[1:]], ["Event 0", "Event 1", "Event 2"])
+        self.assertEqual(rows[1][2], "Line one\nline two, with comma")
+
+    def test_export_registrations_ndjson(self):
+        response = self.client.get(
+            reverse("events-export-registrations", args=[self.events[0].pk]), {"output": "ndjson"}
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["email"] for row in rows], ["organizer@example.com", "other@example.com"])
+
+    def test_export_registrations_requires_organizer(self):
+        response = self.client.get(reverse("events-export-registrations", args=[self.events[3].pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_output_format(self):
+        response = self.client.get(reverse("events-export"), {"output": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EmailOutboxTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="attendee@example.com", password="password", full_name="Attendee"
+        )
+        cls.event = Event.objects.create(
+            title="Conference",
+            description="Description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            organizer=cls.user,
+        )
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def register(self):
+        return self.client.post(reverse("registration", args=[self.event.pk]))
+
+    def drain(self):
+        call_command("send_outbox_emails", stdout=StringIO())
+
+    def test_registration_queues_email_without_sending(self):
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.recipient, "attendee@example.com")
+        self.assertEqual(message.status, EmailOutbox.Status.PENDING)
+
+    def test_email_goes_to_the_current_address(self):
+        # The token still carries the old claims.
+        CustomUser.objects.filter(pk=self.user.pk).update(email="moved@example.com", full_name="Renamed")
+        self.register()
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.recipient, "moved@example.com")
+        self.assertIn("Hello, Renamed!", message.message)
+
+    def test_duplicate_registration_does_not_queue_email(self):
+        self.register()
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_worker_sends_pending_emails(self):
+        self.register()
+        self.drain()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Conference", mail.outbox[0].subject)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.Status.SENT)
+        self.assertIsNotNone(message.sent_at)
+
+        self.drain()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_worker_reuses_one_connection_per_batch(self):
+        for i in range(5):
+            EmailOutbox.objects.create(subject=f"Subject {i}", message="Body", recipient=f"u{i}@example.com")
+
+        with mock.patch("apps.events.utils.get_connection", wraps=mail.get_connection) as get_connection:
+            self.drain()
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_worker_dying_mid_batch_keeps_delivered_emails(self):
+        for i in range(3):
+            EmailOutbox.objects.create(subject=f"Subject {i}", message="Body", recipient=f"u{i}@example.com")
+        send = mail.EmailMessage.send
+        calls = []
+
+        def die_on_second(message, *args, **kwargs):
+            calls.append(message)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return send(message, *args, **kwargs)
+
+        with mock.patch("apps.events.utils.EmailMessage.send", autospec=True, side_effect=die_on_second), \
+                self.assertRaises(KeyboardInterrupt):
+            self.drain()
+
+        self.assertEqual(
+            list(EmailOutbox.objects.order_by("pk").values_list("status", flat=True)),
+            [EmailOutbox.Status.SENT, EmailOutbox.Status.PENDING, EmailOutbox.Status.PENDING],
+        )
+        # The rest stay leased to the dead worker until the lease runs out.
+        self.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        EmailOutbox.objects.filter(status=EmailOutbox.Status.PENDING).update(next_attempt_at=timezone.now())
+        self.drain()
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"u{i}@example.com" for i in range(3)])
+
+    def test_failed_email_is_retried_with_backoff(self):
+        self.register()
+
+        with mock.patch("apps.events.utils.EmailMessage.send", side_effect=OSError("SMTP down")):
+            self.drain()
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, "SMTP down")
+        self.assertGreater(message.next_attempt_at, timezone.now())
+
+        # Not due yet, so the worker leaves it alone.
+        self.drain()
+        self.assertEqual(len(mail.outbox), 0)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.Status.SENT)
+
+    def test_email_is_dead_lettered_after_max_attempts(self):
+        self.register()
+
+        with mock.patch("apps.events.utils.EmailMessage.send", side_effect=OSError("SMTP down")):
+            for _ in range(EmailOutbox.MAX_ATTEMPTS):
+                EmailOutbox.objects.update(next_attempt_at=timezone.now())
+                self.drain()
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.Status.DEAD)
+        self.assertEqual(message.attempts, EmailOutbox.MAX_ATTEMPTS)
+
+
+class NotificationTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.attendees = [
+            CustomUser.objects.create_user(
+                email=f"attendee{i}@example.com", password="password", full_name=f"Attendee {i}"
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def create_event(self, starts_in):
+        response = self.client.post(reverse("events-list"), {
+            "title": "Conference",
+            "description": "Description",
+            "date": (timezone.now() + starts_in).isoformat(),
+            "location": "Kyiv",
+        })
+        event = Event.objects.get(pk=response.data["id"])
+        EventRegistration.objects.bulk_create(EventRegistration(user=user, event=event) for user in self.attendees)
+        return event
+
+    def send(self, chunk_size=2):
+        """Run the command; returns the number of attendee chunks loaded."""
+        with mock.patch.object(notifications, "get_attendees", wraps=notifications.get_attendees) as get_attendees:
+            call_command("send_event_notifications", "--chunk-size", str(chunk_size), stdout=StringIO())
+        return get_attendees.call_count
+
+    def test_reminder_is_sent_to_every_attendee_in_chunks(self):
+        event = self.create_event(timedelta(hours=2))
+
+        # Two chunks of 2, one of 1, then none left.
+        self.assertEqual(self.send(), 4)
+        self.assertEqual(len(mail.outbox), 5)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [user.email for user in self.attendees])
+        self.assertTrue(mail.outbox[0].subject.startswith("Reminder: Conference"))
+        notification = EventNotification.objects.get(event=event)
+        self.assertEqual(
+            (notification.status, notification.sent_count, notification.last_user_id),
+            (EventNotification.Status.SENT, 5, self.attendees[-1].pk),
+        )
+        self.assertEqual(self.send(), 0)
+
+    def test_reminder_is_due_before_the_event(self):
+        event = self.create_event(timedelta(days=5))
+
+        self.send()
+
+        self.assertEqual(len(mail.outbox), 0)
+        notification = EventNotification.objects.get(event=event, status=EventNotification.Status.PENDING)
+        self.assertEqual(notification.bucket, notifications.bucket_of(event.date - timedelta(hours=24)))
+
+    def test_moving_an_event_notifies_attendees_and_moves_the_reminder(self):
+        event = self.create_event(timedelta(days=5))
+        date = event.date + timedelta(days=2)
+
+        response = self.client.patch(reverse("events-detail", args=[event.pk]), {"date": date.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.patch(reverse("events-detail", args=[event.pk]), {"description": "Other"})
+
+        reminders = EventNotification.objects.filter(event=event, kind=EventNotification.Kind.REMINDER)
+        self.assertEqual(
+            sorted(reminders.values_list("status", "bucket")),
+            sorted([
+                (EventNotification.Status.CANCELLED, notifications.bucket_of(event.date - timedelta(hours=24))),
+                (EventNotification.Status.PENDING, notifications.bucket_of(date - timedelta(hours=24))),
+            ]),
+        )
+        self.send()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].subject, "Event Updated: Conference")
+        self.assertIn("Date: ", mail.outbox[0].body)
+
+    def test_broken_connection_is_retried_after_the_last_attendee_reached(self):
+        event = self.create_event(timedelta(hours=2))
+        send_messages = locmem.EmailBackend.send_messages
+        calls = []
+
+        def disconnect_on_third_message(backend, messages):
+            calls.append(messages)
+            if len(calls) == 3:
+                raise smtplib.SMTPServerDisconnected("connection lost")
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, "send_messages", disconnect_on_third_message), \
+                self.assertLogs("apps.events.notifications", "WARNING"):
+            call_command("send_event_notifications", "--chunk-size", "2", stdout=StringIO())
+
+        notification = EventNotification.objects.get(event=event)
+        self.assertEqual(
+            (notification.status, notification.attempts, notification.last_user_id, notification.sent_count),
+            (EventNotification.Status.PENDING, 1, self.attendees[1].pk, 2),
+        )
+        self.assertEqual(notification.last_error, "connection lost")
+        self.assertGreater(notification.bucket, timezone.now())
+
+        EventNotification.objects.filter(pk=notification.pk).update(bucket=timezone.now())
+        self.send()
+        # Nobody got it twice.
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [user.email for user in self.attendees])
+
+    def test_refused_recipient_goes_to_the_outbox(self):
+        event = self.create_event(timedelta(hours=2))
+        refused = self.attendees[2].email
+        send_messages = locmem.EmailBackend.send_messages
+
+        def refuse(backend, messages):
+            if messages[0].to == [refused]:
+                raise smtplib.SMTPRecipientsRefused({refused: (550, b"No such user")})
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, "send_messages", refuse), \
+                self.assertLogs("apps.events.notifications", "WARNING"):
+            self.send(chunk_size=5)
+
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [user.email for user in self.attendees if user.email != refused],
+        )
+        notification = EventNotification.objects.get(event=event)
+        self.assertEqual((notification.status, notification.sent_count), (EventNotification.Status.SENT, 4))
+        outbox = EmailOutbox.objects.get(recipient=refused)
+        self.assertEqual((outbox.status, outbox.attempts), (EmailOutbox.Status.PENDING, 1))
+        self.assertTrue(outbox.subject.startswith("Reminder: Conference"))
+        self.assertIn("No such user", outbox.last_error)
+
+    def test_email_outage_backs_off_and_keeps_running(self):
+        events = [self.create_event(timedelta(hours=2)) for _ in range(2)]
+        connection = mock.Mock(**{"open.side_effect": ConnectionRefusedError("connection refused")})
+
+        with mock.patch.object(notifications, "get_connection", return_value=connection), \
+                self.assertLogs("apps.events.notifications", "WARNING"):
+            call_command("send_event_notifications", stdout=StringIO())
+
+        self.assertEqual(connection.open.call_count, 2)
+        for notification in EventNotification.objects.filter(event__in=events):
+            self.assertEqual(
+                (notification.status, notification.attempts, notification.last_error),
+                (EventNotification.Status.PENDING, 1, "connection refused"),
+            )
+            self.assertGreater(notification.bucket, timezone.now())
+
+    def test_cancelled_notifications_open_no_connection(self):
+        event = self.create_event(timedelta(hours=2))
+        self.client.delete(reverse("events-detail", args=[event.pk]))
+
+        with mock.patch.object(notifications, "get_connection") as get_connection:
+            call_command("send_event_notifications", stdout=StringIO())
+        get_connection.return_value.open.assert_not_called()
+
+    def test_notifications_of_deleted_events_are_cancelled(self):
+        event = self.create_event(timedelta(hours=2))
+        self.client.delete(reverse("events-detail", args=[event.pk]))
+
+        self.send()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            EventNotification.objects.get(event=event).status, EventNotification.Status.CANCELLED
+        )
+
+
+class ChangeFeedTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def create_event(self, title):
+        return self.client.post(reverse("events-list"), {
+            "title": title,
+            "description": "Description",
+            "date": (timezone.now() + timedelta(days=1)).isoformat(),
+            "location": "Kyiv",
+        }).data["id"]
+
+    def sync(self, since, **params):
+        response = self.client.get(reverse("events-changes"), {"since": since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_returns_what_changed_since_the_token(self):
+        first, second = self.create_event("First"), self.create_event("Second")
+        feed = self.sync(0)
+        self.assertEqual([(change["action"], change["id"]) for change in feed["results"]], [
+            ("created", first), ("created", second),
+        ])
+        self.assertEqual(feed["results"][0]["event"]["title"], "First")
+        self.assertFalse(feed["has_more"])
+        # Up to date: a single index probe.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sync(feed["since"])["results"], [])
+
+        self.client.patch(reverse("events-detail", args=[first]), {"title": "Renamed"})
+        self.client.patch(reverse("events-detail", args=[first]), {"location": "Lviv"})
+        self.client.delete(reverse("events-detail", args=[second]))
+
+        changes = self.sync(feed["since"])
+        self.assertEqual(
+            [(change["action"], change["id"]) for change in changes["results"]],
+            [("updated", first), ("deleted", second)],
+        )
+        self.assertEqual(changes["results"][0]["event"]["location"], "Lviv")
+        self.assertIsNone(changes["results"][1]["event"])
+        self.assertEqual(self.sync(changes["since"])["results"], [])
+
+    def test_feed_pages_with_has_more(self):
+        ids = [self.create_event(f"Event {i}") for i in range(3)]
+
+        page = self.sync(0, page_size=2, fields="title")
+        self.assertTrue(page["has_more"])
+        self.assertEqual(page["results"][0]["event"], {"title": "Event 0"})
+        rest = self.sync(page["since"], page_size=2)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual([change["id"] for change in page["results"] + rest["results"]], ids)
+
+    @skipUnless(connection.vendor == "postgresql", "Transaction ids require PostgreSQL")
+    def test_uncommitted_lower_id_is_served_after_it_commits(self):
+        first = self.create_event("First")
+        writer = load_backend(connection.settings_dict["ENGINE"]).DatabaseWrapper(
+            connection.settings_dict, connection.alias
+        )
+        try:
+            writer.set_autocommit(False)
+            with writer.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO events_eventchange (event_id, action, changed_at) VALUES (%s, 'updated', now())",
+                    [first],
+                )
+            second = self.create_event("Second")
+
+            feed = self.sync(0)
+            self.assertEqual([change["id"] for change in feed["results"]], [first, second])
+
+            writer.commit()
+            changes = self.sync(feed["since"])
+            self.assertEqual(
+                [(change["action"], change["id"]) for change in changes["results"]], [("updated", first)]
+            )
+        finally:
+            writer.rollback()
+            with writer.cursor() as cursor:
+                cursor.execute("DELETE FROM events_eventchange WHERE event_id = %s", [first])
+            writer.commit()
+            writer.close()
+
+    def test_invalid_token(self):
+        for since in ("abc", "1:abc", "-1"):
+            response = self.client.get(reverse("events-changes"), {"since": since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventCacheTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.event = Event.objects.create(
+            title="Conference",
+            description="Description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            organizer=cls.organizer,
+        )
+
+    def authenticate(self):
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_list_is_served_from_cache(self):
+        self.client.get(reverse("events-list"), {"location__iexact": "Kyiv"})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("events-list"), {"location__iexact": " kyiv", "unknown": "1"})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_retrieve_is_served_from_cache(self):
+        url = reverse("events-detail", args=[self.event.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data["title"], "Conference")
+
+    def test_if_none_match_returns_not_modified(self):
+        url = reverse("events-detail", args=[self.event.pk])
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for header in (f'"other", W/{etag}', "*"):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # A tag containing the ETag does not match it.
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"x{etag[1:]}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Nor does `*` a missing event.
+        response = self.client.get(reverse("events-detail", args=[0]), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_invalidates_list_and_detail(self):
+        detail_url = reverse("events-detail", args=[self.event.pk])
+        etag = self.client.get(detail_url)["ETag"]
+        self.client.get(reverse("events-list"))
+
+        self.authenticate()
+        self.client.patch(detail_url, {"title": "Renamed"})
+        self.client.credentials()
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "Renamed")
+        self.assertEqual(self.client.get(reverse("events-list")).data["results"][0]["title"], "Renamed")
+
+    def test_create_and_destroy_invalidate_list(self):
+        self.client.get(reverse("events-list"))
+        self.authenticate()
+        response = self.client.post(reverse("events-list"), {
+            "title": "Workshop",
+            "description": "Description",
+            "date": (timezone.now() + timedelta(days=1)).isoformat(),
+            "location": "Lviv",
+        })
+        self.client.credentials()
+        titles = [event["title"] for event in self.client.get(reverse("events-list")).data["results"]]
+        self.assertEqual(titles, ["Workshop", "Conference"])
+
+        self.authenticate()
+        self.client.delete(reverse("events-detail", args=[response.data["id"]]))
+        self.client.credentials()
+        titles = [event["title"] for event in self.client.get(reverse("events-list")).data["results"]]
+        self.assertEqual(titles, ["Conference"])
+
+
+class AsyncViewTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com", password="password", full_name="User"
+        )
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}",
+                description="Description",
+                date=timezone.now() + timedelta(days=i + 1),
+                location="Kyiv",
+                capacity=1,
+                organizer=cls.organizer,
+            )
+            for i in range(3)
+        ])
+
+    def register(self, user, event, **data):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        return self.client.post(
+            reverse("async-registration", args=[event.pk]),
+            json.dumps(data),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+    def test_list_matches_sync_view(self):
+        params = {"page_size": 2}
+        response = self.client.get(reverse("async-events-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        # Each view is cached apart, with its own pagination links.
+        sync_data = json.loads(json.dumps(self.client.get(reverse("events-list"), params).data))
+        self.assertEqual(data["results"], sync_data["results"])
+        self.assertIn(reverse("async-events-list"), data["next"])
+        self.assertEqual(data["next"].replace(reverse("async-events-list"), reverse("events-list")), sync_data["next"])
+        response = self.client.get(reverse("events-list"), params, secure=True)
+        self.assertTrue(response.data["next"].startswith("https://"))
+
+        response = self.client.get(reverse("async-events-list"), {"cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve(self):
+        response = self.client.get(reverse("async-events-detail", args=[self.events[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["title"], "Event 0")
+
+        response = self.client.get(
+            reverse("async-events-detail", args=[self.events[0].pk]),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse("async-events-detail", args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fieldsets(self):
+        response = self.client.get(reverse("async-events-list"), {"fields": "id,title"})
+        self.assertEqual(response.json()["results"][0], {"id": self.events[0].pk, "title": "Event 0"})
+        url = reverse("async-events-detail", args=[self.events[0].pk])
+        response = self.client.get(url, {"omit": "description"})
+        self.assertEqual(
+            response.json(),
+            {key: value for key, value in self.client.get(url).json().items() if key != "description"},
+        )
+        response = self.client.get(url, {"fields": "id,unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"fields": "Unknown fields: unknown."})
+
+    def test_registration(self):
+        response = self.client.post(reverse("async-registration", args=[self.events[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.register(self.user, self.events[0])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["event"], "Event 0")
+        self.assertEqual(EmailOutbox.objects.get().recipient, "user@example.com")
+
+        response = self.register(self.user, self.events[0], waitlist=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.register(self.organizer, self.events[0])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.register(self.organizer, self.events[0], waitlist=True)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+
+class PoolStatsTests(APITestCase):
+
+    def test_wait_histogram_is_cumulative(self):
+        histogram = Histogram(buckets=(1, 10))
+        for ms in (0.5, 5, 5, 500):
+            histogram.observe(ms)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], {"1": 1, "10": 3, "+Inf": 4})
+        self.assertEqual(snapshot["count"], 4)
+
+    def test_pooled_database_stats(self):
+        pool = mock.Mock(min_size=2, max_size=4, timeout=10, max_idle=600)
+        pool.get_stats.return_value = {"pool_size": 3, "pool_available": 1, "requests_waiting": 2}
+
+        with mock.patch("core.db.pool.get_pool", return_value=pool):
+            stats = get_pool_stats()["databases"]["default"]
+        self.assertEqual((stats["in_use"], stats["available"], stats["waiting"]), (2, 1, 2))
+        self.assertIn("+Inf", stats["wait_ms"]["buckets"])
+
+    def test_endpoint_is_staff_only(self):
+        user = CustomUser.objects.create_user(
+            email="user@example.com", password="password", full_name="User"
+        )
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(reverse("db-pool-stats")).status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse("db-pool-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["databases"]["default"]["pooled"])
+
+
+class RegistrationCountTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com", password="password", full_name="User"
+        )
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}",
+                description="Description",
+                date=timezone.now() + timedelta(days=i + 1),
+                location="Kyiv",
+                organizer=cls.organizer,
+            )
+            for i in range(5)
+        ])
+
+    def authenticate(self, user):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_count_is_served_and_invalidated_on_registration(self):
+        event = self.events[0]
+        response = self.client.get(reverse("events-detail", args=[event.pk]))
+        self.assertEqual(response.data["registrations_count"], 0)
+
+        self.authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("registration", args=[event.pk]))
+
+        response = self.client.get(reverse("events-detail", args=[event.pk]))
+        self.assertEqual(response.data["registrations_count"], 1)
+        response = self.client.get(reverse("events-list"))
+        self.assertEqual(response.data["results"][0]["registrations_count"], 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        seats.register(self.user, self.events[0])
+        seats.register(self.organizer, self.events[0])
+        Event.objects.filter(pk=self.events[0].pk).update(registrations_count=5)
+        Event.objects.filter(pk=self.events[1].pk).update(registrations_count=1)
+
+        out = StringIO()
+        call_command("reconcile_registrations_count", "--dry-run", stdout=out)
+        self.assertIn("2 event(s) drifted", out.getvalue())
+        self.assertEqual(Event.objects.get(pk=self.events[0].pk).registrations_count, 5)
+
+        out = StringIO()
+        call_command("reconcile_registrations_count", "--batch-size", "2", stdout=out)
+        self.assertIn("Repaired 2 event(s)", out.getvalue())
+        self.assertEqual(
+            list(Event.objects.order_by("pk").values_list("registrations_count", flat=True)),
+            [2, 0, 0, 0, 0],
+        )
+
+    def test_my_registrations_are_paginated_newest_first(self):
+        now = timezone.now()
+        for i, event in enumerate(self.events):
+            registration = seats.register(self.user, event)
+            EventRegistration.objects.filter(pk=registration.pk).update(
+                registered_at=now - timedelta(hours=i)
+            )
+        seats.register(self.organizer, self.events[0])
+
+        self.authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("registrations-me"), {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["event"]["id"] for r in response.data["results"]],
+                         [self.events[0].pk, self.events[1].pk])
+        self.assertEqual(response.data["results"][0]["event"]["registrations_count"], 2)
+
+        titles = [r["event"]["title"] for r in response.data["results"]]
+        url = response.data["next"]
+        while url:
+            response = self.client.get(url)
+            titles += [r["event"]["title"] for r in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(titles, [f"Event {i}" for i in range(5)])
+
+        previous = self.client.get(response.data["previous"])
+        self.assertEqual([r["event"]["title"] for r in previous.data["results"]], ["Event 2", "Event 3"])
+
+    def test_my_registrations_require_authentication(self):
+        response = self.client.get(reverse("registrations-me"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class DeletionTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.users = CustomUser.objects.bulk_create([
+            CustomUser(email=f"user{i}@example.com", full_name=f"User {i}") for i in range(5)
+        ])
+        cls.event = Event.objects.create(
+            title="Workshop",
+            description="Description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            capacity=2,
+            organizer=cls.organizer,
+        )
+
+    def authenticate(self, user):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_cancel_registration_promotes_waitlist(self):
+        seats.register(self.users[0], self.event)
+        seats.register(self.users[1], self.event)
+        seats.join_waitlist(self.users[2], self.event)
+
+        self.authenticate(self.users[0])
+        response = self.client.delete(reverse("registration", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertQuerySetEqual(
+            self.event.registrations.order_by("user_id").values_list("user__email", flat=True),
+            ["user1@example.com", "user2@example.com"],
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registrations_count, 2)
+
+        response = self.client.delete(reverse("registration", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_leaves_waitlist(self):
+        seats.join_waitlist(self.users[3], self.event)
+        self.authenticate(self.users[3])
+        response = self.client.delete(reverse("registration", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.event.waitlist_entries.exists())
+
+    def test_delete_hides_event_and_purge_removes_it(self):
+        for user in self.users[:2]:
+            seats.register(user, self.event)
+        seats.join_waitlist(self.users[2], self.event)
+
+        self.authenticate(self.organizer)
+        response = self.client.delete(reverse("events-detail", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(reverse("events-detail", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse("events-list")).data["results"], [])
+        self.assertEqual(self.client.get(reverse("events-list"), {"search": "workshop"}).data["results"], [])
+        self.authenticate(self.users[3])
+        response = self.client.post(reverse("registration", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # The registrations are still there until the purge.
+        self.assertEqual(EventRegistration.objects.filter(event_id=self.event.pk).count(), 2)
+
+        out = StringIO()
+        call_command("purge_deleted_events", "--batch-size", "1", stdout=out)
+        self.assertIn(f"Purged event {self.event.pk} and 2 registration(s)", out.getvalue())
+        self.assertFalse(Event.all_objects.exists())
+        self.assertFalse(EventRegistration.objects.exists())
+
+    def test_purge_keeps_recently_deleted_events(self):
+        self.authenticate(self.organizer)
+        self.client.delete(reverse("events-detail", args=[self.event.pk]))
+
+        call_command("purge_deleted_events", "--older-than", "60", stdout=StringIO())
+        self.assertTrue(Event.all_objects.filter(pk=self.event.pk).exists())
+
+
+class CalendarTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+
+    def setUp(self):
+        super().setUp()
+        token = UserClaimsRefreshToken.for_user(self.organizer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def create_event(self, title, date, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("events-list"),
+                {"title": title, "description": "Description", "date": date, "location": "Kyiv", **data},
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def get_calendar(self, date_from="2030-03-01", date_to="2030-03-31"):
+        return self.client.get(reverse("events-calendar"), {"date_from": date_from, "date_to": date_to})
+
+    def test_calendar_counts_and_stubs(self):
+        first = self.create_event("Meetup", "2030-03-05T18:00:00Z")
+        second = self.create_event("Workshop", "2030-03-05T09:30:00Z")
+        self.create_event("Conference", "2030-03-20T10:00:00Z")
+        self.create_event("Outside", "2030-04-02T10:00:00Z")
+
+        with self.assertNumQueries(1):
+            response = self.get_calendar()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([day["date"] for day in response.data], ["2030-03-05", "2030-03-20"])
+        self.assertEqual(response.data[0]["count"], 2)
+        self.assertEqual(response.data[0]["events"], [
+            {"id": second, "title": "Workshop", "time": "09:30:00", "location": "Kyiv"},
+            {"id": first, "title": "Meetup", "time": "18:00:00", "location": "Kyiv"},
+        ])
+
+    def test_updates_and_deletes_keep_buckets_in_sync(self):
+        event_id = self.create_event("Meetup", "2030-03-05T18:00:00Z")
+        url = reverse("events-detail", args=[event_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"date": "2030-03-07T18:00:00Z", "title": "Moved"})
+        self.assertQuerySetEqual(EventDayBucket.objects.values_list("day", "count"), [
+            (date(2030, 3, 7), 1),
+        ])
+        self.assertEqual(self.get_calendar().data[0]["events"][0]["title"], "Moved")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        self.assertFalse(EventDayBucket.objects.exists())
+        self.assertEqual(self.get_calendar().data, [])
+
+    def test_counts_days_with_more_events_than_stubs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("events-bulk"),
+                [
+                    {
+                        "title": f"Event {i}",
+                        "description": "Description",
+                        "date": f"2030-03-10T{i % 24:02d}:00:00Z",
+                        "location": "Lviv",
+                    }
+                    for i in range(MAX_STUBS_PER_DAY + 5)
+                ],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        (day,) = self.get_calendar().data
+        self.assertEqual(day["count"], MAX_STUBS_PER_DAY + 5)
+        self.assertEqual(len(day["events"]), MAX_STUBS_PER_DAY)
+
+    def test_invalid_windows(self):
+        self.assertEqual(self.get_calendar(date_to="2030-02-01").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_calendar(date_to="2030-06-01").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("events-calendar"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ics_feed_conditional_get(self):
+        event_id = self.create_event("Meetup; with friends", "2030-03-05T18:00:00Z")
+        url = reverse("organizer-calendar", args=[self.organizer.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        body = response.content.decode()
+        self.assertIn("SUMMARY:Meetup\\; with friends\r\n", body)
+        self.assertIn("DTSTART:20300305T180000Z\r\n", body)
+        self.assertIn(f"UID:event-{event_id}@testserver\r\n", body)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        etag = response["ETag"]
+        self.client.patch(reverse("events-detail", args=[event_id]), {"description": "New"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("DESCRIPTION:New\r\n", response.content.decode())
+
+    def test_ics_feed_unknown_organizer(self):
+        response = self.client.get(reverse("organizer-calendar", args=[self.organizer.pk + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SparseFieldsetTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.event = Event.objects.create(
+            title="Meetup",
+            description="A long description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            organizer=cls.organizer,
+        )
+
+    def test_fields_narrow_response_and_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("events-list"), {"fields": "id,title,date"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["results"][0]), ["id", "title", "date"])
+        (query,) = context.captured_queries
+        self.assertNotIn("description", query["sql"])
+        self.assertNotIn("users_customuser", query["sql"])
+
+        # Cached separately from the full response.
+        response = self.client.get(reverse("events-list"))
+        self.assertIn("description", response.data["results"][0])
+
+    def test_omit(self):
+        response = self.client.get(reverse("events-detail", args=[self.event.pk]), {"omit": "description"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("description", response.data)
+        self.assertEqual(response.data["organizer"], "Organizer")
+
+    def test_unknown_fields(self):
+        response = self.client.get(reverse("events-list"), {"fields": "id,secret", "omit": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {"fields", "omit"})
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            "date": timezone.now(),
+            "price": Decimal("1.50"),
+            "items": [{"title": "Київ ✓", "count": 1, "ratio": 0.5, "none": None}],
+            1: True,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_benchmark_serialization_command(self):
+        stdout = StringIO()
+        call_command("benchmark_serialization", "--events", "20", "--repeat", "1", stdout=stdout, stderr=StringIO())
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(set(result["fieldsets"]), {"full", "compact", "without description"})
+        self.assertLess(result["fieldsets"]["compact"]["bytes"], result["fieldsets"]["full"]["bytes"])
+
+
+class GeoTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        date = timezone.now() + timedelta(days=3)
+        places = {
+            "Podil": (50.4656, 30.5154),
+            "Obolon": (50.5010, 30.4980),
+            "Brovary": (50.5110, 30.7909),
+            "Lviv": (49.8397, 24.0297),
+            "Fiji": (-17.7134, 179.9900),
+            "Samoa": (-13.7590, -172.1046),
+        }
+        for title, (latitude, longitude) in places.items():
+            Event.objects.create(
+                title=title, description="Description", date=date, location=title,
+                latitude=latitude, longitude=longitude, organizer=cls.organizer,
+            )
+        Event.objects.create(
+            title="Online", description="Description", date=date, location="Remote", organizer=cls.organizer
+        )
+        Event.objects.create(
+            title="Later in Podil", description="Description", date=date + timedelta(days=30),
+            location="Kyiv", latitude=50.4650, longitude=30.5150, organizer=cls.organizer,
+        )
+        cls.kyiv = "50.4501,30.5234"
+
+    def test_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        event = Event.objects.get(title="Podil")
+        self.assertTrue(event.geohash.startswith("u8vx"))
+        self.assertEqual(Event.objects.get(title="Online").geohash, "")
+
+    def test_near_sorted_by_distance(self):
+        response = self.client.get(reverse("events-list"), {"near": self.kyiv, "radius": 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([event["title"] for event in results], ["Later in Podil", "Podil", "Obolon"])
+        self.assertEqual(
+            [event["distance"] for event in results], sorted(event["distance"] for event in results)
+        )
+        self.assertAlmostEqual(
+            results[1]["distance"] / 1000, geo.haversine_km(50.4501, 30.5234, 50.4656, 30.5154), places=2
+        )
+
+        response = self.client.get(reverse("events-list"), {"near": self.kyiv, "radius": 30})
+        self.assertIn("Brovary", [event["title"] for event in response.data["results"]])
+        self.assertNotIn("distance", self.client.get(reverse("events-list")).data["results"][0])
+
+    def test_near_composes_with_date_range_and_pages(self):
+        params = {"near": self.kyiv, "radius": 10, "date_to": (timezone.now() + timedelta(days=10)).date()}
+        response = self.client.get(reverse("events-list"), params)
+        self.assertEqual([event["title"] for event in response.data["results"]], ["Podil", "Obolon"])
+
+        response = self.client.get(reverse("events-list"), {"near": self.kyiv, "radius": 10, "page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(response.data["next"])
+        self.assertEqual([event["title"] for event in response.data["results"]], ["Obolon"])
+
+    def test_bbox_across_antimeridian(self):
+        response = self.client.get(reverse("events-list"), {"bbox": "-20,170,-10,-170"})
+        self.assertEqual({event["title"] for event in response.data["results"]}, {"Fiji", "Samoa"})
+        response = self.client.get(reverse("events-list"), {"bbox": "49,23,51,31"})
+        self.assertEqual(
+            {event["title"] for event in response.data["results"]},
+            {"Podil", "Obolon", "Brovary", "Lviv", "Later in Podil"},
+        )
+
+    def test_invalid_parameters(self):
+        for params in [
+            {"near": "50.4"}, {"near": "95,30"}, {"near": self.kyiv, "radius": 1000}, {"bbox": "1,2,3"},
+        ]:
+            response = self.client.get(reverse("events-list"), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_coordinates_are_validated_and_update_geohash(self):
+        self.client.force_authenticate(self.organizer)
+        data = {"title": "T", "description": "D", "date": "2030-01-01T10:00:00Z", "location": "Kyiv"}
+        response = self.client.post(reverse("events-list"), {**data, "latitude": 50.45})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse("events-list"), {**data, "latitude": 50.45, "longitude": 30.52})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse("events-detail", args=[response.data["id"]])
+        response = self.client.patch(url, {"latitude": 49.84, "longitude": 24.03})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Event.objects.get(pk=response.data["id"]).geohash.startswith("u8c"))
+
+    def test_benchmark_geo_command(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_geo", "--events", "2000", "--queries", "5", "--database", stdout=stdout, stderr=StringIO()
+        )
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(result["full_scan"]["mismatches"], 0)
+        self.assertIn("database", result)
+        self.assertEqual(Event.objects.count(), 8)
+
+
+REPLICA_ALIAS = "replica_standin"
+
+
+class StandInDatabasesMixin:
+    """
+    Local in-memory SQLite databases, `standin_aliases`, stand in for other
+    database servers. They are dynamically created connections, not in
+    settings.DATABASES, so they are managed here: migrated once and rolled
+    back after every test.
+    """
+    standin_aliases = ()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for alias in cls.standin_aliases:
+            settings_dict = connections.configure_settings({
+                "default": connections.settings["default"],
+                alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+            })[alias]
+            connections[alias] = load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, alias)
+            call_command("migrate", database=alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in cls.standin_aliases:
+            # close() keeps in-memory SQLite databases open.
+            connections[alias].connection.close()
+            del connections[alias]
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        for alias in self.standin_aliases:
+            atomic = transaction.atomic(using=alias)
+            atomic.__enter__()
+
+            def rollback(alias=alias, atomic=atomic):
+                transaction.set_rollback(True, using=alias)
+                atomic.__exit__(None, None, None)
+
+            self.addCleanup(rollback)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ReplicaRoutingTests(StandInDatabasesMixin, EventAPITestCase):
+    """
+    A stand-in database serves as the replica. Nothing replicates into it,
+    so a row only visible on the primary shows where a read was served from.
+    """
+    standin_aliases = [REPLICA_ALIAS]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.event = Event.objects.create(
+            title="Meetup", description="Description", date=timezone.now() + timedelta(days=3),
+            location="Kyiv", organizer=cls.organizer,
+        )
+
+    def setUp(self):
+        super().setUp()
+        caches[settings.AUTH_CACHE_ALIAS].clear()
+        replica_health.clear()
+
+    def authenticate(self, user):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def replicate(self, *objects):
+        for obj in objects:
+            obj.save(using=REPLICA_ALIAS, force_insert=True)
+
+    def test_anonymous_reads_use_replica(self):
+        response = self.client.get(reverse("events-detail", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.replicate(self.organizer, self.event)
+        response = self.client.get(reverse("events-list"))
+        self.assertEqual([event["id"] for event in response.data["results"]], [self.event.pk])
+
+    def test_writer_reads_own_writes_from_primary(self):
+        self.replicate(self.organizer, self.event)
+        url = reverse("events-list")
+        # Once a version is older than the replicas may lag, replica responses are cached.
+        with override_settings(DB_REPLICA_MAX_LAG=0):
+            self.assertIn("ETag", self.client.get(url))
+
+        # One token throughout: the pin is keyed by the Authorization header.
+        authorization = f"Bearer {UserClaimsRefreshToken.for_user(self.organizer).access_token}"
+        self.client.credentials(HTTP_AUTHORIZATION=authorization)
+        response = self.client.post(url, {
+            "title": "New", "description": "Description", "date": "2030-01-01T10:00:00Z", "location": "Lviv",
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = response.data["id"]
+
+        # Other clients read the replica, which has not seen the event yet.
+        # That response is not cached under the version the write bumped...
+        self.client.credentials()
+        response = self.client.get(url)
+        self.assertEqual([event["id"] for event in response.data["results"]], [self.event.pk])
+        self.assertNotIn("ETag", response)
+        detail_url = reverse("events-detail", args=[created])
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+        # ...so the writer reads the event from the primary, then the cache.
+        self.client.credentials(HTTP_AUTHORIZATION=authorization)
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual([event["id"] for event in response.data["results"]], [self.event.pk, created])
+            self.assertIn("ETag", response)
+            self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_200_OK)
+
+    def test_registration_pins_to_primary(self):
+        attendee = CustomUser.objects.create_user(
+            email="attendee@example.com", password="password", full_name="Attendee"
+        )
+        self.authenticate(attendee)
+        response = self.client.get(reverse("registrations-me"))
+        self.assertEqual(response.data["results"], [])
+
+        self.replicate(self.organizer, self.event, attendee)
+        self.client.post(reverse("registration", args=[self.event.pk]))
+        response = self.client.get(reverse("registrations-me"))
+        self.assertEqual([item["event"]["id"] for item in response.data["results"]], [self.event.pk])
+
+    def test_lagging_or_failing_replica_falls_back_to_primary(self):
+        url = reverse("events-detail", args=[self.event.pk])
+        with mock.patch("core.db.replicas.get_replica_lag", return_value=60.0), \
+                self.assertLogs("core.db.replicas", "WARNING"):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        replica_health.clear()
+        with mock.patch("core.db.replicas.get_replica_lag", side_effect=DatabaseError), \
+                self.assertLogs("core.db.replicas", "WARNING"):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    async def test_async_views_route_reads(self):
+        url = reverse("async-events-detail", args=[self.event.pk])
+        self.assertEqual((await self.async_client.get(url)).status_code, status.HTTP_404_NOT_FOUND)
+
+        # After registering the client reads the primary.
+        headers = {"Authorization": f"Bearer {UserClaimsRefreshToken.for_user(self.organizer).access_token}"}
+        response = await self.async_client.post(
+            reverse("async-registration", args=[self.event.pk]), "{}", content_type="application/json", headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((await self.async_client.get(url, headers=headers)).status_code, status.HTTP_200_OK)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_disabled_without_replicas(self):
+        response = self.client.get(reverse("events-detail", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+SHARD_ALIASES = ["shard_a", "shard_b"]
+
+
+@override_settings(REGISTRATION_SHARDS=SHARD_ALIASES, REGISTRATION_SHARDS_PREVIOUS=[])
+class RegistrationShardingTests(StandInDatabasesMixin, EventAPITestCase):
+    """Two stand-in databases hold the registrations."""
+    standin_aliases = SHARD_ALIASES
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.user = CustomUser.objects.create_user(
+            email="attendee@example.com", password="password", full_name="Attendee"
+        )
+        start = timezone.now() + timedelta(days=1)
+        cls.events = Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}", description="Description", location="Kyiv",
+                date=start + timedelta(hours=i), organizer=cls.organizer,
+            )
+            for i in range(6)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def authenticate(self, user):
+        token = UserClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def stored_in(self, event):
+        """The aliases holding registrations of `event`."""
+        return [
+            alias for alias in ["default", *SHARD_ALIASES]
+            if EventRegistration.objects.using(alias).filter(event=event).exists()
+        ]
+
+    def test_jump_hash_is_balanced_and_moves_few_keys(self):
+        before = [shards.jump_hash(key, 4) for key in range(1, 20001)]
+        after = [shards.jump_hash(key, 5) for key in range(1, 20001)]
+        for bucket in range(4):
+            self.assertAlmostEqual(before.count(bucket) / len(before), 0.25, delta=0.02)
+        moved = [(old, new) for old, new in zip(before, after) if old != new]
+        # Only the keys of the new bucket move.
+        self.assertEqual({new for _, new in moved}, {4})
+        self.assertAlmostEqual(len(moved) / len(before), 0.2, delta=0.02)
+
+    def test_events_are_spread_over_the_shards(self):
+        self.assertEqual({shards.shard_for(event.pk) for event in self.events}, set(SHARD_ALIASES))
+
+    def test_registration_is_stored_in_the_event_shard(self):
+        for event in self.events[:3]:
+            url = reverse("registration", args=[event.pk])
+            self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.stored_in(event), [shards.shard_for(event.pk)])
+            self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(event.registrations.count(), 1)
+
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+            self.assertEqual(self.stored_in(event), [])
+            event.refresh_from_db()
+            self.assertEqual(event.registrations_count, 0)
+
+    def test_bulk_registration_writes_every_shard(self):
+        ids = [event.pk for event in self.events]
+        response = self.client.post(reverse("registration-bulk"), {"events": ids}, format="json")
+        self.assertEqual({result["status"] for result in response.data}, {"registered"})
+        for event in self.events:
+            self.assertEqual(self.stored_in(event), [shards.shard_for(event.pk)])
+
+        response = self.client.post(reverse("registration-bulk"), {"events": ids}, format="json")
+        self.assertEqual({result["status"] for result in response.data}, {"already_registered"})
+
+    def test_user_registrations_are_merged_from_every_shard(self):
+        for event in self.events:
+            seats.register(self.user, event)
+        deleted = self.events[2]
+        self.client.credentials()
+        self.authenticate(self.organizer)
+        self.assertEqual(
+            self.client.delete(reverse("events-detail", args=[deleted.pk])).status_code,
+            status.HTTP_204_NO_CONTENT,
+        )
+        self.authenticate(self.user)
+
+        url = reverse("registrations-me") + "?page_size=2"
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles.extend(registration["event"]["title"] for registration in response.data["results"])
+            url = response.data["next"]
+        # Newest first, without the deleted event.
+        self.assertEqual(titles, [event.title for event in reversed(self.events) if event != deleted])
+
+    def test_export_reads_the_event_shard(self):
+        event = self.events[0]
+        seats.register(self.user, event)
+        seats.register(self.organizer, event)
+        self.authenticate(self.organizer)
+
+        response = self.client.get(reverse("events-export-registrations", args=[event.pk]))
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(sorted(row["email"] for row in rows), [self.user.email, self.organizer.email])
+
+    def test_reconcile_counts_every_shard(self):
+        for event in self.events[:2]:
+            seats.register(self.user, event)
+        Event.objects.filter(pk__in=[event.pk for event in self.events]).update(registrations_count=5)
+
+        drifted = list(seats.reconcile_registrations_count())
+        self.assertEqual(
+            drifted,
+            [(event.pk, 5, 1 if i < 2 else 0) for i, event in enumerate(self.events)],
+        )
+
+    def test_deleting_a_user_deletes_their_sharded_registrations(self):
+        for event in self.events:
+            seats.register(self.user, event)
+        self.user.delete()
+        for event in self.events:
+            self.assertEqual(self.stored_in(event), [])
+
+    def test_reshard_moves_registrations_while_serving(self):
+        with override_settings(REGISTRATION_SHARDS=[]):
+            for event in self.events:
+                seats.register(self.user, event)
+        registered_at = dict(EventRegistration.objects.values_list("event_id", "registered_at"))
+
+        with override_settings(REGISTRATION_SHARDS_PREVIOUS=["default"]):
+            # Registrations still in the old layout are found...
+            url = reverse("registration", args=[self.events[0].pk])
+            self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.get(reverse("registrations-me"))
+            self.assertEqual(len(response.data["results"]), len(self.events))
+            # ...and cancelled.
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+
+            out = StringIO()
+            call_command("reshard_registrations", "--batch-size", "2", stdout=out)
+            self.assertIn(f"Moved {len(self.events) - 1} registration(s).", out.getvalue())
+
+        self.assertFalse(EventRegistration.objects.using("default").exists())
+        for event in self.events[1:]:
+            self.assertEqual(self.stored_in(event), [shards.shard_for(event.pk)])
+            registration = EventRegistration.objects.using(shards.shard_for(event.pk)).get(event=event)
+            self.assertEqual(registration.registered_at, registered_at[event.pk])
+
+    def test_reshard_requires_a_previous_layout(self):
+        with self.assertRaises(CommandError):
+            call_command("reshard_registrations", stdout=StringIO())
+
+
+postgresql_only = skipUnless(connection.vendor == "postgresql", "Partitioning requires PostgreSQL")
+
+
+class PartitioningTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.user = CustomUser.objects.create_user(
+            email="attendee@example.com", password="password", full_name="Attendee"
+        )
+
+    def create_event(self, date, **kwargs):
+        return Event.objects.create(
+            title="Event", description="Description", location="Kyiv", date=date, organizer=self.organizer,
+            **kwargs,
+        )
+
+    def partition_of(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM events_event WHERE id = %s", [event.pk])
+            return cursor.fetchone()[0]
+
+    @skipIf(connection.vendor == "postgresql", "The events table is partitioned on PostgreSQL")
+    def test_command_requires_a_partitioned_table(self):
+        with self.assertRaises(CommandError):
+            call_command("partition_events", stdout=StringIO())
+
+    @postgresql_only
+    def test_creates_partitions_ahead_and_moves_rows_out_of_the_default(self):
+        now = timezone.now()
+        far = self.create_event(now + timedelta(days=150))
+        self.assertEqual(self.partition_of(far), partitions.DEFAULT_PARTITION)
+
+        call_command("partition_events", "--months-ahead", "6", stdout=StringIO())
+
+        self.assertEqual(self.partition_of(far), partitions.partition_name(partitions.month_of(far.date)))
+        soon = self.create_event(now + timedelta(days=40))
+        self.assertEqual(self.partition_of(soon), partitions.partition_name(partitions.month_of(soon.date)))
+        self.assertEqual(partitions.ensure_partitions(6), [])
+
+    @postgresql_only
+    def test_archived_events_are_retrieved_by_id(self):
+        now = timezone.now()
+        past = self.create_event(now - timedelta(days=400), registrations_count=1)
+        deleted = self.create_event(now - timedelta(days=400), deleted_at=now)
+        upcoming = self.create_event(now + timedelta(days=1))
+        EventRegistration.objects.create(user=self.user, event=past)
+        EventRegistration.objects.create(user=self.user, event=upcoming)
+
+        stdout = StringIO()
+        call_command("partition_events", "--archive-after", "1", stdout=stdout)
+
+        self.assertIn(f"Archived {partitions.month_of(past.date):%Y-%m}: 2 event(s), 1 registration(s)", stdout.getvalue())
+        self.assertFalse(Event.all_objects.filter(pk__in=[past.pk, deleted.pk]).exists())
+        self.assertEqual(
+            list(EventChange.objects.filter(action=EventChange.Action.DELETED).values_list("event_id", flat=True)),
+            [past.pk],
+        )
+        self.assertEqual(list(EventRegistration.objects.values_list("event_id", flat=True)), [upcoming.pk])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT event_id FROM {partitions.ARCHIVE_SCHEMA}.events_eventregistration")
+            self.assertEqual(cursor.fetchall(), [(past.pk,)])
+
+        response = self.client.get(reverse("events-detail", args=[past.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["id"], response.data["registrations_count"]), (past.pk, 1))
+        self.assertEqual(self.client.get(reverse("events-detail", args=[deleted.pk])).status_code, 404)
+        response = self.client.get(reverse("async-events-detail", args=[past.pk]), {"fields": "id,title"})
+        self.assertEqual(response.json(), {"id": past.pk, "title": "Event"})
+        response = self.client.get(reverse("events-list"))
+        self.assertEqual([event["id"] for event in response.data["results"]], [upcoming.pk])
+
+        # Nothing is left to archive.
+        stdout = StringIO()
+        call_command("partition_events", "--archive-after", "1", stdout=stdout)
+        self.assertIn("archived 0 month(s)", stdout.getvalue())
+
+
+class BenchmarkTests(EventAPITestCase):
+
+    def test_seed_is_deterministic(self):
+        _, events = benchmark.seed_dataset(seed=1, users=5, events=10, registrations=20)
+        first = [(event.title, event.date, event.location, event.registrations_count) for event in events]
+        self.assertEqual(sum(count for *_, count in first), 20)
+        self.assertEqual(EventRegistration.objects.count(), 20)
+
+        EventRegistration.objects.all().delete()
+        Event.objects.all().delete()
+        CustomUser.objects.all().delete()
+        _, events = benchmark.seed_dataset(seed=1, users=5, events=10, registrations=20)
+        second = [(event.title, event.date, event.location, event.registrations_count) for event in events]
+        self.assertEqual(first, second)
+
+    def test_benchmark_api_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "result.json")
+            call_command(
+                "benchmark_api", "--users", "5", "--events", "10", "--registrations", "10",
+                "--iterations", "2", "--output", path, stderr=StringIO(),
+            )
+            with open(path) as file:
+                result = json.load(file)
+
+            stderr = StringIO()
+            call_command(
+                "benchmark_api", "--users", "5", "--events", "10", "--registrations", "10",
+                "--iterations", "2", "--compare", path, stdout=StringIO(), stderr=stderr,
+            )
+
+        self.assertEqual(result["endpoints"]["event register"]["statuses"], {"201": 2})
+        self.assertEqual(result["endpoints"]["login"]["statuses"], {"200": 2})
+        self.assertEqual(result["endpoints"]["event retrieve"]["queries"]["max"], 1)
+        self.assertIn("event list", stderr.getvalue())
+        self.assertFalse(Event.objects.exists())
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_METRICS_TOKEN=None)
+class ProfilingTests(EventAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        organizer = CustomUser.objects.create_user(
+            email="organizer@example.com", password="password", full_name="Organizer"
+        )
+        cls.event = Event.objects.create(
+            title="Workshop",
+            description="Description",
+            date=timezone.now() + timedelta(days=3),
+            location="Kyiv",
+            organizer=organizer,
+        )
+
+    def setUp(self):
+        super().setUp()
+        for family in profiling.FAMILIES:
+            family.clear()
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse("events-list"))
+        timing = response["Server-Timing"]
+        self.assertIn('desc="1 queries"', timing)
+        for name in ("db;dur=", "serializer;dur=", "render;dur=", "total;dur="):
+            self.assertIn(name, timing)
+
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="EventViewSet",action="list",method="GET"} 1', text
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{view="EventViewSet",action="list",method="GET",le="1"} 1', text
+        )
+        self.assertIn("# TYPE http_request_serializer_duration_seconds histogram", text)
+
+    def test_slow_sampled_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=0, PROFILING_DIR=directory):
+                self.client.get(reverse("events-detail", args=[self.event.pk]))
+            files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        self.assertIn("EventViewSet-retrieve", files[0])
+
+    def test_metrics_token(self):
+        with self.settings(PROFILING_METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_async_views(self):
+        response = await self.async_client.get(reverse("async-events-detail", args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        text = (await self.async_client.get(reverse("metrics"))).content.decode()
+        self.assertIn(
+            'http_request_db_queries_bucket{view="event_detail",action="",method="GET",le="1"} 1', text
+        )
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        self.client = self.client_class()
+        self.assertNotIn("Server-Timing", self.client.get(reverse("events-list")))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_404_NOT_FOUND)
@@ -1,12 +1,33 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import EventViewSet, EventRegistrationView
+from . import async_views
+from .views import (
+    EventViewSet,
+    EventRegistrationView,
+    OrganizerCalendarView,
+    BulkEventRegistrationView,
+    UserEventRegistrationListView,
+)
 
 router = DefaultRouter()
 router.register(r"events", EventViewSet, basename="events")
 
 urlpatterns = [
     path("events/registration/<int:pk>/", EventRegistrationView.as_view(), name="registration"),
+    path("events/registration/bulk/", BulkEventRegistrationView.as_view(), name="registration-bulk"),
+    path("events/registrations/me/", UserEventRegistrationListView.as_view(), name="registrations-me"),
+    path(
+        "events/organizers/<int:pk>/calendar.ics",
+        OrganizerCalendarView.as_view(),
+        name="organizer-calendar"
+    ),
+    path("async/events/", async_views.event_list, name="async-events-list"),
+    path("async/events/<int:pk>/", async_views.event_detail, name="async-events-detail"),
+    path(
+        "async/events/registration/<int:pk>/",
+        async_views.event_registration,
+        name="async-registration"
+    ),
 ]
 urlpatterns += router.urls
@@ -1,9 +1,42 @@
+import logging
+from datetime import timedelta
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.core.mail import EmailMessage, get_connection
+
+from apps.users.models import CustomUser
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BACKOFF_BASE = timedelta(seconds=30)
+OUTBOX_BACKOFF_MAX = timedelta(hours=1)
+# How long a claimed message is left to its worker before another may send it.
+OUTBOX_LEASE = timedelta(minutes=10)
 
 
-def send_email_after_event_registration(user, event):
-    send_mail(
+def load_recipient(user):
+    """
+    `user` with the email and full name read from the database. request.user
+    is built from the token claims (apps.users.authentication), which keep
+    the values of the login until the token expires.
+    """
+    return CustomUser.objects.only("email", "full_name").get(pk=user.pk)
+
+
+def queue_email_after_event_registration(user, event):
+    """
+    Queue the registration confirmation email. Must be called inside the
+    transaction that creates the registration so both are committed together.
+    """
+    build_email_after_event_registration(user, event).save()
+
+
+def build_email_after_event_registration(user, event):
+    return EmailOutbox(
         subject=f"Registration Confirmation for Event: {event.title}",
         message=(
             f"Hello, {user.full_name}!\n\n"
@@ -13,7 +46,81 @@ def send_email_after_event_registration(user, event):
             "Best regards,\n"
             "The Event Management Team"
         ),
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False,
+        recipient=user.email,
     )
+
+
+def get_outbox_retry_delay(attempts):
+    return min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+
+
+def claim_outbox_batch(batch_size, now):
+    """
+    Lease up to `batch_size` due messages to this worker by moving them
+    OUTBOX_LEASE ahead, in a transaction of its own. Rows are locked with
+    SKIP LOCKED so several workers can drain the outbox concurrently.
+    """
+    with transaction.atomic():
+        messages = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = now + OUTBOX_LEASE
+        EmailOutbox.objects.bulk_update(messages, ["attempts", "next_attempt_at"])
+    return messages
+
+
+def send_outbox_batch(batch_size=100):
+    """
+    Deliver up to `batch_size` due outbox messages over a single SMTP
+    connection. Returns a (sent, failed) tuple.
+
+    The messages are claimed first, and sent outside any transaction, so a
+    slow SMTP server holds no database connection or row lock; each result
+    is saved as soon as the message is sent. A message whose worker died
+    is sent again once its lease runs out.
+    """
+    sent = failed = 0
+    messages = claim_outbox_batch(batch_size, timezone.now())
+    if not messages:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # The server is unreachable; every message in the batch counts as a failed attempt.
+        logger.warning("Could not open email connection: %s", e)
+        connection = None
+
+    for message in messages:
+        try:
+            if connection is None:
+                raise ConnectionError("email connection unavailable")
+            EmailMessage(
+                subject=message.subject,
+                body=message.message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[message.recipient],
+                connection=connection,
+            ).send()
+        except Exception as e:
+            failed += 1
+            message.last_error = str(e)
+            if message.attempts >= EmailOutbox.MAX_ATTEMPTS:
+                message.status = EmailOutbox.Status.DEAD
+            else:
+                message.next_attempt_at = timezone.now() + get_outbox_retry_delay(message.attempts)
+        else:
+            sent += 1
+            message.status = EmailOutbox.Status.SENT
+            message.sent_at = timezone.now()
+            message.last_error = ""
+        message.save(update_fields=["status", "next_attempt_at", "last_error", "sent_at"])
+
+    if connection is not None:
+        connection.close()
+    return sent, failed
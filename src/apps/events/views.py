@@ -1,53 +1,238 @@
 import django_filters
+from datetime import datetime, time, timezone as dt_timezone
+from django import forms
 from drf_yasg import openapi
-from django.db import IntegrityError
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.cache import get_conditional_response
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from django.shortcuts import get_object_or_404
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, filters, generics, permissions
+from rest_framework import status, generics, permissions
 
-from .models import Event, EventRegistration
-from .utils import send_email_after_event_registration
-from .serializers import EventSerializer, EventRegistrationSerializer
+from apps.users.models import CustomUser
+from .models import Event, EventChange, EventRegistration, EventDayBucket
+from .search import search_events
+from .cache import (
+    cached_response, calendar_cache_key, detail_cache_key, get_organizer_version, invalidate_event,
+    list_cache_key,
+)
+from .pagination import EventCursorPagination, RegistrationCursorPagination
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_response
+from .ics import render_calendar
+from . import bulk, change_log, day_buckets, geo, notifications, partitions, seats, shards
+from .deletion import soft_delete_event
+from .serializers import (
+    MAX_BULK_ITEMS,
+    MAX_CALENDAR_DAYS,
+    CalendarDaySerializer,
+    CalendarQuerySerializer,
+    ChangeFeedQuerySerializer,
+    ChangeFeedSerializer,
+    EventSerializer,
+    EventRegistrationSerializer,
+    UserEventRegistrationSerializer,
+    EventRegistrationRequestSerializer,
+    EventWaitlistEntrySerializer,
+    BulkEventRegistrationSerializer,
+    BulkEventRegistrationResultSerializer,
+    BulkEventImportResultSerializer,
+)
+
+
+MAX_RADIUS_KM = 500
+DEFAULT_RADIUS_KM = 10
+
+
+class CoordinatesField(forms.Field):
+    """Comma-separated latitude,longitude pairs, e.g. `50.45,30.52`."""
+
+    def __init__(self, *args, pairs=1, **kwargs):
+        self.pairs = pairs
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            numbers = [float(part) for part in value.split(",")]
+        except ValueError:
+            raise forms.ValidationError("Expected comma-separated numbers.")
+        if len(numbers) != 2 * self.pairs:
+            raise forms.ValidationError(f"Expected {2 * self.pairs} comma-separated numbers.")
+        for latitude, longitude in zip(numbers[::2], numbers[1::2]):
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise forms.ValidationError("Latitude must be within ±90 and longitude within ±180.")
+        return numbers
+
+
+class CoordinatesFilter(django_filters.Filter):
+    field_class = CoordinatesField
+
+
+class DayStartFilter(django_filters.DateFilter):
+    """Compares a datetime field with the start of the given day in the current time zone."""
+
+    def filter(self, qs, value):
+        if value:
+            value = timezone.make_aware(datetime.combine(value, time.min))
+        return super().filter(qs, value)
 
 
 class EventFilter(django_filters.FilterSet):
-    date_from = django_filters.DateFilter(field_name="date", lookup_expr="gte")
-    date_to = django_filters.DateFilter(field_name="date", lookup_expr="lte")
+    date_from = DayStartFilter(field_name="date", lookup_expr="gte")
+    date_to = DayStartFilter(field_name="date", lookup_expr="lte")
+    location = django_filters.CharFilter(method="filter_location")
+    location__iexact = django_filters.CharFilter(method="filter_location")
+    search = django_filters.CharFilter(method="filter_search")
+    near = CoordinatesFilter(method="filter_near")
+    # Used by filter_near().
+    radius = django_filters.NumberFilter(method="filter_radius", min_value=0, max_value=MAX_RADIUS_KM)
+    bbox = CoordinatesFilter(method="filter_bbox", pairs=2)
 
     class Meta:
         model = Event
-        fields = {"location": ["iexact"]}
+        fields = []
+
+    def filter_location(self, queryset, name, value):
+        # Compared through Lower() rather than `iexact` (UPPER() on PostgreSQL)
+        # so that the functional index on Lower(location) is used.
+        return queryset.alias(location_lower=Lower("location")).filter(location_lower=Lower(Value(value)))
+
+    def filter_search(self, queryset, name, value):
+        return search_events(queryset, value)
+
+    def filter_near(self, queryset, name, value):
+        radius = self.form.cleaned_data.get("radius")
+        return geo.filter_near(queryset, *value, float(radius) if radius is not None else DEFAULT_RADIUS_KM)
+
+    def filter_radius(self, queryset, name, value):
+        return queryset
+
+    def filter_bbox(self, queryset, name, value):
+        return geo.filter_box(queryset, *value)
+
+
+EXPORT_OUTPUT_PARAMETER = openapi.Parameter(
+    "output",
+    openapi.IN_QUERY,
+    description="Export format",
+    type=openapi.TYPE_STRING,
+    enum=list(EXPORT_FORMATS),
+    default="csv",
+)
+
+
+FIELDSET_PARAMS = ["fields", "omit"]
+FIELDSET_PARAMETERS = [
+    openapi.Parameter(
+        "fields",
+        openapi.IN_QUERY,
+        description="Comma-separated fields to return, e.g. `id,title,date`",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        "omit",
+        openapi.IN_QUERY,
+        description="Comma-separated fields to leave out, e.g. `description`",
+        type=openapi.TYPE_STRING
+    ),
+]
+
+
+def only_serialized_columns(queryset, serializer):
+    """
+    Load only the columns behind the fields of `serializer` (all of them
+    when no fieldset is requested); date and id are the pagination keys.
+    """
+    model_fields = {field.name for field in Event._meta.concrete_fields}
+    columns = {"id", "date"}
+    for field in serializer.fields.values():
+        # Annotations such as `distance` are not columns.
+        if field.source.split(".")[0] in model_fields:
+            columns.add(field.source.replace(".", "__"))
+    if "organizer__full_name" not in columns:
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns)
+
+
+def invalid_export_output_response():
+    return Response(
+        {"error": f"Unsupported output format. Choose one of: {', '.join(EXPORT_FORMATS)}."},
+        status=status.HTTP_400_BAD_REQUEST
+    )
 
 
 class EventViewSet(ModelViewSet):
-    queryset = Event.objects.all()
+    queryset = Event.objects.select_related("organizer").only(
+        "id", "title", "description", "date", "location", "latitude", "longitude", "capacity",
+        "registrations_count", "organizer__full_name"
+    )
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    pagination_class = EventCursorPagination
+    filter_backends = [DjangoFilterBackend]
     filterset_class = EventFilter
-    search_fields = ["title", "description"]
 
     def get_permissions(self):
-        if self.action in ["create", "partial_update", "destroy"]:
+        if self.action in [
+            "create", "partial_update", "destroy", "bulk", "export", "export_registrations"
+        ]:
             return [permissions.IsAuthenticated()]
         return []
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve", "changes"):
+            return queryset
+        return only_serialized_columns(queryset, self.get_serializer())
+
+    def get_object(self):
+        # partial_update/destroy check the organizer before delegating to the
+        # parent implementation, which would otherwise fetch the event again.
+        if not hasattr(self, "_object"):
+            try:
+                self._object = super().get_object()
+            except Http404:
+                archived = self.get_archived_object() if self.action == "retrieve" else None
+                if archived is None:
+                    raise
+                self._object = archived
+        return self._object
+
+    def get_archived_object(self):
+        # Events of archived months (see apps.events.partitions) are still retrieved by id.
+        try:
+            pk = int(self.kwargs[self.lookup_field])
+        except ValueError:
+            return None
+        return partitions.get_archived_event(pk)
+
     @swagger_auto_schema(
         operation_summary="List all events",
         operation_description=(
-                "Returns a list of events. "
+                "Returns a list of events ordered by date. "
                 "Supports filtering by date range (`date_from`, `date_to`) and `location`, "
-                "as well as search by `title` and `description`."
+                "as well as full-text search by `title` and `description`. "
+                "Search results are ordered by relevance, other results by date. "
+                "`near` (with `radius`) and `bbox` filter by coordinates; results near a point "
+                "are ordered by distance and include it in metres. "
+                "Results are paginated with opaque `next`/`previous` cursors. "
+                "Use `fields` or `omit` to choose the returned fields."
         ),
         manual_parameters=[
             openapi.Parameter(
                 "search",
                 openapi.IN_QUERY,
-                description="Search by title or description",
+                description="Full-text search by title or description (prefix and typo tolerant)",
                 type=openapi.TYPE_STRING
             ),
             openapi.Parameter(
@@ -70,17 +255,59 @@ class EventViewSet(ModelViewSet):
                 description="Exact location (case-insensitive)",
                 type=openapi.TYPE_STRING
             ),
+            openapi.Parameter(
+                "near",
+                openapi.IN_QUERY,
+                description="Events around a point, as `latitude,longitude`",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                "radius",
+                openapi.IN_QUERY,
+                description=f"Radius around `near` in km (default {DEFAULT_RADIUS_KM}, max {MAX_RADIUS_KM})",
+                type=openapi.TYPE_NUMBER
+            ),
+            openapi.Parameter(
+                "bbox",
+                openapi.IN_QUERY,
+                description="Bounding box as `min_latitude,min_longitude,max_latitude,max_longitude`",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Pagination cursor taken from `next` or `previous`",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                "page_size",
+                openapi.IN_QUERY,
+                description="Number of events per page (max 100)",
+                type=openapi.TYPE_INTEGER
+            ),
+            *FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request):
-        return super().list(request)
+        params = [*self.filterset_class.base_filters, *self.get_pagination_params(), *FIELDSET_PARAMS]
+        return cached_response(
+            request, list_cache_key(request, params), lambda: super(EventViewSet, self).list(request)
+        )
+
+    def get_pagination_params(self):
+        return [self.paginator.cursor_query_param, self.paginator.page_size_query_param]
 
     @swagger_auto_schema(
         operation_summary="Retrieve event by ID",
-        operation_description="Retrieve a single event by ID."
+        operation_description="Retrieve a single event by ID, including events of archived past months.",
+        manual_parameters=FIELDSET_PARAMETERS,
     )
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request,
+            detail_cache_key(request, kwargs[self.lookup_field], FIELDSET_PARAMS),
+            lambda: super(EventViewSet, self).retrieve(request, *args, **kwargs),
+        )
 
     @swagger_auto_schema(
         operation_summary="Create a new event",
@@ -90,7 +317,178 @@ class EventViewSet(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(organizer=self.request.user)
+        with transaction.atomic(savepoint=False):
+            serializer.save(organizer=self.request.user)
+            notifications.schedule_reminders([serializer.instance])
+            change_log.record([serializer.instance.pk], EventChange.Action.CREATED)
+        invalidate_event()
+
+    def perform_update(self, serializer):
+        old_values = {field: getattr(serializer.instance, field) for field in notifications.NOTIFIED_FIELDS}
+        with transaction.atomic(savepoint=False):
+            serializer.save()
+            notifications.notify_change(serializer.instance, old_values)
+            change_log.record([serializer.instance.pk], EventChange.Action.UPDATED)
+        if "capacity" in serializer.validated_data:
+            seats.promote_waitlist(serializer.instance)
+        invalidate_event(serializer.instance.pk)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(savepoint=False):
+            soft_delete_event(instance)
+            change_log.record([instance.pk], EventChange.Action.DELETED)
+        invalidate_event(instance.pk)
+
+    @swagger_auto_schema(
+        operation_summary="Create events in bulk",
+        operation_description=(
+                f"Create up to {MAX_BULK_ITEMS} events in one request. Every item is validated like "
+                "a single create; valid items are inserted in batches and invalid ones are reported "
+                "by their index. Returns 201 if every item was created, 207 otherwise."
+        ),
+        request_body=EventSerializer(many=True),
+        responses={201: BulkEventImportResultSerializer(many=True)},
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            return Response(
+                {"error": "Expected a list of events."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 < len(request.data) <= MAX_BULK_ITEMS:
+            return Response(
+                {"error": f"Expected between 1 and {MAX_BULK_ITEMS} events."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = sorted(bulk.import_events(request.user, request.data), key=lambda result: result["index"])
+        all_created = all("id" in result for result in results)
+        return Response(
+            results,
+            status=status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Event calendar",
+        operation_description=(
+                "Per-day event counts and stubs (id, title, time, location) of up to "
+                f"{day_buckets.MAX_STUBS_PER_DAY} events per day, for a window of at most "
+                f"{MAX_CALENDAR_DAYS} days. Only days with events are returned. "
+                "Days and times are in the server time zone."
+        ),
+        query_serializer=CalendarQuerySerializer,
+        responses={200: CalendarDaySerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"], filter_backends=[], pagination_class=None)
+    def calendar(self, request):
+        serializer = CalendarQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return cached_response(
+            request,
+            calendar_cache_key(request, ["date_from", "date_to"]),
+            lambda: self.build_calendar(**serializer.validated_data),
+        )
+
+    def build_calendar(self, date_from, date_to):
+        buckets = EventDayBucket.objects.filter(day__range=(date_from, date_to)).values_list(
+            "day", "count", "events"
+        )
+        return Response([
+            {"date": day.isoformat(), "count": count, "events": events}
+            for day, count, events in buckets
+        ])
+
+    @swagger_auto_schema(
+        operation_summary="Event change feed",
+        operation_description=(
+                "Events created, updated or deleted after the `since` token, oldest change first, "
+                "with only the latest change of each event. Deleted events are tombstones without "
+                "an `event`. Continue from the returned `since` token while `has_more` is true, and keep "
+                "it for the next sync; `since=0` returns every event. Changes of transactions still "
+                "running are held back until they commit. Registrations changing "
+                "`registrations_count` are not changes. Use `fields` or `omit` to choose the "
+                "returned event fields."
+        ),
+        query_serializer=ChangeFeedQuerySerializer,
+        manual_parameters=FIELDSET_PARAMETERS,
+        responses={200: ChangeFeedSerializer},
+    )
+    @action(detail=False, methods=["get"], filter_backends=[], pagination_class=None)
+    def changes(self, request):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        changes, since, has_more = change_log.get_changes(
+            query.validated_data["since"], query.validated_data["page_size"], self.get_queryset()
+        )
+        events = [event for *_, event in changes if event is not None]
+        # By event id; the selected fields may leave the id out.
+        data = dict(zip((event.pk for event in events), self.get_serializer(events, many=True).data))
+        return Response({
+            "since": since,
+            "has_more": has_more,
+            "results": [
+                {"seq": seq, "action": action, "id": event_id, "event": data.get(event_id)}
+                for seq, action, event_id, _ in changes
+            ],
+        })
+
+    @swagger_auto_schema(
+        operation_summary="Export my events",
+        operation_description=(
+                "Stream all events organized by the authenticated user as CSV or NDJSON."
+        ),
+        manual_parameters=[EXPORT_OUTPUT_PARAMETER],
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_FORMATS:
+            return invalid_export_output_response()
+
+        queryset = Event.objects.filter(organizer_id=request.user.pk).order_by("date", "id").values_list(
+            "id", "title", "description", "date", "location", "capacity", "registrations_count"
+        )
+        return export_response(
+            queryset,
+            ["id", "title", "description", "date", "location", "capacity", "registrations_count"],
+            output,
+            filename="events",
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Export event registrations",
+        operation_description=(
+                "Stream the registrations of an event as CSV or NDJSON. "
+                "Only the organizer can export registrations."
+        ),
+        manual_parameters=[EXPORT_OUTPUT_PARAMETER],
+    )
+    @action(detail=True, methods=["get"], url_path="registrations/export")
+    def export_registrations(self, request, pk=None):
+        event = self.get_object()
+        if event.organizer != request.user:
+            return Response(
+                {"error": "You do not have permission to export this event's registrations."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_FORMATS:
+            return invalid_export_output_response()
+
+        if shards.is_sharded():
+            # The users are in another database than the registrations.
+            rows = shards.export_rows(event.pk, EXPORT_CHUNK_SIZE)
+        else:
+            rows = event.registrations.order_by("id").values_list(
+                "id", "user__email", "user__full_name", "registered_at"
+            )
+        return export_response(
+            rows,
+            ["id", "email", "full_name", "registered_at"],
+            output,
+            filename=f"event-{event.pk}-registrations",
+        )
 
     @swagger_auto_schema(
         operation_summary="Partially update event",
@@ -107,7 +505,10 @@ class EventViewSet(ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Delete event",
-        operation_description="Only the organizer can delete an event."
+        operation_description=(
+                "Only the organizer can delete an event. The event disappears immediately; "
+                "its registrations are removed later in the background."
+        )
     )
     def destroy(self, request, *args, **kwargs):
         event = self.get_object()
@@ -124,26 +525,201 @@ class EventRegistrationView(APIView):
 
     @swagger_auto_schema(
         operation_summary="Register for an event",
-        operation_description="Authenticated users can register for an event by its ID."
+        operation_description=(
+                "Authenticated users can register for an event by its ID. "
+                "If the event is full, pass `waitlist: true` to join its waitlist; "
+                "waitlisted users are registered automatically when a seat frees up."
+        ),
+        request_body=EventRegistrationRequestSerializer,
     )
     def post(self, request, pk=None):
-        event = get_object_or_404(Event, pk=pk)
+        event = get_object_or_404(
+            Event.objects.only("id", "title", "date", "location"), pk=pk
+        )
+        request_serializer = EventRegistrationRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
 
         try:
-            registered_event = EventRegistration.objects.create(
-                user=request.user, event=event
-            )
+            registered_event = seats.register(user=request.user, event=event)
         except IntegrityError:
             return Response(
                 {"error": "You are already registered for this event."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        try:
-            send_email_after_event_registration(user=request.user, event=event)
-        except Exception as e:
-            print(f"Email sending failed: {e}")
+        except seats.EventFull:
+            if not request_serializer.validated_data["waitlist"]:
+                return Response(
+                    {"error": "This event is full."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return self.join_waitlist(request, event)
 
         serializer = EventRegistrationSerializer(registered_event)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def join_waitlist(self, request, event):
+        if shards.is_registered(request.user, event):
+            return Response(
+                {"error": "You are already registered for this event."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            entry = seats.join_waitlist(user=request.user, event=event)
+        except IntegrityError:
+            return Response(
+                {"error": "You are already on the waitlist for this event."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = EventWaitlistEntrySerializer(entry)
+
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @swagger_auto_schema(
+        operation_summary="Cancel a registration",
+        operation_description=(
+                "Cancel the authenticated user's registration for an event, or leave its "
+                "waitlist. A freed seat goes to the first user on the waitlist."
+        ),
+        responses={204: "Registration cancelled", 404: "Not registered for this event"},
+    )
+    def delete(self, request, pk=None):
+        event = get_object_or_404(
+            Event.objects.only("id", "title", "date", "location"), pk=pk
+        )
+        if not seats.cancel_registration(user=request.user, event=event) and not seats.leave_waitlist(
+            user=request.user, event=event
+        ):
+            return Response(
+                {"error": "You are not registered for this event."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class OrganizerCalendarView(APIView):
+
+    @swagger_auto_schema(
+        operation_summary="Organizer calendar feed",
+        operation_description=(
+                "All upcoming and past events of an organizer as an iCalendar (ICS) feed. "
+                "Supports conditional requests with `If-None-Match` and `If-Modified-Since`."
+        ),
+        responses={200: "text/calendar", 304: "Not modified", 404: "Organizer not found"},
+    )
+    def get(self, request, pk=None):
+        version = get_organizer_version(pk)
+        etag = f'"{version}"'
+        last_modified = version // 10 ** 9
+        headers = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+        # Answered from the cached version alone, without touching the database.
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            organizer = get_object_or_404(CustomUser.objects.only("id", "full_name"), pk=pk)
+            events = Event.objects.filter(organizer_id=pk).order_by("date", "id").values_list(
+                "id", "title", "description", "date", "location"
+            )
+            response = HttpResponse(
+                render_calendar(
+                    organizer.full_name,
+                    events.iterator(),
+                    request.get_host().split(":")[0],
+                    datetime.fromtimestamp(last_modified, tz=dt_timezone.utc),
+                ),
+                content_type="text/calendar; charset=utf-8",
+            )
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+class BulkEventRegistrationView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Register for events in bulk",
+        operation_description=(
+                f"Register the authenticated user for up to {MAX_BULK_ITEMS} events at once. "
+                "Returns a status per event: `registered`, `already_registered`, `full` or `not_found`."
+        ),
+        request_body=BulkEventRegistrationSerializer,
+        responses={200: BulkEventRegistrationResultSerializer(many=True)},
+    )
+    def post(self, request):
+        serializer = BulkEventRegistrationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk.bulk_register(request.user, serializer.validated_data["events"])
+
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class UserEventRegistrationListView(generics.ListAPIView):
+    """
+    The authenticated user's registrations, newest first.
+
+    Paged by keyset over the (user, registered_at, id) index, so every page
+    costs the same however many registrations the user has. With sharded
+    registrations every shard returns its own page, the pages are merged,
+    and the events are then fetched from the default database.
+    """
+    serializer_class = UserEventRegistrationSerializer
+    pagination_class = RegistrationCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            EventRegistration.objects.filter(user=self.request.user, event__deleted_at__isnull=True)
+            .select_related("event")
+            .only(
+                "id", "registered_at", "event__id", "event__title", "event__date",
+                "event__location", "event__registrations_count"
+            )
+        )
+
+    def paginate_queryset(self, queryset):
+        if not shards.is_sharded():
+            return super().paginate_queryset(queryset)
+        page = self.paginator.paginate_querysets(
+            [
+                shard_queryset.only("id", "registered_at", "event_id")
+                for shard_queryset in shards.user_registrations(self.request.user)
+            ],
+            self.request,
+        )
+        events = Event.objects.only("id", "title", "date", "location", "registrations_count").in_bulk(
+            {registration.event_id for registration in page}
+        )
+        registrations = []
+        for registration in page:
+            # Registrations for deleted events are left out, as in the query above.
+            if registration.event_id in events:
+                registration.event = events[registration.event_id]
+                registrations.append(registration)
+        return registrations
+
+    @swagger_auto_schema(
+        operation_summary="List my registrations",
+        operation_description=(
+                "Returns the events the authenticated user is registered for, newest "
+                "registration first, paginated with opaque `next`/`previous` cursors."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Pagination cursor taken from `next` or `previous`",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                "page_size",
+                openapi.IN_QUERY,
+                description="Number of registrations per page (max 100)",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
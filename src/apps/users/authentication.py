@@ -0,0 +1,39 @@
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import CustomUser
+from .tokens import USER_CLAIMS
+from .revocation import is_revoked
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds `request.user` from the token claims
+    instead of loading it from the database.
+
+    The user is a regular CustomUser instance whose id, email, full_name and
+    is_active come from the token and whose other fields are deferred, so
+    they are loaded from the database only if a view actually reads them.
+    Tokens issued without these claims fall back to a database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+
+        try:
+            values = {"id": validated_token[api_settings.USER_ID_CLAIM]}
+            values.update((claim, validated_token[claim]) for claim in USER_CLAIMS)
+        except KeyError:
+            return super().get_user(validated_token)
+
+        # from_db() expects the values in model field order.
+        field_names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in values]
+        user = CustomUser.from_db(
+            DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names]
+        )
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
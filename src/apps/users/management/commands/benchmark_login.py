@@ -0,0 +1,77 @@
+import time
+import logging
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.urls import reverse
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from apps.users.throttling import local_blocks
+
+PASSWORD = "benchmark-password"
+
+
+def rate(func, seconds):
+    """Call `func` repeatedly for about `seconds` and return the calls per second."""
+    calls = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < seconds:
+        func()
+        calls += 1
+    return calls / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure single-core password verifications per second for each configured hasher, "
+        "i.e. the login throughput per core, and the rate at which throttled logins are rejected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each measurement.")
+
+    def handle(self, *args, **options):
+        seconds = options["seconds"]
+        for path in settings.PASSWORD_HASHERS:
+            hasher = hashers.import_string(path)()
+            try:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            except ValueError as e:
+                # e.g. argon2-cffi is not installed
+                self.stdout.write(f"{hasher.algorithm:<14} skipped: {e}")
+                continue
+            per_second = rate(lambda: hasher.verify(PASSWORD, encoded), seconds)
+            preferred = " (preferred)" if path == settings.PASSWORD_HASHERS[0] else ""
+            self.stdout.write(
+                f"{hasher.algorithm:<14} {per_second:8.1f} logins/s per core "
+                f"({1000 / per_second:.1f} ms per hash){preferred}"
+            )
+
+        unknown = rate(lambda: authenticate(email="unknown@benchmark.invalid", password=PASSWORD), seconds)
+        self.stdout.write(f"{'unknown email':<14} {unknown:8.1f} rejections/s per core (one query, no hash)")
+        self.stdout.write(f"{'throttled':<14} {self.throttled_rate(seconds):8.1f} rejections/s per core (whole request, no hash)")
+
+    def throttled_rate(self, seconds):
+        """Rejections of a throttled email go through DRF but never reach the hasher or the database."""
+        setup_test_environment()
+        logger = logging.getLogger("django.request")
+        level = logger.level
+        # Every rejection would otherwise be logged as a warning.
+        logger.setLevel(logging.ERROR)
+        try:
+            client = APIClient()
+            data = {"email": "throttled@benchmark.invalid", "password": PASSWORD}
+
+            def login():
+                return client.post(reverse("auth-login"), data, format="json")
+
+            while login().status_code != 429:
+                pass
+            return rate(login, seconds)
+        finally:
+            logger.setLevel(level)
+            teardown_test_environment()
+            local_blocks.clear()
@@ -0,0 +1,107 @@
+"""
+Access token revocation without a database query per request.
+
+Revocations live in the "auth" cache, which must be shared between
+workers (Redis through REDIS_URL; settings refuse a per-process backend
+when DEBUG is off):
+
+* `auth:revoked:<jti>` marks a single token (logout); it expires together
+  with the token.
+* `auth:revoked-before:<user_id>` holds a timestamp; every token of that user
+  issued before it is rejected (deactivation, password change). It expires
+  after ACCESS_TOKEN_LIFETIME, when no such token can still be valid. Both
+  the timestamp and `iat` (see apps.users.tokens) have microseconds, so the
+  token of a login right after a password change is accepted.
+
+Both values are memoised in a small per-process TTL/LRU cache, so a
+revocation takes effect in every worker within AUTH_REVOCATION_LOCAL_TTL
+seconds. The verdict itself is not cached: it is worked out from the
+values for every token, so a token issued after the cached revocation is
+accepted at once.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+
+REVOKED_TOKEN_KEY = "auth:revoked:{jti}"
+REVOKED_BEFORE_KEY = "auth:revoked-before:{user_id}"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_cache = TTLCache(
+    maxsize=settings.AUTH_REVOCATION_LOCAL_MAXSIZE, ttl=settings.AUTH_REVOCATION_LOCAL_TTL
+)
+
+
+def get_cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def revoke_token(token):
+    """Revoke a single access token until it expires."""
+    jti = token[api_settings.JTI_CLAIM]
+    timeout = max(int(token["exp"] - time.time()), 1)
+    key = REVOKED_TOKEN_KEY.format(jti=jti)
+    get_cache().set(key, True, timeout=timeout)
+    local_cache.delete(key)
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every token issued to the user so far."""
+    key = REVOKED_BEFORE_KEY.format(user_id=user_id)
+    get_cache().set(key, time.time(), timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    local_cache.delete(key)
+
+
+def is_revoked(token):
+    token_key = REVOKED_TOKEN_KEY.format(jti=token[api_settings.JTI_CLAIM])
+    user_key = REVOKED_BEFORE_KEY.format(user_id=token[api_settings.USER_ID_CLAIM])
+    values = {key: local_cache.get(key) for key in (token_key, user_key)}
+    missing = [key for key, value in values.items() if value is None]
+    if missing:
+        found = get_cache().get_many(missing)
+        for key in missing:
+            # False and 0 stand for "not revoked", so misses are memoised too.
+            values[key] = found.get(key, False if key == token_key else 0)
+            local_cache.set(key, values[key])
+    return values[token_key] or token.get("iat", 0) < values[user_key]
@@ -0,0 +1,15 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_save
+
+from .models import CustomUser
+from .revocation import revoke_user_tokens
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_tokens_on_credentials_change(sender, instance, created, **kwargs):
+    # AbstractBaseUser keeps the raw password in `_password` until the save
+    # that stores its hash has finished.
+    if created:
+        return
+    if instance._password is not None or not instance.is_active:
+        revoke_user_tokens(instance.pk)
@@ -1,3 +1,179 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.urls import reverse
+from django.contrib.auth.hashers import make_password
+from rest_framework import status
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+from .revocation import get_cache, local_cache
+from .tokens import UserClaimsRefreshToken
+from .throttling import local_blocks
+from .authentication import ClaimsJWTAuthentication
+
+
+class ClaimsJWTAuthenticationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com", password="password", full_name="User"
+        )
+
+    def setUp(self):
+        get_cache().clear()
+        local_cache.clear()
+        local_blocks.clear()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_user_is_built_from_claims_without_a_query(self):
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual((user.pk, user.email, user.full_name), (self.user.pk, "user@example.com", "User"))
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(user, self.user)
+
+    def test_non_claim_fields_are_loaded_on_access(self):
+        user = self.authenticate(UserClaimsRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(1):
+            self.assertFalse(user.is_staff)
+
+    def test_token_without_claims_falls_back_to_database(self):
+        token = RefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token), self.user)
+
+    def test_login_and_register_issue_claims_tokens(self):
+        response = self.client.post(
+            reverse("auth-login"), {"email": "user@example.com", "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = self.authenticate(response.data["access_token"])
+        self.assertEqual(user.full_name, "User")
+
+        response = self.client.post(
+            reverse("auth-register"),
+            {"email": "new@example.com", "password": "password", "full_name": "New"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.authenticate(response.data["access_token"]).full_name, "New")
+
+    def test_logout_revokes_the_token(self):
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.post(reverse("auth-logout"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.post(reverse("auth-logout"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        other_token = UserClaimsRefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.authenticate(other_token), self.user)
+
+    def test_login_right_after_password_change_is_accepted(self):
+        old_token = UserClaimsRefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.authenticate(old_token), self.user)
+
+        self.user.set_password("new-password")
+        self.user.save()
+        # Issued in the same second as the revocation, after it.
+        new_token = UserClaimsRefreshToken.for_user(self.user).access_token
+
+        self.assertEqual(self.authenticate(new_token), self.user)
+        self.assertEqual(self.authenticate(new_token), self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {old_token}")
+        response = self.client.post(reverse("auth-logout"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_revokes_issued_tokens(self):
+        # Issued in the same second as the revocation, before it.
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.post(reverse("auth-logout"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LoginTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com", password="password", full_name="User"
+        )
+
+    def setUp(self):
+        get_cache().clear()
+        local_cache.clear()
+        local_blocks.clear()
+
+    def login(self, email="user@example.com", password="password", **extra):
+        return self.client.post(reverse("auth-login"), {"email": email, "password": password}, **extra)
+
+    def test_passwords_are_hashed_with_the_preferred_hasher(self):
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+    def test_login_upgrades_legacy_hash_without_revoking_tokens(self):
+        self.user.password = make_password("password", hasher="pbkdf2_sha256")
+        self.user.save()
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertTrue(self.user.check_password("password"))
+
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(ClaimsJWTAuthentication().authenticate(request)[0], self.user)
+
+    def test_unknown_email_is_hashed_like_a_known_one(self):
+        with mock.patch(
+            "django.contrib.auth.hashers.ScryptPasswordHasher.encode", return_value="scrypt$dummy"
+        ) as encode:
+            with self.assertNumQueries(1):
+                response = self.login(email="unknown@example.com")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        encode.assert_called_once()
+
+    def test_login_is_throttled_per_email_before_hashing(self):
+        for _ in range(10):
+            self.assertEqual(self.login(password="wrong").status_code, status.HTTP_400_BAD_REQUEST)
+
+        with mock.patch("apps.users.views.authenticate") as authenticate:
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        authenticate.assert_not_called()
+
+        # Rejected from the in-process block list; only the IP throttle reads the shared cache.
+        with mock.patch(
+            "rest_framework.throttling.SimpleRateThrottle.allow_request", return_value=True
+        ) as allow_request:
+            self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(allow_request.call_count, 1)
+
+        # Other emails are limited per IP only.
+        response = self.login(email="new@example.com", password="password")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_is_throttled_per_ip(self):
+        for i in range(60):
+            self.login(email=f"user{i}@example.com", REMOTE_ADDR="10.0.0.1")
+
+        response = self.client.post(
+            reverse("auth-register"),
+            {"email": "new@example.com", "password": "password", "full_name": "New"},
+            REMOTE_ADDR="10.0.0.1",
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login(REMOTE_ADDR="10.0.0.2").status_code, status.HTTP_200_OK)
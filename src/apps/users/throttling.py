@@ -0,0 +1,67 @@
+"""
+Rate limits for the login and register endpoints.
+
+Throttles run in APIView.initial(), before the action, so rejected requests
+never reach the password hasher. Attempt histories live in the "auth" cache,
+shared between workers. Once a key is over its limit, the worker also
+remembers that in memory until the limit resets, so a flood of rejected
+requests costs neither a hash nor a cache round trip.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from .revocation import TTLCache
+
+local_blocks = TTLCache(maxsize=settings.AUTH_THROTTLE_LOCAL_MAXSIZE, ttl=60)
+
+
+class AuthRateThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle on the auth cache, with an in-process block list."""
+
+    @property
+    def cache(self):
+        return caches[settings.AUTH_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        self.blocked_for = None
+        key = self.get_cache_key(request, view) if self.rate else None
+        if key is None:
+            return True
+
+        blocked_until = local_blocks.get(key)
+        if blocked_until is not None:
+            self.blocked_for = max(blocked_until - self.timer(), 0)
+            return False
+        if super().allow_request(request, view):
+            return True
+
+        self.blocked_for = super().wait()
+        if self.blocked_for:
+            local_blocks.set(key, self.timer() + self.blocked_for, ttl=self.blocked_for)
+        return False
+
+    def wait(self):
+        return self.blocked_for
+
+
+class LoginEmailRateThrottle(AuthRateThrottle):
+    """Login attempts per email address, against password guessing."""
+    scope = "login_email"
+
+    def get_cache_key(self, request, view):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if not isinstance(email, str) or not email:
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class AuthIPRateThrottle(AuthRateThrottle):
+    """Login and register attempts per client IP."""
+    scope = "auth_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
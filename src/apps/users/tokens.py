@@ -0,0 +1,36 @@
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+# Claims ClaimsJWTAuthentication needs to build request.user without a query.
+USER_CLAIMS = ("email", "full_name", "is_active")
+
+
+class PreciseIssuedAtMixin:
+    """
+    Sets `iat` with microseconds instead of whole seconds, so a revocation
+    (apps.users.revocation) and a login in the same second are told apart.
+    """
+
+    def set_iat(self, claim="iat", at_time=None):
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = at_time.timestamp()
+
+
+class UserClaimsAccessToken(PreciseIssuedAtMixin, AccessToken):
+    pass
+
+
+class UserClaimsRefreshToken(PreciseIssuedAtMixin, RefreshToken):
+    """
+    Refresh token carrying the user's email, full name and active flag.
+    The derived access token copies these claims.
+    """
+
+    access_token_class = UserClaimsAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
@@ -1,4 +1,4 @@
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import swagger_auto_schema, no_body
 from rest_framework import status
 from django.db import IntegrityError
 from rest_framework.decorators import action
@@ -6,14 +6,29 @@ from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from rest_framework.viewsets import GenericViewSet
 from django.core.exceptions import ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import IsAuthenticated
 
 from .models import CustomUser
+from .revocation import revoke_token
+from .tokens import UserClaimsRefreshToken
+from .throttling import AuthIPRateThrottle, LoginEmailRateThrottle
 from .serializers import UserLoginSerializer, UserRegisterSerializer
 
 
 class AuthViewSet(GenericViewSet):
 
+    def get_permissions(self):
+        if self.action == "logout":
+            return [IsAuthenticated()]
+        return []
+
+    def get_throttles(self):
+        if self.action == "login":
+            return [AuthIPRateThrottle(), LoginEmailRateThrottle()]
+        elif self.action == "register":
+            return [AuthIPRateThrottle()]
+        return []
+
     def get_serializer_class(self):
         if self.action == "login":
             return UserLoginSerializer
@@ -22,7 +37,10 @@ class AuthViewSet(GenericViewSet):
 
     @swagger_auto_schema(
         operation_summary="Login",
-        operation_description="Login user with email and password. Returns access and refresh tokens.",
+        operation_description=(
+                "Login user with email and password. Returns access and refresh tokens. "
+                "Attempts are rate limited per email address and per client IP (429)."
+        ),
     )
     @action(detail=False, methods=["post"])
     def login(self, request):
@@ -37,7 +55,7 @@ class AuthViewSet(GenericViewSet):
             return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            refresh = RefreshToken.for_user(user)
+            refresh = UserClaimsRefreshToken.for_user(user)
             return Response(
                 {
                     "access_token": str(refresh.access_token),
@@ -73,7 +91,7 @@ class AuthViewSet(GenericViewSet):
         except ValidationError as e:
             return Response({"error": "".join(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserClaimsRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         return Response(
             {
@@ -82,3 +100,14 @@ class AuthViewSet(GenericViewSet):
             },
             status=status.HTTP_201_CREATED
         )
+
+    @swagger_auto_schema(
+        operation_summary="Logout",
+        operation_description="Revoke the access token used to authenticate this request.",
+        request_body=no_body,
+        responses={204: "Token revoked"},
+    )
+    @action(detail=False, methods=["post"])
+    def logout(self, request):
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,84 @@
+"""
+Connection pool statistics.
+
+Pools are per process, so the numbers describe the worker that reports
+them; compare workers to size `DB_POOL_MAX_SIZE`. A checkout that keeps
+waiting or a histogram shifting to the right means the pool is too small
+for the worker's concurrency.
+"""
+import os
+
+from django.db import connections
+
+from core.metrics import HistogramFamily
+
+# Upper bounds, in milliseconds, of the wait time histogram buckets.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+pool_wait_ms = HistogramFamily(
+    "db_pool_wait_milliseconds",
+    "Time spent waiting for a connection from the pool.",
+    ["database"],
+    WAIT_BUCKETS_MS,
+)
+
+
+def get_histogram(alias):
+    return pool_wait_ms.labels(alias)
+
+
+def record_wait(alias, seconds):
+    get_histogram(alias).observe(seconds * 1000)
+
+
+def get_pool(alias):
+    """The psycopg ConnectionPool of `alias`, or None if it is not pooled."""
+    return getattr(connections[alias], "pool", None)
+
+
+def get_pool_stats():
+    stats = {"pid": os.getpid(), "databases": {}}
+    for alias in connections:
+        connection = connections[alias]
+        pool = get_pool(alias)
+        if pool is None:
+            stats["databases"][alias] = {
+                "pooled": False,
+                "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+                "conn_health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+            }
+            continue
+
+        pool_stats = pool.get_stats()
+        size = pool_stats.get("pool_size", 0)
+        available = pool_stats.get("pool_available", 0)
+        stats["databases"][alias] = {
+            "pooled": True,
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "timeout": pool.timeout,
+            "max_idle": pool.max_idle,
+            "size": size,
+            "in_use": size - available,
+            "available": available,
+            "waiting": pool_stats.get("requests_waiting", 0),
+            "requests": pool_stats.get("requests_num", 0),
+            "requests_queued": pool_stats.get("requests_queued", 0),
+            "requests_errors": pool_stats.get("requests_errors", 0),
+            "requests_wait_ms": pool_stats.get("requests_wait_ms", 0),
+            "connections_lost": pool_stats.get("connections_lost", 0),
+            "wait_ms": get_histogram(alias).snapshot(),
+        }
+    return stats
+
+
+def check_pools():
+    """Open every pool and health-check its idle connections, dropping broken ones."""
+    checked = []
+    for alias in connections:
+        pool = get_pool(alias)
+        if pool is not None:
+            pool.open()
+            pool.check()
+            checked.append(alias)
+    return checked
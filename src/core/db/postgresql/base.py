@@ -0,0 +1,21 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core.db.pool import record_wait
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's PostgreSQL backend, recording how long every checkout from the
+    psycopg connection pool waited (see core.db.pool).
+    """
+
+    def get_new_connection(self, conn_params):
+        if not self.pool:
+            return super().get_new_connection(conn_params)
+
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_wait(self.alias, time.perf_counter() - started)
+        return connection
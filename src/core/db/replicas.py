@@ -0,0 +1,167 @@
+"""
+Read replica routing (settings.DATABASE_REPLICAS, see DB_REPLICA_HOSTS).
+
+ReplicaRouter sends a read to a replica only while ReplicaRoutingMiddleware
+handles a GET/HEAD/OPTIONS request from a client that has not written
+recently; everything else (writes, unsafe requests, management commands)
+uses the primary.
+
+Read-your-writes: after a successful unsafe request (creating an event,
+registering, ...) the client, identified by its Authorization header or
+session cookie, is pinned to the primary for DB_PRIMARY_PIN_SECONDS, long
+enough for the replicas to replay the write. Pins live in the "auth"
+cache, which is shared between workers.
+
+Replicas are checked at most every DB_REPLICA_CHECK_INTERVAL seconds per
+process; one lagging more than DB_REPLICA_MAX_LAG seconds, or failing the
+check, gets no reads until a later check passes. Without a healthy replica
+reads fall back to the primary.
+
+Responses read from a replica are only cached in the "events" cache under a
+version older than DB_REPLICA_MAX_LAG (see apps.events.cache.is_cacheable),
+so a pinned client never finds one that predates its own write.
+"""
+import time
+import random
+import hashlib
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_KEY = "db:pin:{digest}"
+# Zero while the replica has replayed everything it received, otherwise the
+# age of the last replayed transaction.
+POSTGRESQL_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def reading_from_replicas():
+    """Whether reads of the current request may be served by a replica."""
+    return _replica_reads.get()
+
+
+def get_replica_lag(connection):
+    """Replication lag of `connection` in seconds."""
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+class ReplicaHealth:
+    """Per-process record of which replicas may serve reads."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # alias -> (checked at, healthy)
+        self.checks = {}
+
+    def available(self):
+        now = time.monotonic()
+        return [alias for alias in settings.DATABASE_REPLICAS if self.is_healthy(alias, now)]
+
+    def is_healthy(self, alias, now):
+        checked_at, healthy = self.checks.get(alias, (None, False))
+        if checked_at is None or now - checked_at >= settings.DB_REPLICA_CHECK_INTERVAL:
+            healthy = self.check(alias)
+            self.checks[alias] = (now, healthy)
+        return healthy
+
+    def check(self, alias):
+        try:
+            lag = get_replica_lag(connections[alias])
+        except DatabaseError:
+            logger.warning("Replica %s is unavailable, reading from the primary.", alias, exc_info=True)
+            return False
+        if lag > settings.DB_REPLICA_MAX_LAG:
+            logger.warning("Replica %s lags %.1fs behind, reading from the primary.", alias, lag)
+            return False
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        replicas = replica_health.available()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def get_pin_key(request):
+    credentials = request.headers.get("Authorization") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return PIN_KEY.format(digest=hashlib.sha256(credentials.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        cache = caches[settings.AUTH_CACHE_ALIAS]
+        pin_key = get_pin_key(request)
+        safe = request.method in SAFE_METHODS
+        # Anonymous clients cannot write, so only authenticated reads check for a pin.
+        token = _replica_reads.set(safe and not (pin_key and cache.get(pin_key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if not safe and pin_key and response.status_code < 400:
+            cache.set(pin_key, True, timeout=settings.DB_PRIMARY_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        cache = caches[settings.AUTH_CACHE_ALIAS]
+        pin_key = get_pin_key(request)
+        safe = request.method in SAFE_METHODS
+        token = _replica_reads.set(safe and not (pin_key and await cache.aget(pin_key)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if not safe and pin_key and response.status_code < 400:
+            await cache.aset(pin_key, True, timeout=settings.DB_PRIMARY_PIN_SECONDS)
+        return response
@@ -0,0 +1,21 @@
+from rest_framework import permissions
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from drf_yasg.utils import swagger_auto_schema
+
+from .pool import get_pool_stats
+
+
+class PoolStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Database connection pool statistics",
+        operation_description=(
+                "Staff only. Returns the connection pool statistics of the worker process "
+                "that serves the request: pool size, connections in use, waiting requests "
+                "and a histogram of checkout wait times."
+        ),
+    )
+    def get(self, request):
+        return Response(get_pool_stats())
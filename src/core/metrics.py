@@ -0,0 +1,95 @@
+"""
+Minimal in-process histograms, rendered in the Prometheus text format.
+
+Values live in the memory of the worker process that records them, like the
+connection pools they often describe; scrape every worker.
+"""
+import threading
+from bisect import bisect_left
+
+# Upper bounds of latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Thread-safe histogram with cumulative buckets, Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        """Cumulative bucket counts keyed by their upper bound."""
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+
+        buckets = {}
+        cumulative = 0
+        for bound, bucket_count in zip([*map(format_bound, self.buckets), "+Inf"], counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": count, "sum": round(total, 6)}
+
+
+class HistogramFamily:
+    """A named histogram with one child per combination of label values."""
+
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        with self.lock:
+            if values not in self.children:
+                self.children[values] = Histogram(self.buckets)
+            return self.children[values]
+
+    def clear(self):
+        with self.lock:
+            self.children.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            children = sorted(self.children.items())
+        for values, histogram in children:
+            labels = [f'{name}="{escape(value)}"' for name, value in zip(self.labelnames, values)]
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                bucket_labels = ",".join([*labels, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            label_text = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{label_text} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{label_text} {snapshot['count']}")
+        return "\n".join(lines)
+
+
+def format_bound(bound):
+    return str(int(bound)) if float(bound).is_integer() else str(bound)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families):
+    return "\n".join(family.render() for family in families) + "\n"
@@ -0,0 +1,244 @@
+"""
+Opt-in request profiling (PROFILING_ENABLED).
+
+ProfilingMiddleware measures, for every request:
+
+- total time,
+- database time and query count, through `connection.execute_wrapper()`,
+- serializer time, for serializers using TimedSerializerMixin (database
+  time spent while serializing, e.g. evaluating a queryset, is excluded),
+- render time of DRF/template responses.
+
+The timings are sent back in a `Server-Timing` header and recorded in
+per view/action histograms served at /metrics in the Prometheus text
+format. A PROFILING_SAMPLE_RATE fraction of requests also runs under
+cProfile; the profile is written to PROFILING_DIR when the request took
+longer than PROFILING_SLOW_MS.
+"""
+import os
+import time
+import random
+import cProfile
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, Http404
+from django.core.exceptions import MiddlewareNotUsed
+from django.views.decorators.http import require_GET
+from rest_framework import serializers
+
+from core import metrics
+from core.db.pool import pool_wait_ms
+
+LABELS = ["view", "action", "method"]
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+request_seconds = metrics.HistogramFamily(
+    "http_request_duration_seconds", "Total time spent handling the request.", LABELS
+)
+db_seconds = metrics.HistogramFamily(
+    "http_request_db_duration_seconds", "Time spent executing database queries.", LABELS
+)
+db_queries = metrics.HistogramFamily(
+    "http_request_db_queries", "Number of database queries.", LABELS, QUERY_COUNT_BUCKETS
+)
+serializer_seconds = metrics.HistogramFamily(
+    "http_request_serializer_duration_seconds", "Time spent in serializers.", LABELS
+)
+render_seconds = metrics.HistogramFamily(
+    "http_request_render_duration_seconds", "Time spent rendering the response.", LABELS
+)
+FAMILIES = [request_seconds, db_seconds, db_queries, serializer_seconds, render_seconds, pool_wait_ms]
+
+_current_profile = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def serializer_timer():
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_time = profile.db_time
+    try:
+        yield
+    finally:
+        profile.serializer_time += time.perf_counter() - started - (profile.db_time - db_time)
+
+
+class TimedListSerializer(serializers.ListSerializer):
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Counts the time spent building `.data` as serializer time, also with many=True."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        # Subclasses declare their own Meta, so the list class is swapped here.
+        if type(list_serializer) is serializers.ListSerializer:
+            list_serializer.__class__ = TimedListSerializer
+        return list_serializer
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+def get_view_labels(request, view_func):
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    name = view_class.__name__ if view_class else getattr(view_func, "__name__", "unknown")
+    # Viewsets map HTTP methods to actions.
+    action = (getattr(view_func, "actions", None) or {}).get(request.method.lower(), "")
+    return name, action
+
+
+@contextmanager
+def sampled(profiler):
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile, profiler = self.start(request)
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, profile)
+                with sampled(profiler):
+                    response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self.finish(request, response, profile, profiler, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        profile, profiler = self.start(request)
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        # The ORM runs queries in the request's sync thread, whose connections
+        # are not the event loop's, so the wrappers are installed from there.
+        # cProfile only sees the code running on the event loop.
+        stack = ExitStack()
+        try:
+            await sync_to_async(self.wrap_connections)(stack, profile)
+            with sampled(profiler):
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current_profile.reset(token)
+        return self.finish(request, response, profile, profiler, time.perf_counter() - started)
+
+    def start(self, request):
+        request.view_labels = ("unresolved", "")
+        profiler = None
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        return RequestProfile(), profiler
+
+    def wrap_connections(self, stack, profile):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+
+    def finish(self, request, response, profile, profiler, elapsed):
+        self.record(request, profile, elapsed)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+            f"serializer;dur={profile.serializer_time * 1000:.1f}",
+            f"render;dur={profile.render_time * 1000:.1f}",
+            f"total;dur={elapsed * 1000:.1f}",
+        ])
+        if profiler is not None and elapsed * 1000 >= settings.PROFILING_SLOW_MS:
+            self.dump(profiler, request, elapsed)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_labels = get_view_labels(request, view_func)
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered; the callback right after.
+        profile = _current_profile.get()
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, profile, elapsed):
+        labels = (*request.view_labels, request.method)
+        request_seconds.labels(*labels).observe(elapsed)
+        db_seconds.labels(*labels).observe(profile.db_time)
+        db_queries.labels(*labels).observe(profile.queries)
+        serializer_seconds.labels(*labels).observe(profile.serializer_time)
+        render_seconds.labels(*labels).observe(profile.render_time)
+
+    def dump(self, profiler, request, elapsed):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        name, action = request.view_labels
+        filename = "-".join([
+            time.strftime("%Y%m%d-%H%M%S"), str(os.getpid()), name, action or request.method,
+            f"{elapsed * 1000:.0f}ms.prof",
+        ])
+        profiler.dump_stats(os.path.join(settings.PROFILING_DIR, filename))
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs PROFILING_METRICS_TOKEN as a Bearer token when that is set."""
+    if not settings.PROFILING_ENABLED:
+        raise Http404
+    token = settings.PROFILING_METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(FAMILIES), content_type="text/plain; version=0.0.4")
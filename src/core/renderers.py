@@ -0,0 +1,27 @@
+"""
+JSON renderer backed by orjson, an optional dependency.
+
+ORJSONRenderer produces the same output as DRF's JSONRenderer: types
+orjson does not handle itself (datetimes, decimals, lazy strings, ...)
+go through DRF's encoder. Without orjson installed it is JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        # orjson only supports an indent of two spaces.
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=self.encoder_class().default, option=option)
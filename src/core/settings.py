@@ -10,9 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+from copy import deepcopy
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'drf_yasg',
     'django_filters',
@@ -49,6 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Does nothing unless PROFILING_ENABLED is set.
+    'core.profiling.ProfilingMiddleware',
+    # Does nothing unless read replicas are configured.
+    'core.db.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,20 +88,154 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# With DB_POOL_ENABLED, every worker process keeps a psycopg connection pool
+# of DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections; requests wait up to
+# DB_POOL_TIMEOUT seconds for a free one and idle connections above the
+# minimum are closed after DB_POOL_MAX_IDLE seconds. Without the pool, each
+# thread keeps its connection open for DB_CONN_MAX_AGE seconds.
+# core.db.postgresql is Django's backend plus pool wait time metrics.
+DB_POOL_ENABLED = os.environ.get("DB_POOL_ENABLED", "false").lower() in ("1", "true", "yes")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.postgresql",
         "NAME": os.environ.get("POSTGRES_DB"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("POSTGRES_HOST"),
         "PORT": os.environ.get("POSTGRES_PORT"),
+        # Pooled connections are always persistent, Django requires 0 here.
+        "CONN_MAX_AGE": 0 if DB_POOL_ENABLED else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+}
+
+if DB_POOL_ENABLED:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+    }
+
+# Read replicas (optional), see core/db/replicas.py. Every host in
+# DB_REPLICA_HOSTS becomes a "replica<n>" alias with the primary's settings.
+DB_REPLICA_HOSTS = [host.strip() for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+for index, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f"replica{index}"] = {
+        **deepcopy(DATABASES["default"]),
+        "HOST": host,
+        # Test runs create a separate database per alias.
+        "TEST": {"NAME": f"test_{DATABASES['default']['NAME']}_replica{index}"},
     }
+DATABASE_REPLICAS = [f"replica{index}" for index in range(1, len(DB_REPLICA_HOSTS) + 1)]
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5))
+DB_PRIMARY_PIN_SECONDS = int(os.environ.get("DB_PRIMARY_PIN_SECONDS", 10))
+
+# Registration shards (optional), see apps/events/shards.py. Every entry of
+# DB_SHARD_HOSTS, a host or host/database, becomes a "shard<n>" alias with
+# the primary's settings. While reshard_registrations moves registrations to
+# a new layout, REGISTRATION_SHARDS_PREVIOUS lists the aliases of the old one
+# ("default" when sharding an existing database).
+DB_SHARD_HOSTS = [host.strip() for host in os.environ.get("DB_SHARD_HOSTS", "").split(",") if host.strip()]
+for index, entry in enumerate(DB_SHARD_HOSTS, 1):
+    host, _, name = entry.partition("/")
+    name = name or DATABASES["default"]["NAME"]
+    DATABASES[f"shard{index}"] = {
+        **deepcopy(DATABASES["default"]),
+        "HOST": host,
+        "NAME": name,
+        "TEST": {"NAME": f"test_{name}_shard{index}"},
+    }
+REGISTRATION_SHARDS = [f"shard{index}" for index in range(1, len(DB_SHARD_HOSTS) + 1)]
+REGISTRATION_SHARDS_PREVIOUS = [
+    alias.strip() for alias in os.environ.get("REGISTRATION_SHARDS_PREVIOUS", "").split(",") if alias.strip()
+]
+
+DATABASE_ROUTERS = ["apps.events.shards.RegistrationShardRouter", "core.db.replicas.ReplicaRouter"]
+
+# EventRegistration's registration_user_covering_idx INCLUDEs the event column
+# so that PostgreSQL answers a user's registrations from the index alone.
+# SQLite (development, tests) creates it without the included column, which
+# still serves the lookup, so its warning about that (W040) is silenced.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The "events" cache holds versioned event list/detail responses and the
+# versions themselves, so it must be shared by every process serving or
+# changing events: with a per-process cache, a change made by one process
+# leaves the others serving stale responses. REDIS_URL (set by
+# docker-compose) makes Redis its default backend; without it, it falls back
+# to LocMemCache, which only suits a single process. Any other Django cache
+# backend can be set with EVENTS_CACHE_BACKEND and EVENTS_CACHE_LOCATION.
+
+REDIS_URL = os.environ.get("REDIS_URL")
+SHARED_CACHE_BACKEND = (
+    "django.core.cache.backends.redis.RedisCache" if REDIS_URL
+    else "django.core.cache.backends.locmem.LocMemCache"
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "events": {
+        "BACKEND": os.environ.get("EVENTS_CACHE_BACKEND", SHARED_CACHE_BACKEND),
+        "LOCATION": os.environ.get("EVENTS_CACHE_LOCATION", REDIS_URL or "events"),
+        "KEY_PREFIX": "events",
+        "TIMEOUT": int(os.environ.get("EVENTS_CACHE_TIMEOUT", 60 * 60)),
+    },
+    # Access token revocation list, see apps/users/revocation.py. Must be
+    # shared between workers for logout to apply everywhere.
+    "auth": {
+        "BACKEND": os.environ.get("AUTH_CACHE_BACKEND", SHARED_CACHE_BACKEND),
+        "LOCATION": os.environ.get("AUTH_CACHE_LOCATION", REDIS_URL or "auth"),
+        "KEY_PREFIX": "auth",
+    },
 }
 
+# A per-process revocation list lets a logged out or deactivated user's
+# token through every other worker, so it is only accepted while debugging.
+PROCESS_LOCAL_CACHE_BACKENDS = [
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+]
+if not DEBUG and CACHES["auth"]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        "The auth cache must be shared between workers: set REDIS_URL or AUTH_CACHE_BACKEND."
+    )
+
+EVENTS_CACHE_ALIAS = "events"
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher for new and upgraded hashes: "scrypt"
+# (default), "argon2" (needs argon2-cffi) or "pbkdf2". The others still verify
+# existing hashes, which are rehashed with the preferred hasher on login.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+_PASSWORD_HASHERS = {
+    "scrypt": "apps.users.hashers.ScryptPasswordHasher",
+    "argon2": "apps.users.hashers.Argon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+]
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_SCRYPT_WORK_FACTOR", 2 ** 14))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.environ.get("PASSWORD_SCRYPT_BLOCK_SIZE", 8))
+PASSWORD_SCRYPT_PARALLELISM = int(os.environ.get("PASSWORD_SCRYPT_PARALLELISM", 1))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_ARGON2_MEMORY_COST", 64 * 1024))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", 1))
+
+AUTHENTICATION_BACKENDS = ["apps.users.backends.EmailBackend"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -142,12 +283,41 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Attendees are reminded of an event this many hours before it starts, see apps.events.notifications.
+EVENT_REMINDER_LEAD_HOURS = float(os.environ.get("EVENT_REMINDER_LEAD_HOURS", 24))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.ClaimsJWTAuthentication",
     ),
+    # Renders JSON with orjson when it is installed, see core/renderers.py.
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # Used by apps.users.throttling on the login and register endpoints.
+    "DEFAULT_THROTTLE_RATES": {
+        "login_email": os.environ.get("LOGIN_RATE_PER_EMAIL", "10/min"),
+        "auth_ip": os.environ.get("AUTH_RATE_PER_IP", "60/min"),
+    },
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=60)
 }
+
+AUTH_CACHE_ALIAS = "auth"
+# Revocation lookups are memoised per process for this many seconds.
+AUTH_REVOCATION_LOCAL_TTL = int(os.environ.get("AUTH_REVOCATION_LOCAL_TTL", 30))
+AUTH_REVOCATION_LOCAL_MAXSIZE = 10000
+AUTH_THROTTLE_LOCAL_MAXSIZE = 10000
+
+# Request profiling, see core/profiling.py. Adds Server-Timing headers and
+# Prometheus metrics at /metrics (protected by PROFILING_METRICS_TOKEN if
+# set); a PROFILING_SAMPLE_RATE fraction of requests is run under cProfile
+# and kept in PROFILING_DIR when slower than PROFILING_SLOW_MS.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_METRICS_TOKEN = os.environ.get("PROFILING_METRICS_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_SLOW_MS = float(os.environ.get("PROFILING_SLOW_MS", 500))
+PROFILING_DIR = os.environ.get("PROFILING_DIR", BASE_DIR / "profiles")
@@ -22,6 +22,9 @@ from drf_yasg.views import get_schema_view
 
 from django.urls import path, include
 
+from core.profiling import metrics_view
+from core.db.views import PoolStatsView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Snippets API",
@@ -37,6 +40,8 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include("apps.urls")),
+    path('api/db/pool-stats/', PoolStatsView.as_view(), name="db-pool-stats"),
+    path('metrics', metrics_view, name="metrics"),
     path('swagger/', schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
 
 ]